@@ -1,150 +1,157 @@
-import decimal
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from decimal import Decimal, getcontext
-from collections import OrderedDict
-from pprint import pprint
+from datetime import date, datetime
+
+import numpy as np
+
+from astrology.Dasha import vimshottari_engine as engine
+from astrology.Dasha.vimshottari_engine import LEVEL_NAMES, ordinal_to_datetime, to_ordinal
 
 # === Vimshottari Dasha Sequence ===
-DASHA_SEQUENCE = [
-    ("Ketu", 7),
-    ("Venus", 20),
-    ("Sun", 6),
-    ("Moon", 10),
-    ("Mars", 7),
-    ("Rahu", 18),
-    ("Jupiter", 16),
-    ("Saturn", 19),
-    ("Mercury", 17)
-]
-
-DASHA_SEQUENCE_ant = [
-    "Ketu", "Venus", "Sun", "Moon", "Mars",
-    "Rahu", "Jupiter", "Saturn", "Mercury"
-]
+DASHA_SEQUENCE = list(zip(engine.LORDS, engine.YEARS))
+
+DASHA_SEQUENCE_ant = list(engine.LORDS)
 DASHA_YEARS = dict(DASHA_SEQUENCE)
-NAKSHATRA_SPAN_DEG = 13.3333
-
-def ymd_to_dmy(date_str):
-    dt = datetime.strptime(date_str, "%Y-%m-%d")
-    return dt.strftime("%d-%m-%Y")
-
-def dms_to_decimal(degree: int, minute: int, second: int) -> float:
-    return degree + minute / 60 + second / 3600
-
-def get_absolute_moon_degree(sign_index: int, deg_in_sign: float) -> float:
-    return sign_index * 30 + deg_in_sign
-
-def get_nakshatra_start_deg(abs_moon_deg: float) -> float:
-    nak_index = int(abs_moon_deg // NAKSHATRA_SPAN_DEG)
-    return nak_index * NAKSHATRA_SPAN_DEG
-
-def calculate_moon_dasha_start(dob, moon_deg_within_nakshatra, moon_lord_years):
-    proportion_passed = moon_deg_within_nakshatra / NAKSHATRA_SPAN_DEG
-    passed_years = moon_lord_years * proportion_passed
-    moon_dasha_start = dob - relativedelta(days=int(passed_years * 365))
-    remaining_years = moon_lord_years - passed_years
-    return moon_dasha_start, remaining_years
-
-def get_vimshottari_dasha_from_dms(dob_str, tob_str, d, m, s, sign_index, moon_nakshatra_lord):
-    deg_in_sign = dms_to_decimal(d, m, s)
-    dt = ymd_to_dmy(dob_str)
-    dob = datetime.strptime(f"{dt} {tob_str}", "%d-%m-%Y %H:%M")
-    moon_deg_abs = get_absolute_moon_degree(sign_index, deg_in_sign)
-    nakshatra_start_deg = get_nakshatra_start_deg(moon_deg_abs)
-    moon_deg_within_nakshatra = moon_deg_abs - nakshatra_start_deg
-
-    moon_lord_years = dict(DASHA_SEQUENCE)[moon_nakshatra_lord]
-    moon_dasha_start, moon_remaining_years = calculate_moon_dasha_start(
-        dob, moon_deg_within_nakshatra, moon_lord_years
-    )
-
-    start_index = next(i for i, (planet, _) in enumerate(DASHA_SEQUENCE) if planet == moon_nakshatra_lord)
-    reordered = DASHA_SEQUENCE[start_index:] + DASHA_SEQUENCE[:start_index]
-
-    result = OrderedDict()
-    current_start = dob
-    moon_end = current_start + relativedelta(days=int(moon_remaining_years * 365))
-    result[moon_nakshatra_lord] = (current_start.strftime("%Y-%m-%d"), moon_end.strftime("%Y-%m-%d"))
-    current_start = moon_end
-
-    for planet, duration in reordered[1:]:
-        current_end = current_start + relativedelta(years=duration)
-        result[planet] = (current_start.strftime("%Y-%m-%d"), current_end.strftime("%Y-%m-%d"))
-        current_start = current_end
-
-    return result, moon_deg_abs, nakshatra_start_deg
-
-def get_pratyantardasha_dates(antardasha_lord, antardasha_start, antardasha_end):
-     # Convert if input is str
-     
-    if isinstance(antardasha_start, str):
-        antardasha_start = datetime.strptime(antardasha_start, "%d-%m-%Y")
-    if isinstance(antardasha_end, str):
-        antardasha_end = datetime.strptime(antardasha_end, "%d-%m-%Y")
-    pratyantardasha_list = OrderedDict()
-    total_days = (antardasha_end - antardasha_start).days
-    total_weight = sum(DASHA_YEARS.values())
-
-    # Start from the Antardasha lord
-    start_index = DASHA_SEQUENCE_ant.index(antardasha_lord)
-    praty_sequence = DASHA_SEQUENCE_ant[start_index:] + DASHA_SEQUENCE_ant[:start_index]
-
-    current_start = antardasha_start
-    for sublord in praty_sequence:
-        portion = DASHA_YEARS[sublord] / total_weight
-        duration_days = int(round(portion * total_days))
-        current_end = current_start + timedelta(days=duration_days)
-        
-        pratyantardasha_list[sublord] = {
-            "start_date": current_start.strftime("%d-%m-%Y"),
-            "end_date": current_end.strftime("%d-%m-%Y")
-        }
-        current_start = current_end
-
-    return pratyantardasha_list
-
-def get_antardasha_dates(maha, start_date, end_date):
-    
-    total_days = (end_date - start_date).days
-    current = start_date
-    results = OrderedDict()
-
-    idx = DASHA_SEQUENCE_ant.index(maha)
-    reordered = DASHA_SEQUENCE_ant[idx:] + DASHA_SEQUENCE_ant[:idx]
-
-    dasha_years = dict(DASHA_SEQUENCE)
-
-    for antar in reordered:
-        antar_years = dasha_years[antar]
-        duration = round((antar_years / 120) * total_days)
-        end = current + timedelta(days=duration)
-
-        # Use cross-platform date formatting
-        formatted_date_start = current.strftime('%d-%m-%Y').lstrip("0").replace("/0", "/")
-        formatted_date_end = end.strftime('%d-%m-%Y').lstrip("0").replace("/0", "/")
-        pratyantardasha =  get_pratyantardasha_dates(antar,formatted_date_start,formatted_date_end)
-        results[antar] = {
-            "start_date":formatted_date_start,
-            "end_date":formatted_date_end,
-            "pratyantarDasha":pratyantardasha
-        }
-        current = end
-
-    return results
-
-def vim_deg_to_dms(deg):
-    d = int(deg)
-    remainder = abs(deg - d) * 60
-    m = int(remainder)
-    s = round((remainder - m) * 60)
-    if s == 60:
-        s = 0
-        m += 1
-    if m == 60:
-        m = 0
-        d += 1
-    return d, m, s
+
+def format_ordinal(ordinal):
+    """Day ordinal -> "DD-MM-YYYY" of the day it falls on."""
+    d = date.fromordinal(int(ordinal // 1))
+    return f"{d.day:02d}-{d.month:02d}-{d.year}"
+
+def format_ordinals(ordinals):
+    """format_ordinal for an array; the characters are built in numpy, digit by digit."""
+    days = (np.floor(np.ravel(ordinals)).astype(np.int64) - engine.ORDINAL_EPOCH).astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    year = months.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months).astype(np.int64) + 1
+    chars = np.full((len(days), 10), ord("-"), dtype=np.uint32)
+    for col, value, place in ((0, day, 10), (1, day, 1), (3, month, 10), (4, month, 1),
+                              (6, year, 1000), (7, year, 100), (8, year, 10), (9, year, 1)):
+        chars[:, col] = ord("0") + value // place % 10
+    # Each row of UCS-4 code points is one 10-character string
+    return chars.view("<U10").ravel().tolist()
+
+def birth_ordinal(dob, tob):
+    """Local birth date "YYYY-MM-DD" and time "HH:MM" -> fractional day ordinal."""
+    return to_ordinal(datetime.strptime(f"{dob} {tob}", "%Y-%m-%d %H:%M"))
+
+class DashaNode:
+    """
+    One dasha period; `start`/`end` are fractional day ordinals in local
+    time (see vimshottari_engine). Sub-periods are only computed when
+    `children` is first read.
+    """
+    __slots__ = ("lord", "start", "end", "path", "_children")
+
+    def __init__(self, lord, start, end, path):
+        self.lord = lord
+        self.start = start
+        self.end = end
+        self.path = path          # ("Venus", "Sun", ...) from the mahadasha down
+        self._children = None
+
+    @property
+    def level(self):
+        return len(self.path)
+
+    @property
+    def start_date(self):
+        return date.fromordinal(int(self.start // 1))
+
+    @property
+    def end_date(self):
+        return date.fromordinal(int(self.end // 1))
+
+    @property
+    def start_time(self):
+        return ordinal_to_datetime(self.start)
+
+    @property
+    def end_time(self):
+        return ordinal_to_datetime(self.end)
+
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = [
+                DashaNode(DASHA_SEQUENCE_ant[lord], start, end, self.path + (DASHA_SEQUENCE_ant[lord],))
+                for lord, start, end in engine.sub_periods(DASHA_SEQUENCE_ant.index(self.lord), self.start, self.end)
+            ]
+        return self._children
+
+    def child(self, lord):
+        for node in self.children:
+            if node.lord == lord:
+                return node
+        raise KeyError(f"No {lord} period under {'/'.join(self.path)}")
+
+    def __repr__(self):
+        return f"DashaNode({'/'.join(self.path)}, {self.start_time} - {self.end_time})"
+
+class DashaTree:
+    """
+    Vimshottari dasha periods, addressed by path:
+
+        tree = DashaTree.for_moon(dob, tob, moon_lon)
+        tree.node("Venus/Sun/Moon")     # mahadasha / antardasha / pratyantardasha
+    """
+
+    def __init__(self, birth, moon_lon, year=None):
+        self.birth = birth
+        self.moon_lon = moon_lon
+        self.year = year
+        self.mahadashas = [
+            DashaNode(DASHA_SEQUENCE_ant[lord], start, end, (DASHA_SEQUENCE_ant[lord],))
+            for lord, start, end in engine.mahadashas(birth, moon_lon, year)
+        ]
+
+    @classmethod
+    def for_moon(cls, dob, tob, moon_lon, year=None):
+        """From the local birth date/time and the sidereal Moon longitude."""
+        return cls(birth_ordinal(dob, tob), moon_lon, year)
+
+    def node(self, path):
+        """The period at a "Maha/Antar/..." path (a string or a sequence of lords)."""
+        lords = path.split("/") if isinstance(path, str) else list(path)
+        if not lords:
+            raise KeyError("Empty dasha path")
+        for node in self.mahadashas:
+            if node.lord == lords[0]:
+                break
+        else:
+            raise KeyError(f"No {lords[0]} mahadasha")
+        for lord in lords[1:]:
+            node = node.child(lord)
+        return node
+
+    def to_json(self):
+        """The full three-level {"vimshottariDasha": ...} structure of the report."""
+        levels = engine.table([self.birth], [self.moon_lon], 3, self.year)
+        # Ends meet the next starts, so the 1638 dates fall on about 730 days: each is formatted once
+        bounds = np.concatenate([b[0] for _, starts, ends in levels for b in (starts, ends)])
+        days, inverse = np.unique(np.floor(bounds), return_inverse=True)
+        text = format_ordinals(days)
+        dates = [text[i] for i in inverse.tolist()]
+        maha_starts, maha_ends = dates[0:9], dates[9:18]
+        # Antardasha days have always been printed without a leading zero
+        antar_starts, antar_ends = [d.lstrip("0") for d in dates[18:99]], [d.lstrip("0") for d in dates[99:180]]
+        praty_periods = [{"start_date": start, "end_date": end} for start, end in zip(dates[180:909], dates[909:])]
+        maha, antar, praty = ([DASHA_SEQUENCE_ant[lord] for lord in lords[0].tolist()] for lords, _, _ in levels)
+
+        full_dasha = {}
+        for i in range(9):
+            antardasha = {}
+            for j in range(9 * i, 9 * i + 9):
+                antardasha[antar[j]] = {
+                    "start_date": antar_starts[j],
+                    "end_date": antar_ends[j],
+                    "pratyantarDasha": dict(zip(praty[9 * j:9 * j + 9], praty_periods[9 * j:9 * j + 9])),
+                }
+            full_dasha[maha[i]] = {
+                "start_date": maha_starts[i],
+                "end_date": maha_ends[i],
+                "antarDasha": antardasha,
+            }
+        return {"vimshottariDasha": full_dasha}
 
 def get_rashi_number(rashi_name: str) -> int:
     rashi_map = {
@@ -154,23 +161,45 @@ def get_rashi_number(rashi_name: str) -> int:
     }
     return rashi_map.get(rashi_name.capitalize(), -1)
 
-def find_vimashotry_dasha(DOB, TOB, MOON_DEG, SIGN_NAME, MOON_NAKSHATRA_LORD):
-    D, M, S = vim_deg_to_dms(MOON_DEG)
-    SIGN_INDEX = get_rashi_number(SIGN_NAME)
-
-    dasha_result, moon_abs_deg, nakshatra_start_deg = get_vimshottari_dasha_from_dms(
-        DOB, TOB, D, M, S, SIGN_INDEX, MOON_NAKSHATRA_LORD
-    )
-
-    full_dasha = {}
-    for maha_lord, period in dasha_result.items():
-        start_dt = datetime.strptime(period[0], "%Y-%m-%d")
-        end_dt = datetime.strptime(period[1], "%Y-%m-%d")
-        antardasha = get_antardasha_dates(maha_lord, start_dt, end_dt)
-        full_dasha[maha_lord] = {
-            "start_date": start_dt.strftime("%d-%m-%Y"),
-            "end_date": end_dt.strftime("%d-%m-%Y"),
-            "antarDasha": antardasha
-        }
-
-    return {"vimshottariDasha": full_dasha}
+def find_vimashotry_dasha(DOB, TOB, MOON_DEG, SIGN_NAME, MOON_NAKSHATRA_LORD=None):
+    # The nakshatra lord follows from the longitude; the argument is kept for old callers
+    moon_lon = get_rashi_number(SIGN_NAME) * 30 + MOON_DEG
+    return DashaTree.for_moon(DOB, TOB, moon_lon).to_json()
+
+def find_vimashotry_dasha_for_chart(snapshot):
+    """Vimshottari dasha straight from a ChartSnapshot's sidereal Moon."""
+    return DashaTree.for_moon(snapshot.dob, snapshot.tob, snapshot.longitude_of("Moon")).to_json()
+
+def running_dasha(dob, tob, moon_lon, on, depth=4):
+    """
+    The periods running at `on` (a datetime, a date or "YYYY-MM-DD[THH:MM]",
+    local time) as DashaNodes, from the mahadasha down `depth` levels.
+    Raises ValueError outside the dasha cycle.
+    """
+    running = []
+    path = ()
+    for lord, start, end in engine.running(birth_ordinal(dob, tob), moon_lon, on, depth):
+        path += (DASHA_SEQUENCE_ant[lord],)
+        running.append(DashaNode(path[-1], start, end, path))
+    return running
+
+def running_dasha_many(births, moon_lons, on, depth=4):
+    """
+    running_dasha for arrays of local birth times (datetimes, ISO strings or
+    datetime64) and sidereal Moon longitudes, at one time or one time each.
+
+    Returns (lords, starts, ends), each of shape (n, depth): lord indexes into
+    DASHA_SEQUENCE_ant and fractional day ordinals (see ordinal_to_datetime).
+    Rows whose time falls outside the cycle are -1.
+    """
+    return engine.running_many(births, moon_lons, on, depth)
+
+def iter_dasha_periods(dob, tob, moon_lon, depth=5, start=None, end=None):
+    """
+    Yields (path, start, end) for the periods `depth` levels down (1 =
+    mahadasha ... 6 = deha, see LEVEL_NAMES) overlapping [start, end), in
+    chronological order; `path` is a tuple of lord names. Memory use does
+    not grow with depth.
+    """
+    for path, period_start, period_end in engine.walk(birth_ordinal(dob, tob), moon_lon, depth, start, end):
+        yield tuple(DASHA_SEQUENCE_ant[lord] for lord in path), period_start, period_end
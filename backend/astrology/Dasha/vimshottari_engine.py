@@ -0,0 +1,238 @@
+"""
+Vimshottari dasha engine.
+
+Works from the sidereal Moon longitude at birth in exact arithmetic: the
+nakshatra span is 360/27 degrees and every period boundary is a fractional
+day ordinal (date.toordinal() plus the fraction of the day, local civil
+time, see to_ordinal). The mahadasha running at birth started before it, by
+the part of the Moon's nakshatra already traversed; the cycle is 120 years
+of DASHA_YEAR days.
+
+Every sub-level splits its parent in proportion to the nine lords' years,
+starting from the parent's lord, so a period's boundaries are its start
+plus its length times the cumulative year shares in CUMULATIVE_SHARES.
+"""
+import os
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+LORDS = ("Ketu", "Venus", "Sun", "Moon", "Mars", "Rahu", "Jupiter", "Saturn", "Mercury")
+YEARS = (7, 20, 6, 10, 7, 18, 16, 19, 17)
+CYCLE_YEARS = sum(YEARS)   # 120
+NAKSHATRA_SPAN = 360 / 27
+# mahadasha, antardasha, pratyantardasha, sookshma, prana, deha
+LEVEL_NAMES = ("maha", "antar", "pratyantar", "sookshma", "prana", "deha")
+
+# Days per dasha year
+YEAR_DAYS = {
+    "julian": 365.25,
+    "tropical": 365.24219,
+    "sidereal": 365.256363,
+    "savana": 360.0,
+    "civil": 365.0,
+}
+DASHA_YEAR = os.getenv("DASHA_YEAR", "julian")
+
+_YEARS = np.array(YEARS, dtype=float)
+# SEQUENCES[i]: the nine lords starting from lord i
+SEQUENCES = np.array([[(i + k) % 9 for k in range(9)] for i in range(9)])
+# CUMULATIVE_SHARES[i, k]: fraction of a lord-i period elapsed when its k-th sub-period starts
+CUMULATIVE_SHARES = np.concatenate(
+    [np.zeros((9, 1)), np.cumsum(_YEARS[SEQUENCES], axis=1) / CYCLE_YEARS], axis=1
+)
+CUMULATIVE_SHARES[:, -1] = 1.0
+_SHARE_ROWS = CUMULATIVE_SHARES.tolist()
+ORDINAL_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def year_days(year=None):
+    """Length of a dasha year in days: a YEAR_DAYS name or a number."""
+    year = DASHA_YEAR if year is None else year
+    if isinstance(year, str):
+        try:
+            return YEAR_DAYS[year]
+        except KeyError:
+            raise ValueError(f"Unknown dasha year '{year}', expected one of {', '.join(YEAR_DAYS)}")
+    return float(year)
+
+
+def to_ordinal(value):
+    """datetime, date or "YYYY-MM-DD[THH:MM[:SS]]" -> day ordinal (fractional for times of day)."""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    ordinal = value.toordinal()
+    if isinstance(value, datetime):
+        ordinal += (value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6) / 86400
+    return ordinal
+
+
+def ordinal_to_datetime(ordinal):
+    """Day ordinal, possibly fractional -> naive local datetime (to the second)."""
+    day = int(ordinal // 1)
+    return datetime.combine(date.fromordinal(day), datetime.min.time()) + timedelta(
+        seconds=round((ordinal - day) * 86400))
+
+
+def birth_balance(moon_lon):
+    """(index of the lord running at birth, fraction of its mahadasha already elapsed)."""
+    moon_lon = moon_lon % 360
+    nakshatra = int(moon_lon // NAKSHATRA_SPAN)
+    return nakshatra % 9, (moon_lon - nakshatra * NAKSHATRA_SPAN) / NAKSHATRA_SPAN
+
+
+def mahadashas(birth, moon_lon, year=None):
+    """The nine mahadashas from the one running at birth, as (lord index, start, end)."""
+    days = year_days(year)
+    lord, elapsed = birth_balance(moon_lon)
+    cycle_start = to_ordinal(birth) - elapsed * YEARS[lord] * days
+    periods = []
+    start, years = cycle_start, 0
+    for k in range(9):
+        sub = (lord + k) % 9
+        years += YEARS[sub]
+        end = cycle_start + years * days
+        periods.append((sub, start, end))
+        start = end
+    return periods
+
+
+def sub_periods(lord, start, end):
+    """The nine sub-periods of a lord-`lord` period, as (lord index, start, end)."""
+    length = end - start
+    shares = _SHARE_ROWS[lord]
+    bounds = [start + length * share for share in shares]
+    return [((lord + k) % 9, bounds[k], bounds[k + 1]) for k in range(9)]
+
+
+def running(birth, moon_lon, at, depth=3, year=None):
+    """
+    The periods running at `at`, from the mahadasha down `depth` levels, as
+    (lord index, start, end). Each level is one bisection of the cumulative
+    shares; nothing else is computed. Raises ValueError outside the cycle.
+    """
+    target = to_ordinal(at)
+    periods = mahadashas(birth, moon_lon, year)
+    if not periods[0][1] <= target < periods[-1][2]:
+        raise ValueError(f"{at} is outside the dasha cycle of this birth")
+
+    k = bisect_right([end for _, _, end in periods], target)
+    lord, start, end = periods[min(k, 8)]
+    path = [(lord, start, end)]
+    for _ in range(depth - 1):
+        length = end - start
+        bounds = [start + length * share for share in _SHARE_ROWS[lord]]
+        k = min(bisect_right(bounds, target, 1, 10) - 1, 8)
+        lord, start, end = (lord + k) % 9, bounds[k], bounds[k + 1]
+        path.append((lord, start, end))
+    return path
+
+
+def walk(birth, moon_lon, depth=5, start=None, end=None, year=None):
+    """
+    Yields (path, start, end) for the periods `depth` levels down that
+    overlap [start, end), in chronological order; `path` is a tuple of lord
+    indexes. Only periods inside the window are entered, so memory is nine
+    periods per level whatever the depth.
+    """
+    if not 1 <= depth <= len(LEVEL_NAMES):
+        raise ValueError(f"depth must be between 1 and {len(LEVEL_NAMES)}")
+    lo = to_ordinal(start) if start is not None else float("-inf")
+    hi = to_ordinal(end) if end is not None else float("inf")
+    yield from _walk(mahadashas(birth, moon_lon, year), (), 1, depth, lo, hi)
+
+
+def _walk(periods, path, level, depth, lo, hi):
+    for lord, start, end in periods:
+        if start >= hi:
+            break
+        if end <= lo:
+            continue
+        if level == depth:
+            yield path + (lord,), start, end
+        else:
+            yield from _walk(sub_periods(lord, start, end), path + (lord,), level + 1, depth, lo, hi)
+
+
+# --- Vectorised forms ---
+
+def _ordinals(values):
+    """Array of day ordinals from numbers, or from dates/strings/datetime64 (to the second)."""
+    values = np.asarray(values)
+    if values.dtype.kind in "iuf":
+        return values.astype(float)
+    return np.asarray(values, dtype="datetime64[s]").astype(np.int64) / 86400 + ORDINAL_EPOCH
+
+
+def mahadashas_many(births, moon_lons, year=None):
+    """(lords (n, 9), boundaries (n, 10)) for arrays of births and Moon longitudes."""
+    birth = _ordinals(births)
+    moon_lon = np.asarray(moon_lons, dtype=float) % 360
+    nakshatra = np.floor_divide(moon_lon, NAKSHATRA_SPAN)
+    lord = nakshatra.astype(np.int64) % 9
+    elapsed = (moon_lon - nakshatra * NAKSHATRA_SPAN) / NAKSHATRA_SPAN
+
+    days = year_days(year)
+    lords = SEQUENCES[lord]
+    bounds = np.empty((len(birth), 10))
+    bounds[:, 0] = birth - elapsed * _YEARS[lord] * days
+    bounds[:, 1:] = bounds[:, :1] + np.cumsum(_YEARS[lords], axis=1) * days
+    return lords, bounds
+
+
+def running_many(births, moon_lons, at, depth=3, year=None):
+    """
+    running() for arrays of births and Moon longitudes, at one time or one
+    time each. Returns (lords, starts, ends) of shape (n, depth); rows whose
+    time is outside the cycle are -1.
+    """
+    lords_maha, bounds = mahadashas_many(births, moon_lons, year)
+    n = len(bounds)
+    rows = np.arange(n)
+    target = np.broadcast_to(_ordinals(at), (n,))
+    valid = (bounds[:, 0] <= target) & (target < bounds[:, 9])
+
+    k = np.minimum((bounds[:, 1:] <= target[:, None]).sum(axis=1), 8)
+    lord, start, end = lords_maha[rows, k], bounds[rows, k], bounds[rows, k + 1]
+
+    lords = np.empty((n, depth), dtype=np.int64)
+    starts = np.empty((n, depth))
+    ends = np.empty((n, depth))
+    for level in range(depth):
+        lords[:, level], starts[:, level], ends[:, level] = lord, start, end
+        if level == depth - 1:
+            break
+        shares = CUMULATIVE_SHARES[lord]
+        length = end - start
+        sub_bounds = start[:, None] + length[:, None] * shares
+        k = np.minimum((sub_bounds[:, 1:] <= target[:, None]).sum(axis=1), 8)
+        lord = (lord + k) % 9
+        start, end = sub_bounds[rows, k], sub_bounds[rows, k + 1]
+
+    for arr in (lords, starts, ends):
+        arr[~valid] = -1
+    return lords, starts, ends
+
+
+def table(births, moon_lons, depth=3, year=None):
+    """
+    Every period down to `depth` levels for arrays of births, by
+    broadcasting: a list with one (lords, starts, ends) per level, level L
+    shaped (n, 9**L) in chronological order.
+    """
+    lords, bounds = mahadashas_many(births, moon_lons, year)
+    starts, ends = bounds[:, :-1], bounds[:, 1:]
+    levels = [(lords, starts, ends)]
+    for _ in range(depth - 1):
+        shares = CUMULATIVE_SHARES[lords]                     # (n, m, 10)
+        length = (ends - starts)[..., None]
+        sub_bounds = starts[..., None] + length * shares
+        n = len(lords)
+        lords = SEQUENCES[lords].reshape(n, -1)
+        starts = sub_bounds[..., :-1].reshape(n, -1)
+        ends = sub_bounds[..., 1:].reshape(n, -1)
+        levels.append((lords, starts, ends))
+    return levels
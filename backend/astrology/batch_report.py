@@ -0,0 +1,173 @@
+"""
+Bulk birth-chart reports.
+
+Takes many (dob, tob, lat, lon, tz) records, builds each chart from its
+coordinates (no geocoding) and runs the same three sections as
+/astro-report in a pool of worker processes. Results are yielded as soon as
+each chunk of records completes, so a caller can stream them as NDJSON.
+
+    for line in iter_batch_reports(records):
+        print(json.dumps(line))
+
+Each yielded item is {"index": i, "id": ..., "report": [...]} or, for a
+record that failed, {"index": i, "id": ..., "error": "..."}; "index" is the
+position of the record in the input.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from astrology.chart_snapshot import chart_snapshot_from_coordinates
+from astrology.Dasha.vimashotryDasha import find_vimashotry_dasha_for_chart
+from astrology.ephemeris import calc_bodies, ephemeris_context
+from astrology.ephemeris_table import get_table
+from astrology.nakshtra_details import final_astro_report
+from astrology.planet_positions import planet_position_details
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "0")) or os.cpu_count() or 1
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "5000"))
+# Records sent to a worker at a time; amortises the inter-process overhead
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "16"))
+
+# Accepted spellings of the record fields
+FIELD_ALIASES = {
+    "dob": ("dob",),
+    "tob": ("tob",),
+    "lat": ("lat", "latitude"),
+    "lon": ("lon", "lng", "longitude"),
+    "tz": ("tz", "timezone"),
+}
+
+
+def astro_report_sections(snapshot):
+    """The /astro-report payload for a chart: details, planet positions and dasha."""
+    return [
+        final_astro_report(snapshot.dob, snapshot.tob, snapshot.location, snapshot=snapshot),
+        planet_position_details(snapshot.dob, snapshot.tob, snapshot.location, snapshot.timezone,
+                                snapshot=snapshot),
+        find_vimashotry_dasha_for_chart(snapshot),
+    ]
+
+
+def normalize_record(record):
+    """Maps a raw record (JSON object or CSV row) onto dob/tob/lat/lon/tz; raises ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object")
+    out = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((record[a] for a in aliases if record.get(a) not in (None, "")), None)
+        if value is None and field != "tz":
+            raise ValueError(f"Missing '{field}'")
+        out[field] = value.strip() if isinstance(value, str) else value
+    try:
+        out["lat"], out["lon"] = float(out["lat"]), float(out["lon"])
+    except (TypeError, ValueError):
+        raise ValueError("'lat' and 'lon' must be numbers")
+    if not (-90 <= out["lat"] <= 90 and -180 <= out["lon"] <= 180):
+        raise ValueError("'lat'/'lon' out of range")
+    out["id"] = record.get("id")
+    out["location"] = record.get("location") or None
+    return out
+
+
+def report_for_record(record):
+    """Builds the report of one normalised record."""
+    snapshot = chart_snapshot_from_coordinates(
+        record["dob"], record["tob"], record["lat"], record["lon"],
+        record["tz"], record["location"]
+    )
+    return astro_report_sections(snapshot)
+
+
+def _run_chunk(chunk):
+    results = []
+    for index, record in chunk:
+        try:
+            results.append({"index": index, "id": record["id"], "report": report_for_record(record)})
+        except Exception as e:
+            results.append({"index": index, "id": record["id"], "error": str(e)})
+    return results
+
+
+def _init_worker():
+    """Warms a worker: applies the ephemeris settings and maps the Sun/Moon table once."""
+    with ephemeris_context() as ctx:
+        calc_bodies(2451545.0, ("Sun", "Moon"), ctx.flags, context=ctx)
+    get_table()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _mp_context():
+    """
+    Workers are never forked from the (multi-threaded) web process: a lock
+    held by another thread at fork time stays held in the child. The fork
+    server is a fresh process that imports only this module, not the web
+    app; where there is none, workers are spawned. _init_worker sets up
+    each of them.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["astrology.batch_report"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def get_executor():
+    """Returns the process pool shared by all batch requests, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=_mp_context(),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _discard_executor(executor):
+    """Forgets a pool whose worker died so the next batch starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_batch_reports(records, executor=None, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Yields one result per record, in completion order.
+
+    Invalid records are reported immediately without reaching the pool.
+    """
+    records = list(records)
+    if len(records) > BATCH_MAX_RECORDS:
+        raise ValueError(f"Too many records ({len(records)}); the limit is {BATCH_MAX_RECORDS}")
+
+    valid = []
+    for index, raw in enumerate(records):
+        try:
+            valid.append((index, normalize_record(raw)))
+        except ValueError as e:
+            yield {"index": index, "id": raw.get("id") if isinstance(raw, dict) else None, "error": str(e)}
+
+    if not valid:
+        return
+    executor = executor or get_executor()
+    futures = [executor.submit(_run_chunk, valid[i:i + chunk_size])
+               for i in range(0, len(valid), chunk_size)]
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise
+    finally:
+        # The client went away or a worker died: drop the chunks not started yet
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,154 @@
+"""
+Single-pass birth chart snapshot.
+
+Everything the /astro-report sections need (location, timezone, Julian day,
+ayanamsa, sidereal bodies and house cusps) is computed once per request and
+shared, instead of every section geocoding and recomputing the chart.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+
+import pytz
+import swisseph as swe
+
+from astrology.ephemeris import calc_bodies, ephemeris_context, LON
+from geocoding.geocoder import geocode
+from geocoding.timezones import timezone_at
+
+CHART_BODIES = (
+    "Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn",
+    "Rahu", "Ketu", "Uranus", "Neptune", "Pluto"
+)
+
+
+@dataclass(frozen=True)
+class ChartSnapshot:
+    dob: str                # YYYY-MM-DD
+    tob: str                # HH:MM (local time at the place of birth)
+    location: str
+    latitude: float
+    longitude: float
+    timezone: str
+    utc_dt: datetime
+    jd: float
+    ayanamsa: float         # Lahiri ayanamsa at jd, degrees
+    bodies: MappingProxyType  # name -> (longitude, latitude, speed), sidereal
+    cusps: tuple            # tropical house cusps (Placidus)
+    ascmc: tuple            # tropical ascendant, MC, ...
+
+    def longitude_of(self, body):
+        return self.bodies[body][LON]
+
+    @property
+    def ascendant_tropical(self):
+        return self.ascmc[0]
+
+    @property
+    def ascendant_sidereal(self):
+        return (self.ascmc[0] - self.ayanamsa) % 360
+
+
+@dataclass(frozen=True)
+class ResolvedLocation:
+    name: str
+    latitude: float
+    longitude: float
+    timezone: str           # IANA zone
+
+
+def resolve_location(location=None, lat=None, lon=None, timezone=None):
+    """
+    Turns the request's place into coordinates and a timezone, once.
+
+    With `lat`/`lon` (e.g. from a /proxy/nominatim suggestion) nothing is
+    geocoded: `timezone` is used as given, or looked up locally from the
+    coordinates. Otherwise `location` is geocoded and the zone of the place
+    wins over the caller-supplied `timezone`, which is only a fallback.
+    """
+    if lat not in (None, "") and lon not in (None, ""):
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid coordinates: lat={lat!r}, lon={lon!r}")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Coordinates out of range: lat={lat}, lon={lon}")
+        timezone_str = timezone or timezone_at(lat, lon)
+        name = location or f"{lat:.4f},{lon:.4f}"
+    elif location:
+        place = geocode(location)
+        lat, lon = place.latitude, place.longitude
+        timezone_str = place.timezone or timezone_at(lat, lon) or timezone
+        name = location
+    else:
+        raise ValueError("Either a location or lat/lon is required")
+
+    if not timezone_str:
+        raise ValueError(f"Could not find timezone for Latitude: {lat}, Longitude: {lon}")
+    return ResolvedLocation(name, lat, lon, timezone_str)
+
+
+def build_chart_snapshot(dob, tob, location=None, timezone=None, lat=None, lon=None):
+    """
+    Builds the chart for a birth date/time/place.
+
+    The place is resolved once by resolve_location: given coordinates skip
+    geocoding entirely.
+    """
+    place = resolve_location(location, lat, lon, timezone)
+    return chart_snapshot_from_coordinates(dob, tob, place.latitude, place.longitude,
+                                           place.timezone, place.name)
+
+
+def chart_snapshot_from_coordinates(dob, tob, lat, lon, timezone=None, location=None):
+    """
+    Builds the chart for already known coordinates, without geocoding.
+
+    `timezone` is an IANA zone name; when omitted it is looked up from the
+    coordinates.
+    """
+    lat, lon = float(lat), float(lon)
+    if location is None:
+        location = f"{lat:.4f},{lon:.4f}"
+
+    timezone_str = timezone or timezone_at(lat, lon)
+    if not timezone_str:
+        raise ValueError(f"Could not find timezone for Latitude: {lat}, Longitude: {lon}")
+    try:
+        local_tz = pytz.timezone(timezone_str)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone '{timezone_str}'")
+
+    naive_dt = datetime.strptime(f"{dob} {tob}", "%Y-%m-%d %H:%M")
+    # Times skipped or repeated by a DST change are taken as standard time (is_dst=False)
+    local_dt = local_tz.localize(naive_dt)
+    utc_dt = local_dt.astimezone(pytz.utc)
+
+    jd = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
+                    utc_dt.hour + utc_dt.minute / 60.0 + utc_dt.second / 3600.0)
+
+    with ephemeris_context() as ctx:
+        ayanamsa = swe.get_ayanamsa_ut(jd)
+        # The report sections have always used swe.calc on the UT Julian day
+        positions = calc_bodies(jd, CHART_BODIES, ctx.flags, ut=False, context=ctx)[0]
+        cusps, ascmc = swe.houses(jd, lat, lon, b'P')
+
+    bodies = {
+        name: tuple(float(v) for v in positions[i])
+        for i, name in enumerate(CHART_BODIES)
+    }
+
+    return ChartSnapshot(
+        dob=dob,
+        tob=tob,
+        location=location,
+        latitude=lat,
+        longitude=lon,
+        timezone=timezone_str,
+        utc_dt=utc_dt,
+        jd=jd,
+        ayanamsa=ayanamsa,
+        bodies=MappingProxyType(bodies),
+        cusps=tuple(cusps),
+        ascmc=tuple(ascmc),
+    )
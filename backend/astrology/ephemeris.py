@@ -0,0 +1,212 @@
+import os
+import threading
+
+import numpy as np
+import swisseph as swe
+from astrology.ephemeris_table import get_table
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_root = os.path.dirname(current_dir)
+
+# Directory holding the Swiss Ephemeris .se1 files (override with SWE_EPHE_PATH)
+EPHE_PATH = os.getenv("SWE_EPHE_PATH", os.path.join(backend_root, "ephe"))
+# Development escape hatch: accept the built-in Moshier ephemeris when no .se1 files exist
+ALLOW_MOSHIER = os.getenv("SWE_ALLOW_MOSHIER", "").lower() in ("1", "true", "yes")
+
+# Default flags for sidereal (Lahiri) positions used across the astrology modules
+SIDEREAL_FLAGS = swe.FLG_SWIEPH | swe.FLG_SIDEREAL | swe.FLG_NONUT
+
+AYANAMSA_NAMES = {swe.SIDM_LAHIRI: "Lahiri", swe.SIDM_RAMAN: "Raman", swe.SIDM_KRISHNAMURTI: "Krishnamurti"}
+
+
+class EphemerisError(RuntimeError):
+    """Raised when the Swiss Ephemeris data files are missing or unusable."""
+
+
+# Swiss Ephemeris keeps its ephemeris path and sidereal mode in process-global
+# state. Every call that depends on it runs under this lock with the settings
+# of its EphemerisContext applied, so threads with different settings cannot
+# interleave. Only the ephemeris calls are serialised; the rest of the chart
+# work runs concurrently.
+_SWE_LOCK = threading.RLock()
+_applied_settings = None
+# Settings in force before each open context, restored when it exits
+_outer_settings = []
+_verified_paths = set()
+
+
+def _reset_after_fork():
+    # A forked worker may inherit the lock held by another thread of the parent
+    global _SWE_LOCK, _applied_settings, _outer_settings
+    _SWE_LOCK = threading.RLock()
+    _applied_settings = None
+    _outer_settings = []
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _apply(settings):
+    global _applied_settings
+    ephe_path, sid_mode = settings
+    swe.set_ephe_path(ephe_path)
+    swe.set_sid_mode(sid_mode, 0.0, 0.0)
+    _applied_settings = settings
+
+
+class EphemerisContext:
+    """
+    Ayanamsa, ephemeris path and flags for a block of Swiss Ephemeris calls.
+
+        with EphemerisContext() as ctx:
+            swe.houses(...)
+            swe.calc_ut(jd, swe.MOON, ctx.flags)
+
+    Entering a context takes the process-wide ephemeris lock (re-entrant)
+    and applies its settings if another context changed them; leaving it
+    puts back the settings in force before, so nested contexts and plain
+    swe calls after the block see what they set up.
+    """
+
+    def __init__(self, sid_mode=swe.SIDM_LAHIRI, ephe_path=EPHE_PATH, flags=SIDEREAL_FLAGS):
+        self.sid_mode = sid_mode
+        self.ephe_path = ephe_path
+        self.flags = flags
+
+    @property
+    def ayanamsa_name(self):
+        return AYANAMSA_NAMES.get(self.sid_mode, f"SIDM {self.sid_mode}")
+
+    def __enter__(self):
+        global _applied_settings
+        _SWE_LOCK.acquire()
+        outer = _applied_settings
+        try:
+            settings = (self.ephe_path, self.sid_mode)
+            if outer != settings:
+                _apply(settings)
+                if self.ephe_path not in _verified_paths:
+                    _verify_ephemeris(self.ephe_path)
+                    _verified_paths.add(self.ephe_path)
+        except BaseException:
+            # Unusable files must fail every time, not only on the first entry
+            if outer is None:
+                _applied_settings = None
+            elif _applied_settings != outer:
+                _apply(outer)
+            _SWE_LOCK.release()
+            raise
+        _outer_settings.append(outer)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            outer = _outer_settings.pop()
+            if outer is not None and _applied_settings != outer:
+                _apply(outer)
+        finally:
+            _SWE_LOCK.release()
+        return False
+
+
+def _verify_ephemeris(path):
+    """Fails loudly instead of letting Swiss Ephemeris silently fall back to Moshier."""
+    try:
+        _, retflag = swe.calc_ut(2451545.0, swe.MOON, swe.FLG_SWIEPH)
+    except swe.Error as e:
+        raise EphemerisError(f"Swiss Ephemeris files in '{path}' are unusable: {e}") from e
+    if not retflag & swe.FLG_SWIEPH:
+        message = (f"No Swiss Ephemeris .se1 files found in '{path}'. "
+                   "Run download_ephemeris.py or set SWE_EPHE_PATH.")
+        if not ALLOW_MOSHIER:
+            raise EphemerisError(message)
+        print(f"WARNING: {message} Using the Moshier ephemeris (SWE_ALLOW_MOSHIER is set).")
+
+
+_default_context = EphemerisContext()
+
+
+def ephemeris_context():
+    """Returns the shared default context (Lahiri, bundled ephemeris files)."""
+    return _default_context
+
+
+# Column layout of the arrays returned by calc_bodies
+LON, LAT, SPEED = 0, 1, 2
+
+BODIES = {
+    "Sun": swe.SUN, "Moon": swe.MOON, "Mars": swe.MARS, "Mercury": swe.MERCURY,
+    "Jupiter": swe.JUPITER, "Venus": swe.VENUS, "Saturn": swe.SATURN,
+    "Rahu": swe.MEAN_NODE, "Ketu": swe.MEAN_NODE,
+    "Uranus": swe.URANUS, "Neptune": swe.NEPTUNE, "Pluto": swe.PLUTO
+}
+
+
+def _body_id(body):
+    if isinstance(body, str):
+        return BODIES[body]
+    return int(body)
+
+
+def calc_bodies(jds, bodies, flags=SIDEREAL_FLAGS, ut=True, context=None):
+    """
+    Computes positions for every (epoch, body) pair in a single call.
+
+    Args:
+        jds: Julian day or array of Julian days (UT when `ut` is True, otherwise ET).
+        bodies: Sequence of Swiss Ephemeris body ids or names from BODIES.
+                "Ketu" is derived from the mean node (Rahu + 180°).
+        flags: Swiss Ephemeris calculation flags. FLG_SPEED is always added.
+        ut: Use swe.calc_ut (True) or swe.calc (False).
+        context: EphemerisContext to run under (defaults to ephemeris_context()).
+    Returns:
+        numpy.ndarray of shape (n_epochs, n_bodies, 3) holding
+        longitude, latitude and longitude speed (see LON, LAT, SPEED).
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=np.float64))
+    bodies = list(bodies)
+    ids = [_body_id(b) for b in bodies]
+
+    # Each distinct body is computed once per epoch (Rahu and Ketu share the node)
+    unique_ids = list(dict.fromkeys(ids))
+    calc = swe.calc_ut if ut else swe.calc
+    calc_flags = int(flags) | swe.FLG_SPEED
+
+    with context or _default_context:
+        rows = [calc(jd, pid, calc_flags)[0] for jd in jds.tolist() for pid in unique_ids]
+    raw = np.array(rows, dtype=np.float64).reshape(jds.size, len(unique_ids), 6)
+
+    columns = [unique_ids.index(pid) for pid in ids]
+    out = raw[:, columns][:, :, (0, 1, 3)]
+
+    for j, body in enumerate(bodies):
+        if body == "Ketu":
+            out[:, j, LON] = (out[:, j, LON] + 180.0) % 360.0
+
+    return out
+
+
+def sun_moon_sidereal(jds, flags=SIDEREAL_FLAGS, context=None):
+    """
+    Returns (sun_lon, moon_lon) arrays of sidereal longitudes for the given UT Julian days.
+    Served from the precomputed Sun/Moon table when it is built for the ayanamsa of
+    `context` (defaults to ephemeris_context()) and covers the dates.
+    """
+    context = context or _default_context
+    table = get_table()
+    if table is not None and flags & swe.FLG_SIDEREAL and table.sid_mode == context.sid_mode:
+        if table.covers(jds):
+            return table.longitudes(jds)
+        if np.ndim(jds) > 0:
+            # Partly covered: only the epochs outside the table go to Swiss Ephemeris
+            jds = np.asarray(jds, dtype=np.float64)
+            inside = (jds >= table.start_jd) & (jds < table.end_jd)
+            if inside.any():
+                sun, moon = np.empty(jds.shape), np.empty(jds.shape)
+                sun[inside], moon[inside] = table.longitudes(jds[inside])
+                pos = calc_bodies(jds[~inside], (swe.SUN, swe.MOON), flags, context=context)
+                sun[~inside], moon[~inside] = pos[:, 0, LON], pos[:, 1, LON]
+                return sun, moon
+    pos = calc_bodies(jds, (swe.SUN, swe.MOON), flags, context=context)
+    return pos[:, 0, LON], pos[:, 1, LON]
@@ -0,0 +1,193 @@
+"""
+Precomputed sidereal (Lahiri) Sun/Moon longitude table.
+
+Tithi, nakshatra, yoga and karana only depend on the sidereal Sun and Moon
+longitudes, so bulk panchang/festival scans read them from a compact binary
+table instead of calling Swiss Ephemeris.
+
+The table stores Chebyshev coefficients of the unwrapped longitudes over
+fixed segments (default 4 days, degree 10). With those defaults the
+interpolation error against Swiss Ephemeris is below 0.001 arcsecond for
+both bodies; the exact maximum measured while building is stored in the
+header (see SunMoonTable.max_error_arcsec). That is far below the
+precision of the ephemeris itself and a few thousandths of a second of
+time for tithi/nakshatra boundaries.
+
+Build (from the backend directory):
+    python -m astrology.ephemeris_table --start 1900 --end 2100
+
+The reader memory-maps the file, so loading takes milliseconds and all
+worker processes share the same pages.
+"""
+import argparse
+import os
+import struct
+import time
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_root = os.path.dirname(current_dir)
+DEFAULT_TABLE_PATH = os.getenv(
+    "SUN_MOON_TABLE_PATH", os.path.join(backend_root, "ephe", "sun_moon_lahiri.bin")
+)
+
+MAGIC = b"SMCHEB01"
+# magic, start_jd, segment_days, n_segments, degree, sid_mode, max_err_sun, max_err_moon
+HEADER = struct.Struct("<8sddqqqdd")
+HEADER_SIZE = 64
+
+SUN, MOON = 0, 1
+
+
+class SunMoonTable:
+    """Read-only, memory-mapped Sun/Moon Chebyshev table."""
+
+    def __init__(self, path=DEFAULT_TABLE_PATH):
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        (magic, self.start_jd, self.segment_days, self.n_segments,
+         self.degree, self.sid_mode, err_sun, err_moon) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Sun/Moon table")
+
+        self.path = path
+        self.end_jd = self.start_jd + self.n_segments * self.segment_days
+        self.max_error_arcsec = {"Sun": err_sun, "Moon": err_moon}
+        self.coeffs = np.memmap(
+            path, dtype="<f8", mode="r", offset=HEADER_SIZE,
+            shape=(self.n_segments, 2, self.degree + 1)
+        )
+
+    def covers(self, jds):
+        if np.ndim(jds) == 0:
+            return self.start_jd <= jds < self.end_jd
+        jds = np.asarray(jds)
+        return bool(np.all((jds >= self.start_jd) & (jds < self.end_jd)))
+
+    def _segments(self, jds):
+        jds = np.atleast_1d(np.asarray(jds, dtype=np.float64))
+        if not self.covers(jds):
+            raise ValueError(f"Julian day outside table range {self.start_jd}-{self.end_jd}")
+        return _segment_lookup(self.coeffs, self.start_jd, self.segment_days, jds)
+
+    def longitudes(self, jds):
+        """Returns (sun_lon, moon_lon) arrays in degrees [0, 360)."""
+        if np.ndim(jds) == 0:
+            # Scalar queries dominate the panchang code; skip the array machinery
+            sun, moon = self.longitudes_at(float(jds))
+            return np.array([sun]), np.array([moon])
+        c, x = self._segments(jds)
+        lon = _clenshaw(c, x) % 360.0
+        return lon[:, SUN], lon[:, MOON]
+
+    def longitudes_at(self, jd):
+        """Returns (sun_lon, moon_lon) floats for a single Julian day."""
+        if not self.start_jd <= jd < self.end_jd:
+            raise ValueError(f"Julian day outside table range {self.start_jd}-{self.end_jd}")
+        pos = (jd - self.start_jd) / self.segment_days
+        idx = min(int(pos), self.n_segments - 1)
+        x = 2.0 * (pos - idx) - 1.0
+        sun_c, moon_c = self.coeffs[idx].tolist()
+        return _clenshaw_scalar(sun_c, x) % 360.0, _clenshaw_scalar(moon_c, x) % 360.0
+
+
+def _segment_lookup(coeffs, start_jd, segment_days, jds):
+    """Returns the coefficients of the segment holding each jd and the local x in [-1, 1]."""
+    pos = (jds - start_jd) / segment_days
+    idx = np.minimum(pos.astype(np.int64), len(coeffs) - 1)
+    x = 2.0 * (pos - idx) - 1.0
+    return np.asarray(coeffs[idx]), x
+
+
+def _clenshaw(c, x):
+    """Evaluates Chebyshev series c[n, body, k] at x[n] for every body."""
+    x = x[:, None]
+    b1 = np.zeros(c.shape[:2])
+    b2 = np.zeros(c.shape[:2])
+    for k in range(c.shape[2] - 1, 0, -1):
+        b1, b2 = 2.0 * x * b1 - b2 + c[:, :, k], b1
+    return x * b1 - b2 + c[:, :, 0]
+
+
+def _clenshaw_scalar(c, x):
+    b1 = b2 = 0.0
+    for k in range(len(c) - 1, 0, -1):
+        b1, b2 = 2.0 * x * b1 - b2 + c[k], b1
+    return x * b1 - b2 + c[0]
+
+
+_table = None
+_table_checked = False
+
+
+def get_table():
+    """Returns the shared table, or None when it has not been built."""
+    global _table, _table_checked
+    if not _table_checked:
+        _table_checked = True
+        if os.path.exists(DEFAULT_TABLE_PATH):
+            try:
+                _table = SunMoonTable(DEFAULT_TABLE_PATH)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring Sun/Moon table {DEFAULT_TABLE_PATH}: {e}")
+    return _table
+
+
+def build_table(path, start_year=1900, end_year=2100, segment_days=4.0, degree=10):
+    """Fits Chebyshev segments to Swiss Ephemeris longitudes and writes the table."""
+    import swisseph as swe
+    from astrology.ephemeris import calc_bodies, SIDEREAL_FLAGS, LON
+
+    start_jd = swe.julday(start_year, 1, 1, 0.0)
+    end_jd = swe.julday(end_year + 1, 1, 1, 0.0)
+    n_segments = int(np.ceil((end_jd - start_jd) / segment_days))
+
+    k = np.arange(degree + 1)
+    nodes = np.cos(np.pi * (k + 0.5) / (degree + 1))
+    seg_starts = start_jd + np.arange(n_segments) * segment_days
+
+    jds = (seg_starts[:, None] + (nodes[None, :] + 1.0) * segment_days / 2.0).ravel()
+    lon = calc_bodies(jds, (swe.SUN, swe.MOON), SIDEREAL_FLAGS)[:, :, LON]
+    lon = lon.reshape(n_segments, degree + 1, 2)
+    lon = np.degrees(np.unwrap(np.radians(lon), axis=1))
+
+    coeffs = np.empty((n_segments, 2, degree + 1))
+    for body in (SUN, MOON):
+        # Least squares on degree+1 Chebyshev nodes is exact interpolation
+        coeffs[:, body, :] = np.polynomial.chebyshev.chebfit(nodes, lon[:, :, body].T, degree).T
+
+    # Measure interpolation error at points between the fitting nodes
+    check = seg_starts[:, None] + np.array([0.25, 0.5, 0.75]) * segment_days
+    check = check.ravel()
+    truth = calc_bodies(check, (swe.SUN, swe.MOON), SIDEREAL_FLAGS)[:, :, LON]
+
+    c, x = _segment_lookup(coeffs, start_jd, segment_days, check)
+    approx = _clenshaw(c, x)
+    err = [float(np.max(np.abs((approx[:, body] - truth[:, body] + 180.0) % 360.0 - 180.0)) * 3600.0)
+           for body in (SUN, MOON)]
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, start_jd, segment_days, n_segments, degree,
+                            swe.SIDM_LAHIRI, err[SUN], err[MOON]).ljust(HEADER_SIZE, b"\0"))
+        f.write(coeffs.astype("<f8").tobytes())
+    return err
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Sun/Moon sidereal longitude table.")
+    parser.add_argument("--start", type=int, default=1900, help="First year covered")
+    parser.add_argument("--end", type=int, default=2100, help="Last year covered")
+    parser.add_argument("--segment-days", type=float, default=4.0)
+    parser.add_argument("--degree", type=int, default=10)
+    parser.add_argument("--output", default=DEFAULT_TABLE_PATH)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    err_sun, err_moon = build_table(args.output, args.start, args.end, args.segment_days, args.degree)
+    print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes) in {time.perf_counter() - t0:.1f}s")
+    print(f"Max interpolation error: Sun {err_sun:.6f}\", Moon {err_moon:.6f}\"")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Index of sankrantis (sidereal solar ingresses), new moons, full moons and
+the equinoxes and solstices (tropical ingresses into 0/90/180/270 degrees).
+
+The exact times of every event in a range of years are computed once and
+kept in sorted arrays, so lunar month, sankranti and adhik maas questions
+become bisect lookups instead of fresh ephemeris iterations.
+
+Every day of the range is sampled to bracket the events, then all of them
+are refined together with a vectorised regula falsi to a few milliseconds
+of time. A decade takes a few milliseconds with the Sun/Moon table built
+and around half a second on Swiss Ephemeris alone.
+
+The shared index may cover EVENT_INDEX_START_YEAR..EVENT_INDEX_END_YEAR
+(default 1900-2100). It is built lazily, EVENT_INDEX_BLOCK_YEARS at a time,
+for the years actually asked for; a date outside it raises ValueError.
+"""
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+import numpy as np
+import swisseph as swe
+
+from astrology.ephemeris import LON, calc_bodies, ephemeris_context, sun_moon_sidereal
+from astrology.root_finding import crossings, refine
+
+EVENT_INDEX_START_YEAR = int(os.getenv("EVENT_INDEX_START_YEAR", "1900"))
+EVENT_INDEX_END_YEAR = int(os.getenv("EVENT_INDEX_END_YEAR", "2100"))
+EVENT_INDEX_BLOCK_YEARS = int(os.getenv("EVENT_INDEX_BLOCK_YEARS", "10"))
+
+# Lookups reach back to the previous new moon and sankranti (and ahead to the next)
+LOOKUP_MARGIN_DAYS = 70.0
+
+# Lunar months, named after the sign the Sun enters during the month
+LUNAR_MONTHS = [
+    "Chaitra", "Vaisakha", "Jyeshtha", "Ashadha", "Shravana", "Bhadrapada",
+    "Ashvina", "Kartika", "Margashirsha", "Pausha", "Magha", "Phalguna"
+]
+
+
+def _sun_angle(jds, idx=None):
+    return sun_moon_sidereal(jds)[0]
+
+
+def _tropical_sun(jds, idx=None):
+    return calc_bodies(jds, (swe.SUN,), swe.FLG_SWIEPH)[:, 0, LON]
+
+
+def _ayanamsa(jds):
+    """Ayanamsa at sorted jds, interpolated between yearly values (it moves ~50" a year)."""
+    knots = np.arange(jds[0], jds[-1] + 365.25, 365.25)
+    with ephemeris_context():
+        values = [swe.get_ayanamsa_ut(jd) for jd in knots.tolist()]
+    return np.interp(jds, knots, values)
+
+
+def _elongation(jds, idx=None):
+    sun, moon = sun_moon_sidereal(jds)
+    return (moon - sun) % 360.0
+
+
+class EventIndex:
+    """Sorted event times (UT Julian days) between two years."""
+
+    def __init__(self, start_year=EVENT_INDEX_START_YEAR, end_year=EVENT_INDEX_END_YEAR):
+        self.start_year = start_year
+        self.end_year = end_year
+        # A month of margin so the first/last month of the range has both ends
+        self.start_jd = swe.julday(start_year, 1, 1, 0.0)
+        self.end_jd = swe.julday(end_year + 1, 1, 1, 0.0)
+
+        jds = np.arange(self.start_jd - 35.0, self.end_jd + 35.0, 1.0)
+        sun, moon = sun_moon_sidereal(jds)
+        elongation = (moon - sun) % 360.0
+
+        i = crossings(sun, 30.0)
+        signs = (sun[i + 1] // 30.0).astype(np.int64)
+        self.sankrantis = refine(_sun_angle, signs * 30.0, jds[i], jds[i + 1]).tolist()
+        self.sankranti_signs = signs.tolist()
+
+        # Brackets from the sidereal samples (off by nutation, minutes of time), refined on
+        # the true tropical Sun
+        tropical = (sun + _ayanamsa(jds)) % 360.0
+        i = crossings(tropical, 90.0)
+        quarters = (tropical[i + 1] // 90.0).astype(np.int64)
+        self.seasons = refine(_tropical_sun, quarters * 90.0, jds[i] - 1.0, jds[i + 1] + 1.0).tolist()
+        self.season_quarters = quarters.tolist()
+
+        i = crossings(elongation, 180.0)
+        new = elongation[i + 1] < 180.0
+        targets = np.where(new, 0.0, 180.0)
+        times = refine(_elongation, targets, jds[i], jds[i + 1])
+        self.new_moons = times[new].tolist()
+        self.full_moons = times[~new].tolist()
+
+    def joined(self, later):
+        """A new index covering this one and `later`, which must start the year after it ends."""
+        if later.start_year != self.end_year + 1:
+            raise ValueError(f"Event indexes {self.start_year}-{self.end_year} and "
+                             f"{later.start_year}-{later.end_year} are not contiguous")
+        joined = EventIndex.__new__(EventIndex)
+        joined.start_year, joined.start_jd = self.start_year, self.start_jd
+        joined.end_year, joined.end_jd = later.end_year, later.end_jd
+
+        # Own events before the boundary, the later index's from it (the margins overlap)
+        a, b = bisect_left(self.sankrantis, self.end_jd), bisect_left(later.sankrantis, later.start_jd)
+        joined.sankrantis = self.sankrantis[:a] + later.sankrantis[b:]
+        joined.sankranti_signs = self.sankranti_signs[:a] + later.sankranti_signs[b:]
+        a, b = bisect_left(self.seasons, self.end_jd), bisect_left(later.seasons, later.start_jd)
+        joined.seasons = self.seasons[:a] + later.seasons[b:]
+        joined.season_quarters = self.season_quarters[:a] + later.season_quarters[b:]
+        a, b = bisect_left(self.new_moons, self.end_jd), bisect_left(later.new_moons, later.start_jd)
+        joined.new_moons = self.new_moons[:a] + later.new_moons[b:]
+        a, b = bisect_left(self.full_moons, self.end_jd), bisect_left(later.full_moons, later.start_jd)
+        joined.full_moons = self.full_moons[:a] + later.full_moons[b:]
+        return joined
+
+    def _check(self, jd):
+        if not self.start_jd <= jd < self.end_jd:
+            raise ValueError(
+                f"Julian day {jd} outside the event index ({self.start_year}-{self.end_year})"
+            )
+
+    def previous_new_moon(self, jd):
+        """Time of the last new moon at or before jd."""
+        self._check(jd)
+        return self.new_moons[bisect_right(self.new_moons, jd) - 1]
+
+    def next_new_moon(self, jd):
+        """Time of the first new moon after jd."""
+        self._check(jd)
+        return self.new_moons[bisect_right(self.new_moons, jd)]
+
+    def previous_full_moon(self, jd):
+        self._check(jd)
+        return self.full_moons[bisect_right(self.full_moons, jd) - 1]
+
+    def next_full_moon(self, jd):
+        self._check(jd)
+        return self.full_moons[bisect_right(self.full_moons, jd)]
+
+    def sun_sign_index(self, jd):
+        """Sidereal sign (0 = Aries) the Sun is in at jd."""
+        self._check(jd)
+        return self.sankranti_signs[bisect_right(self.sankrantis, jd) - 1]
+
+    def sankrantis_between(self, jd_start, jd_end):
+        """[(jd, sign_index), ...] of the ingresses in (jd_start, jd_end]."""
+        self._check(jd_start)
+        lo = bisect_right(self.sankrantis, jd_start)
+        hi = bisect_right(self.sankrantis, jd_end)
+        return list(zip(self.sankrantis[lo:hi], self.sankranti_signs[lo:hi]))
+
+    def seasons_between(self, jd_start, jd_end):
+        """[(jd, quarter), ...] of the equinoxes and solstices in (jd_start, jd_end]; quarter 0 = March equinox."""
+        self._check(jd_start)
+        lo = bisect_right(self.seasons, jd_start)
+        hi = bisect_right(self.seasons, jd_end)
+        return list(zip(self.seasons[lo:hi], self.season_quarters[lo:hi]))
+
+    def lunar_month_index(self, jd, scheme="amanta"):
+        """
+        Lunar month (0 = Chaitra) running at jd, named from the Sun's sign at
+        the new moon that starts it. With scheme="purnimanta" the month runs
+        full moon to full moon, so the dark fortnight takes the next month's name.
+        """
+        new_moon = self.previous_new_moon(jd)
+        if scheme == "purnimanta" and self.previous_full_moon(jd) > new_moon:
+            new_moon = self.next_new_moon(jd)
+        elif scheme not in ("amanta", "purnimanta"):
+            raise ValueError(f"Unknown lunar month scheme: {scheme}")
+        return (self.sun_sign_index(new_moon) + 1) % 12
+
+    def lunar_month(self, jd, scheme="amanta"):
+        return LUNAR_MONTHS[self.lunar_month_index(jd, scheme)]
+
+    def is_adhik_maas(self, jd):
+        """True when the lunar month running at jd contains no sankranti (an intercalary month)."""
+        start = self.previous_new_moon(jd)
+        end = self.next_new_moon(jd)
+        return bisect_left(self.sankrantis, end) == bisect_left(self.sankrantis, start)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _block_bounds(first_year, last_year):
+    """first_year..last_year clamped to the allowed range and widened to whole blocks."""
+    first = min(max(first_year, EVENT_INDEX_START_YEAR), EVENT_INDEX_END_YEAR)
+    last = max(min(last_year, EVENT_INDEX_END_YEAR), first)
+    first -= (first - EVENT_INDEX_START_YEAR) % EVENT_INDEX_BLOCK_YEARS
+    last += EVENT_INDEX_BLOCK_YEARS - 1 - (last - EVENT_INDEX_START_YEAR) % EVENT_INDEX_BLOCK_YEARS
+    return first, min(last, EVENT_INDEX_END_YEAR)
+
+
+def get_event_index(first_year=None, last_year=None):
+    """
+    Returns the shared index, first extended to cover first_year..last_year
+    (default: this year). Only the missing blocks are computed; years outside
+    EVENT_INDEX_START_YEAR..EVENT_INDEX_END_YEAR are never covered.
+    """
+    global _index
+    if first_year is None:
+        first_year = date.today().year
+    if last_year is None:
+        last_year = first_year
+    first, last = _block_bounds(first_year, last_year)
+    index = _index
+    if index is not None and index.start_year <= first and last <= index.end_year:
+        return index
+    with _index_lock:
+        index = _index
+        if index is None:
+            index = EventIndex(first, last)
+        if first < index.start_year:
+            index = EventIndex(first, index.start_year - 1).joined(index)
+        if last > index.end_year:
+            index = index.joined(EventIndex(index.end_year + 1, last))
+        _index = index
+    return index
+
+
+def event_index_at(jd_start, jd_end=None):
+    """The shared index, covering jd_start..jd_end and the lunar months around them."""
+    if jd_end is None:
+        jd_end = jd_start
+    first_year = swe.revjul(jd_start - LOOKUP_MARGIN_DAYS)[0]
+    last_year = swe.revjul(jd_end + LOOKUP_MARGIN_DAYS)[0]
+    return get_event_index(first_year, last_year)
@@ -0,0 +1,170 @@
+"""
+Muhurat search over a range of dates.
+
+Every constraint becomes a set of time intervals over the whole range (see
+utils/intervals.py): the allowed tithis, nakshatras, yogas and karanas from
+the limb boundaries of limb_transitions, the allowed weekdays (a vara runs
+sunrise to sunrise), Rahu Kalam / Yamaganda / Gulika to leave out, and
+Abhijit or chosen choghadiyas to stay within. The qualifying windows are
+the intersection of those sets, so a year costs one transition solve and a
+few thousand interval comparisons, not a panchang per minute.
+"""
+import os
+
+import numpy as np
+import pytz
+
+from astrology.panchang import (
+    CHOGHADIYA_NAMES, DAY_CHOGHADIYA_ORDER, GULIKA_PART, NAKSHATRAS, NIGHT_CHOGHADIYA_ORDER,
+    RAHU_KALAM_PART, TITHIS, WEEKDAYS, YAMAGANDA_PART, YOGAS, get_karana_name, jd_to_datetime,
+    range_sun_times,
+)
+from astrology.panchang_solver import limb_transitions
+from utils.intervals import intersect_all, normalize, subtract
+
+MUHURAT_MAX_DAYS = int(os.getenv("MUHURAT_MAX_DAYS", "732"))
+
+# Inauspicious eighths of the daytime that can be excluded
+EXCLUDABLE_PERIODS = {
+    "rahu_kalam": RAHU_KALAM_PART,
+    "yamaganda": YAMAGANDA_PART,
+    "gulika": GULIKA_PART,
+}
+
+LIMB_COUNTS = {"tithi": 30, "nakshatra": 27, "yoga": 27, "karana": 60}
+
+
+def _limb_names(limb, idx):
+    """Names a limb index answers to (case-folded)."""
+    if limb == "tithi":
+        paksha = "Shukla" if idx < 15 else "Krishna"
+        return {TITHIS[idx].casefold(), f"{paksha} {TITHIS[idx]}".casefold()}
+    if limb == "karana":
+        return {get_karana_name(idx).casefold()}
+    return {(NAKSHATRAS if limb == "nakshatra" else YOGAS)[idx].casefold()}
+
+
+def _allowed(limb, names):
+    """Limb indices matching the names ("Panchami" matches both pakshas, "Shukla Panchami" one)."""
+    wanted = {n.strip().casefold() for n in names}
+    indices = {i for i in range(LIMB_COUNTS[limb]) if _limb_names(limb, i) & wanted}
+    known = set().union(*(_limb_names(limb, i) for i in range(LIMB_COUNTS[limb])))
+    unknown = sorted(n for n in wanted if n not in known)
+    if unknown:
+        raise ValueError(f"Unknown {limb} name(s): {', '.join(unknown)}")
+    return indices
+
+
+def _segments(times, indices, allowed):
+    """The [boundary, next boundary) segments whose limb index is allowed."""
+    keep = np.isin(indices[:-1], list(allowed))
+    return normalize(zip(times[:-1][keep].tolist(), times[1:][keep].tolist()))
+
+
+def _name_list(names, valid, what):
+    wanted = [n.strip().casefold() for n in names]
+    lookup = {v.casefold(): i for i, v in enumerate(valid)}
+    unknown = [n for n in wanted if n not in lookup]
+    if unknown:
+        raise ValueError(f"Unknown {what}: {', '.join(unknown)}")
+    return {lookup[n] for n in wanted}
+
+
+def find_muhurat(start_str, end_str, lat, lon, timezone_str=None, tithis=None, nakshatras=None,
+                 yogas=None, karanas=None, weekdays=None, exclude=(), require_abhijit=False,
+                 choghadiyas=None, min_minutes=0):
+    """
+    Windows between sunrise of start_str and the sunrise after end_str
+    ("YYYY-MM-DD", inclusive) that satisfy every given constraint:
+
+        tithis, nakshatras, yogas, karanas: allowed names (None = any)
+        weekdays: allowed vara names, e.g. ["Monday", "Thursday"]
+        exclude: any of EXCLUDABLE_PERIODS
+        require_abhijit: only inside Abhijit muhurat
+        choghadiyas: only inside these (day or night) choghadiyas
+        min_minutes: drop shorter windows
+
+    Returns {"timezone", "windows": [{"start", "end", "minutes", "date",
+    "weekday", "tithi", "nakshatra", "yoga", "karana"}, ...]}; the limb
+    names are those running at the start of the window.
+    """
+    days, rises, sets, timezone_str = range_sun_times(start_str, end_str, lat, lon, timezone_str, MUHURAT_MAX_DAYS)
+    local_tz = pytz.timezone(timezone_str)
+    sunrise, next_sunrise = rises[:-1], rises[1:]
+    weekday = [d.weekday() for d in days[:-1]]
+    day_eighth = (sets - sunrise) / 8.0
+    night_eighth = (next_sunrise - sets) / 8.0
+
+    transitions = limb_transitions(rises[0], rises[-1], enclose=True)
+    sets_to_meet = [[(float(rises[0]), float(rises[-1]))]]
+
+    for limb, names in (("tithi", tithis), ("nakshatra", nakshatras), ("yoga", yogas), ("karana", karanas)):
+        if names:
+            sets_to_meet.append(_segments(*transitions[limb], _allowed(limb, names)))
+
+    if weekdays:
+        allowed = _name_list(weekdays, WEEKDAYS, "weekday(s)")
+        sets_to_meet.append(normalize(
+            (float(sunrise[i]), float(next_sunrise[i])) for i, w in enumerate(weekday) if w in allowed
+        ))
+
+    if require_abhijit:
+        muhurta = (sets - sunrise) / 15.0
+        sets_to_meet.append(normalize(zip((sunrise + 7 * muhurta).tolist(), (sunrise + 8 * muhurta).tolist())))
+
+    if choghadiyas:
+        allowed = _name_list(choghadiyas, CHOGHADIYA_NAMES, "choghadiya(s)")
+        periods = []
+        for i, w in enumerate(weekday):
+            for k in range(8):
+                if DAY_CHOGHADIYA_ORDER[w][k] in allowed:
+                    start = sunrise[i] + k * day_eighth[i]
+                    periods.append((float(start), float(start + day_eighth[i])))
+                if NIGHT_CHOGHADIYA_ORDER[w][k] in allowed:
+                    start = sets[i] + k * night_eighth[i]
+                    periods.append((float(start), float(start + night_eighth[i])))
+        sets_to_meet.append(normalize(periods))
+
+    windows = intersect_all(sets_to_meet)
+
+    excluded = []
+    for period in exclude or ():
+        if period not in EXCLUDABLE_PERIODS:
+            raise ValueError(f"Cannot exclude '{period}', expected one of {', '.join(EXCLUDABLE_PERIODS)}")
+        parts = EXCLUDABLE_PERIODS[period]
+        for i, w in enumerate(weekday):
+            start = sunrise[i] + parts[w] * day_eighth[i]
+            excluded.append((float(start), float(start + day_eighth[i])))
+    if excluded:
+        windows = subtract(windows, normalize(excluded))
+
+    if min_minutes:
+        windows = [(s, e) for s, e in windows if (e - s) * 1440.0 >= min_minutes]
+
+    return {"timezone": timezone_str, "windows": _describe(windows, days, rises, transitions, local_tz)}
+
+
+def _describe(windows, days, rises, transitions, local_tz):
+    if not windows:
+        return []
+    starts = np.array([s for s, _ in windows])
+    day_idx = np.searchsorted(rises, starts, side="right") - 1
+    running = {
+        limb: transitions[limb][1][np.searchsorted(transitions[limb][0], starts, side="right") - 1]
+        for limb in LIMB_COUNTS
+    }
+    out = []
+    for k, (start, end) in enumerate(windows):
+        tithi = int(running["tithi"][k])
+        out.append({
+            "start": jd_to_datetime(start, local_tz).isoformat(),
+            "end": jd_to_datetime(end, local_tz).isoformat(),
+            "minutes": round((end - start) * 1440.0, 1),
+            "date": days[day_idx[k]].isoformat(),
+            "weekday": WEEKDAYS[days[day_idx[k]].weekday()],
+            "tithi": f"{'Shukla' if tithi < 15 else 'Krishna'} {TITHIS[tithi]}",
+            "nakshatra": NAKSHATRAS[int(running["nakshatra"][k])],
+            "yoga": YOGAS[int(running["yoga"][k])],
+            "karana": get_karana_name(int(running["karana"][k])),
+        })
+    return out
@@ -3,6 +3,8 @@ from geopy.geocoders import Nominatim ,Photon
 from timezonefinder import TimezoneFinder
 import pytz
 from datetime import datetime, timedelta
+from astrology.Dasha import vimshottari_engine as dasha_engine
+from astrology.Dasha.vimshottari_engine import ordinal_to_datetime
 
 # --- Configuration ---
 try:
@@ -282,46 +284,22 @@ def get_rashi_from_nakshatra_pada(nakshatra_num, pada_num):
 # need to be correct as per the Indian Astrology
 def calculate_vimshottari_dasha(moon_long_sidereal, dob_datetime_obj): 
     """
-    Calculates the Vimshottari Mahadasha sequence.
+    Calculates the Vimshottari Mahadasha sequence (see astrology.Dasha.vimshottari_engine).
     Args:
         moon_long_sidereal (float): Moon's sidereal longitude at birth.
         dob_datetime_obj (datetime.datetime): UTC datetime object of birth.
     Returns:
         tuple: (current_dasha_lord, years_left_in_current_dasha, full_dasha_sequence)
     """
-    moon_long_sidereal = moon_long_sidereal % 360
-
-    nakshatra_deg_span = 360 / 27 
-    nak_index = int(moon_long_sidereal // nakshatra_deg_span) 
-    
-    current_dasha_lord = DASH_ORDER[nak_index % 9]
-    
-    deg_into_nakshatra = moon_long_sidereal % nakshatra_deg_span
-    deg_remaining_in_nakshatra = nakshatra_deg_span - deg_into_nakshatra
-    
-    percent_remaining_in_nakshatra = deg_remaining_in_nakshatra / nakshatra_deg_span
-    
-    total_years_of_current_dasha = DASH_YEARS[current_dasha_lord]
-    
-    years_left_in_current_dasha = percent_remaining_in_nakshatra * total_years_of_current_dasha
-    
-    years_passed_in_current_dasha = total_years_of_current_dasha - years_left_in_current_dasha
-    
-    start_date_current_mahadasha = dob_datetime_obj - timedelta(days=years_passed_in_current_dasha * 365.25)
-
-    sequence = []
-    start_idx = DASH_ORDER.index(current_dasha_lord)
-    
-    current_cycle_start_date = start_date_current_mahadasha
-    
-    for i in range(9): # Generate one full cycle of 9 dashas
-        dasha_lord = DASH_ORDER[(start_idx + i) % 9]
-        years = DASH_YEARS[dasha_lord]
-        dasha_end_date = current_cycle_start_date + timedelta(days=years * 365.25)
-        sequence.append((dasha_lord, current_cycle_start_date.date(), dasha_end_date.date()))
-        current_cycle_start_date = dasha_end_date
-        
-    return current_dasha_lord, years_left_in_current_dasha, sequence
+    lord, elapsed = dasha_engine.birth_balance(moon_long_sidereal)
+    years_left_in_current_dasha = (1 - elapsed) * dasha_engine.YEARS[lord]
+
+    # One full cycle of 9 dashas, from the one running at birth
+    sequence = [
+        (dasha_engine.LORDS[dasha_lord], ordinal_to_datetime(start).date(), ordinal_to_datetime(end).date())
+        for dasha_lord, start, end in dasha_engine.mahadashas(dob_datetime_obj.replace(tzinfo=None), moon_long_sidereal)
+    ]
+    return dasha_engine.LORDS[lord], years_left_in_current_dasha, sequence
 
 #Karna finnding logic (no need to change working properly)
 def get_karan(moon_long_sidereal, sun_long_sidereal):
@@ -1,16 +1,10 @@
 import swisseph as swe
-from geopy.geocoders import Nominatim ,Photon
-from timezonefinder import TimezoneFinder
 import pytz
 from datetime import datetime, timedelta
+from astrology.chart_snapshot import build_chart_snapshot
+from astrology.ephemeris import ephemeris_context
+
 
-# --- Configuration ---
-try:
-    swe.set_ephe_path('ephe') # Try relative path first
-except Exception as e:
-    print(f"Error setting ephemeris path to 'ephe': {e}")
-    print("Please set swe.set_ephe_path('FULL_PATH_TO_YOUR_SWEPH_EPHE_FOLDER') manually.")
-    
 NAKSHATRA_NAMES = [
     "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra", "Punarvasu",
     "Pushya", "Ashlesha", "Magha", "Purva Phalguni", "Uttara Phalguni", "Hasta",
@@ -1460,81 +1454,22 @@ DOB = "2019-12-08"
 TOB = "23:59"
 LOCATION = "Surat ,Gujarat"
 
-def final_astro_report(DOB:str,TOB:str,LOCATION:str)->dict:
-    # ----- Get Geolocation -----
-    try:
-        geolocator = Nominatim(user_agent="vedic_astrology_app", timeout=10)
-        location = geolocator.geocode(LOCATION)
-        if not location:
-            raise Exception("Nominatim failed")
-    except Exception:
-        geolocator = Photon(user_agent="vedic_astrology_app", timeout=10)
-        location = geolocator.geocode(LOCATION)
-
-    if not location:
-        raise ValueError(f"Could not find location for '{LOCATION}'")
-
-    lat, lon = location.latitude, location.longitude
-
-    # ----- Get Timezone and Local Time to UTC -----
-    tf = TimezoneFinder()
-    timezone_str = tf.timezone_at(lat=lat, lng=lon)
-    if not timezone_str:
-        raise ValueError(f"Could not find timezone for Latitude: {lat}, Longitude: {lon}")
-    local_tz = pytz.timezone(timezone_str)
-
-    naive_dt = datetime.strptime(f"{DOB} {TOB}", "%Y-%m-%d %H:%M")
-    local_dt = local_tz.localize(naive_dt, is_dst=None)
-    utc_dt = local_dt.astimezone(pytz.utc)
-
-    # Calculate Julian Day for UTC time
-    jd = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
-                    utc_dt.hour + utc_dt.minute / 60.0 + utc_dt.second / 3600.0)
+def final_astro_report(DOB:str,TOB:str,LOCATION:str,snapshot=None,lat=None,lon=None,timezone=None)->dict:
+    # ----- Geolocation, timezone and Julian Day from the shared chart snapshot -----
+    # (lat/lon/timezone skip geocoding LOCATION)
+    if snapshot is None:
+        snapshot = build_chart_snapshot(DOB, TOB, LOCATION, timezone, lat=lat, lon=lon)
 
-    # --- Ayanamsa Setup ---
-    ayanamsa_flag_for_calc = 0 
-    ayanamsa_used_display = "Unknown / Default" 
+    lat, lon = snapshot.latitude, snapshot.longitude
+    timezone_str = snapshot.timezone
+    utc_dt = snapshot.utc_dt
+    jd = snapshot.jd
 
-   
-
-
-    try:
-        if hasattr(swe, 'AYANAMSA_LAHIRI') and callable(getattr(swe, 'set_ayanamsa_arc', None)):
-            swe.set_ayanamsa_arc(swe.AYANAMSA_LAHIRI)
-            ayanamsa_used_display = "Lahiri (via swe.set_ayanamsa_arc)"
-        else:
-            print("\nWARNING: Modern Ayanamsa setting functions (swe.set_ayanamsa_arc, swe.AYANAMSA_LAHIRI) not found.")
-            print("This indicates your pyswisseph version is outdated.")
-            print("Attempting to use legacy Ayanamsa flag directly in swe.calc (assuming Lahiri = 2).")
-            ayanamsa_flag_for_calc = 2 
-            ayanamsa_used_display = "Lahiri (via legacy direct flag)"
-    except AttributeError as e:
-        print(f"\nCRITICAL WARNING: Encountered AttributeError during Ayanamsa setup: {e}")
-        print("Your pyswisseph library is severely outdated.")
-        print("Please run: pip install --upgrade pyswisseph")
-        print("If error persists after upgrade, verify your Python environment.")
-        ayanamsa_flag_for_calc = 2 
-        ayanamsa_used_display = "Lahiri (via forced legacy flag due to error)"
+    # --- Ayanamsa (set once by the ephemeris context, never mutated here) ---
+    ayanamsa_used_display = ephemeris_context().ayanamsa_name
 
     # ----- Planet Positions (Sidereal) -----
-    planets_ids = {
-        "Sun": swe.SUN, "Moon": swe.MOON, "Mars": swe.MARS, "Mercury": swe.MERCURY,
-        "Jupiter": swe.JUPITER, "Venus": swe.VENUS, "Saturn": swe.SATURN,
-        "Rahu": swe.MEAN_NODE, "Ketu": swe.MEAN_NODE
-    }
-    planet_positions_sidereal = {}
-
-    flags = swe.FLG_SWIEPH | swe.FLG_SIDEREAL | ayanamsa_flag_for_calc | swe.FLG_NONUT
-
-    for name, pid in planets_ids.items():
-        if name == "Ketu":
-            pos_rahu = swe.calc(jd, swe.MEAN_NODE, flags)
-            rahu_lon = pos_rahu[0][0]
-            ketu_lon = (rahu_lon + 180) % 360
-            planet_positions_sidereal["Ketu"] = (ketu_lon, pos_rahu[0][1], pos_rahu[0][2])
-        else:
-            pos = swe.calc(jd, pid, flags)[0]
-            planet_positions_sidereal[name] = pos
+    planet_positions_sidereal = dict(snapshot.bodies)
 
 
     # ----- Panchang Calculations -----
@@ -1549,9 +1484,6 @@ def final_astro_report(DOB:str,TOB:str,LOCATION:str)->dict:
     nakshatra_idx_0based, nakshatra_index_1based, nakshatra_name, nakshatra_pada, nakshtra_all_details = get_nakshatra_info(moon_long_sidereal)
     moon_sign_rashi = get_rashi_from_nakshatra_pada(nakshatra_index_1based, nakshatra_pada)
 
-    # ----- Ascendant and Houses -----
-    cusps, ascmc = swe.houses(jd, lat, lon, b'A') 
-
     output = {
         "DOB":DOB,
         "TOB" :TOB,
@@ -1,17 +1,11 @@
+import os
 import swisseph as swe
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
-from timezonefinder import TimezoneFinder
-import os
-
-current_dir = os.path.dirname(os.path.abspath(__file__))
-backend_root = os.path.dirname(current_dir)
-ephe_path = os.path.join(backend_root, 'ephe')
-
-if os.path.exists(ephe_path):
-    swe.set_ephe_path(ephe_path)
-else:
-    swe.set_ephe_path('')
+from astrology.panchang_solver import day_transitions, limb_transitions
+from astrology.sun_times import dates_sun_times, sun_times_range
+from geocoding.timezones import timezone_at
 
 NAKSHATRAS = [
     "Ashwini", "Bharani", "Krittika", "Rohini", "Mrigashira", "Ardra",
@@ -38,6 +32,8 @@ YOGAS = [
     "Brahma", "Indra", "Vaidhriti"
 ]
 
+CHARA_KARANAS = ["Bava", "Balava", "Kaulava", "Taitila", "Garija", "Vanija", "Vishti"]
+
 CHOGHADIYA_NAMES = ["Udvega", "Amrita", "Labha", "Chara", "Roga", "Kaal", "Shubha"]
 CHOGHADIYA_QUALITY = {
     "Udvega": "Bad", "Amrita": "Best", "Labha": "Gain",
@@ -56,72 +52,20 @@ NIGHT_CHOGHADIYA_ORDER = {
     6: [6, 1, 3, 4, 5, 2, 0, 6]
 }
 
-def get_julian_day(dt):
-    return float(swe.julday(dt.year, dt.month, dt.day, dt.hour + dt.minute/60 + dt.second/3600))
-
-def normalize_degrees(deg):
-    return float(deg % 360.0)
+# Eighth of the daytime (from sunrise, 0-based) of Rahu Kalam, Yamaganda and Gulika, by weekday (Monday = 0)
+RAHU_KALAM_PART = {0: 1, 1: 6, 2: 4, 3: 5, 4: 3, 5: 2, 6: 7}
+YAMAGANDA_PART = {0: 3, 1: 2, 2: 1, 3: 0, 4: 6, 5: 5, 6: 4}
+GULIKA_PART = {0: 5, 1: 4, 2: 3, 3: 2, 4: 1, 5: 0, 6: 6}
 
-def get_planet_pos(jd, planet_id):
-    flags = swe.FLG_SWIEPH | swe.FLG_SIDEREAL | swe.FLG_NONUT
-    res = swe.calc_ut(float(jd), int(planet_id), flags)
-    return float(res[0][0])
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
-def get_nakshatra_info(jd):
-    lon = get_planet_pos(jd, swe.MOON)
-    index = int(lon / (360.0/27.0))
-    return NAKSHATRAS[index % 27], index, lon
+PANCHANG_RANGE_MAX_DAYS = int(os.getenv("PANCHANG_RANGE_MAX_DAYS", "366"))
 
-def get_tithi_info(jd):
-    try:
-        s_lon = get_planet_pos(jd, swe.SUN)
-        m_lon = get_planet_pos(jd, swe.MOON)
-        diff = normalize_degrees(m_lon - s_lon)
-        tithi_num = int(diff / 12.0) + 1
-        tithi_name = TITHIS[(tithi_num - 1) % 30]
-    except Exception as e:
-        print("Error in get_tithi_info:", e)
-        raise e
-    return tithi_name, tithi_num, diff
-
-def get_sunrise_sunset(jd_ut, lat, lon):
-    geopos = (lon, lat, 0.0)  # longitude, latitude, altitude (meters)
-
-    # Flags:
-    # CALC_RISE / CALC_SET → sunrise/sunset
-    # BIT_DISC_CENTER     → visible solar disc
-    rsmi_rise = swe.CALC_RISE | swe.BIT_DISC_CENTER
-    rsmi_set  = swe.CALC_SET  | swe.BIT_DISC_CENTER
-
-    atpress = 1013.25  # standard pressure (hPa)
-    attemp = 15.0      # standard temperature (°C)
+# Unix epoch as a Julian day
+UNIX_EPOCH_JD = 2440587.5
 
-    try:
-        rise = swe.rise_trans(
-            jd_ut,
-            swe.SUN,
-            rsmi_rise,
-            geopos,
-            atpress,
-            attemp,
-            swe.FLG_SWIEPH
-        )
-
-        set_ = swe.rise_trans(
-            jd_ut,
-            swe.SUN,
-            rsmi_set,
-            geopos,
-            atpress,
-            attemp,
-            swe.FLG_SWIEPH
-        )
-
-        return rise[1][0], set_[1][0]
-
-    except swe.Error as e:
-        print("Swiss Ephemeris sunrise/sunset error:", e)
-        return jd_ut, jd_ut + 0.5
+def get_julian_day(dt):
+    return float(swe.julday(dt.year, dt.month, dt.day, dt.hour + dt.minute/60 + dt.second/3600))
 
 def jd_to_datetime(jd, tz):
     y, m, d, h = swe.revjul(float(jd))
@@ -132,23 +76,60 @@ def jd_to_datetime(jd, tz):
     dt_utc = datetime(y, m, d, h_int, m_int, s_int, tzinfo=pytz.utc)
     return dt_utc.astimezone(tz)
 
-def find_end_time(jd_start, func, current_val):
-    jd = float(jd_start)
-    step = 1.0/1440.0
-    for _ in range(2880):
-        jd += step
-        new_val, _, _ = func(jd)
-        if new_val != current_val:
-            return float(jd)
-    return float(jd)
+def get_karana_name(karana_idx):
+    """Karana name from its 0-based index (0-59) in the lunar month."""
+    if karana_idx == 0:
+        return "Kimstughna"
+    if karana_idx <= 56:
+        return CHARA_KARANAS[(karana_idx - 1) % 7]
+    return ["Shakuni", "Chatushpada", "Naga"][karana_idx - 57]
+
+LIMB_NAMES = {
+    "tithi": lambda i: TITHIS[i % 30],
+    "nakshatra": lambda i: NAKSHATRAS[i % 27],
+    "yoga": lambda i: YOGAS[i % 27],
+    "karana": get_karana_name,
+}
+
+def get_limb_transitions(rise_jd, next_rise_jd, local_tz):
+    """
+    Every tithi, nakshatra, yoga and karana segment from sunrise to the next
+    sunrise, as {limb: [{"name", "start", "end"}, ...]}; the first segment
+    is the one running at sunrise.
+    """
+    segments = day_transitions(rise_jd, next_rise_jd)
+    return {
+        limb: [
+            {
+                "name": LIMB_NAMES[limb](idx),
+                "start": jd_to_datetime(start_jd, local_tz).isoformat(),
+                "end": jd_to_datetime(end_jd, local_tz).isoformat(),
+            }
+            for idx, start_jd, end_jd in segments[limb]
+        ]
+        for limb in LIMB_NAMES
+    }
+
+def get_limb_timings(rise_jd, next_rise_jd, local_tz, transitions=None):
+    """Start/end times of the five panchang limbs running at sunrise."""
+    if transitions is None:
+        transitions = get_limb_transitions(rise_jd, next_rise_jd, local_tz)
+    limbs = {limb: transitions[limb][0] for limb in LIMB_NAMES}
+
+    vara_dt = jd_to_datetime(rise_jd, local_tz)
+    limbs["vara"] = {
+        "name": vara_dt.strftime("%A"),
+        "start": vara_dt.isoformat(),
+        "end": jd_to_datetime(next_rise_jd, local_tz).isoformat(),
+    }
+    return limbs
 
 def get_panchang(date_str, lat, lon, timezone_str=None, time_str="12:00"):
     lat_f = float(lat)
     lon_f = float(lon)
     
     if not timezone_str:
-        tf = TimezoneFinder()
-        timezone_str = tf.timezone_at(lat=lat_f, lng=lon_f)
+        timezone_str = timezone_at(lat_f, lon_f)
     
     local_tz = pytz.timezone(timezone_str)
     local_dt = datetime.strptime(date_str, "%Y-%m-%d")
@@ -156,28 +137,19 @@ def get_panchang(date_str, lat, lon, timezone_str=None, time_str="12:00"):
     utc_dt = local_dt.astimezone(pytz.utc)
     jd_midnight = get_julian_day(utc_dt)
 
-    swe.set_sid_mode(swe.SIDM_LAHIRI, 0.0, 0.0)
-
-    rise_jd, set_jd = get_sunrise_sunset(jd_midnight, lat_f, lon_f)
+    # Today and tomorrow in one cache lookup
+    (rise_jd, set_jd), (next_rise_jd, _) = sun_times_range(lat_f, lon_f, jd_midnight, 2)
     sunrise_dt = jd_to_datetime(rise_jd, local_tz)
     sunset_dt = jd_to_datetime(set_jd, local_tz)
 
-    next_day_jd = jd_midnight + 1.0
-    next_rise_jd, _ = get_sunrise_sunset(next_day_jd, lat_f, lon_f)
     next_sunrise_dt = jd_to_datetime(next_rise_jd, local_tz)
 
-    t_name, t_idx, _ = get_tithi_info(rise_jd)
-    t_end_jd = find_end_time(rise_jd, get_tithi_info, t_name)
-    t_end_dt = jd_to_datetime(t_end_jd, local_tz)
-
-    n_name, n_idx, _ = get_nakshatra_info(rise_jd)
-    n_end_jd = find_end_time(rise_jd, get_nakshatra_info, n_name)
-    n_end_dt = jd_to_datetime(n_end_jd, local_tz)
+    # All four limbs' segments for the day from one shared set of Sun/Moon samples
+    transitions = get_limb_transitions(rise_jd, next_rise_jd, local_tz)
 
-    sun_lon = get_planet_pos(rise_jd, swe.SUN)
-    moon_lon = get_planet_pos(rise_jd, swe.MOON)
-    total_yoga = normalize_degrees(sun_lon + moon_lon)
-    yoga_name = YOGAS[int(total_yoga / (360.0/27.0)) % 27]
+    def upto(limb):
+        running = transitions[limb][0]
+        return f"{running['name']} upto {datetime.fromisoformat(running['end']).strftime('%I:%M %p')}"
 
     weekday = sunrise_dt.weekday()
     day_duration = float((sunset_dt - sunrise_dt).total_seconds())
@@ -202,8 +174,7 @@ def get_panchang(date_str, lat, lon, timezone_str=None, time_str="12:00"):
         night_chog.append({"name": name, "quality": CHOGHADIYA_QUALITY[name], "start": curr.strftime("%I:%M %p"), "end": end.strftime("%I:%M %p")})
         curr = end
 
-    rahu_indices = {0: 1, 1: 6, 2: 4, 3: 5, 4: 3, 5: 2, 6: 7}
-    rahu_start = sunrise_dt + timedelta(seconds=(day_duration/8.0) * float(rahu_indices[weekday]))
+    rahu_start = sunrise_dt + timedelta(seconds=(day_duration/8.0) * float(RAHU_KALAM_PART[weekday]))
     rahu_end = rahu_start + timedelta(seconds=day_duration/8.0)
 
     abhijit_start = sunrise_dt + timedelta(seconds=(day_duration/15.0) * 7.0)
@@ -213,12 +184,103 @@ def get_panchang(date_str, lat, lon, timezone_str=None, time_str="12:00"):
         "date": date_str,
         "sunrise": sunrise_dt.strftime("%I:%M %p"),
         "sunset": sunset_dt.strftime("%I:%M %p"),
-        "tithi": f"{t_name} upto {t_end_dt.strftime('%I:%M %p')}",
-        "nakshatra": f"{n_name} upto {n_end_dt.strftime('%I:%M %p')}",
-        "yoga": yoga_name,
+        "tithi": upto("tithi"),
+        "nakshatra": upto("nakshatra"),
+        # Bare names as before; their end times are in "limbs" and "transitions"
+        "yoga": transitions["yoga"][0]["name"],
+        "karana": transitions["karana"][0]["name"],
         "rahu_kalam": f"{rahu_start.strftime('%I:%M %p')} - {rahu_end.strftime('%I:%M %p')}",
         "abhijit_muhurat": f"{abhijit_start.strftime('%I:%M %p')} - {abhijit_end.strftime('%I:%M %p')}",
         "day_choghadiya": day_chog,
         "night_choghadiya": night_chog,
-        "weekday": sunrise_dt.strftime("%A")
-    }
\ No newline at end of file
+        "weekday": sunrise_dt.strftime("%A"),
+        "limbs": get_limb_timings(rise_jd, next_rise_jd, local_tz, transitions),
+        "transitions": transitions
+    }
+
+def _unix(jds):
+    return np.round((np.asarray(jds) - UNIX_EPOCH_JD) * 86400.0).astype(np.int64).tolist()
+
+def range_sun_times(start_str, end_str, lat, lon, timezone_str=None, max_days=PANCHANG_RANGE_MAX_DAYS):
+    """
+    Checks an inclusive "YYYY-MM-DD" date range and location; returns
+    (dates, sunrises, sunsets, timezone) with one more date and sunrise than
+    the range has days, for the last day's next sunrise. Raises ValueError
+    on bad input.
+    """
+    lat_f = float(lat)
+    lon_f = float(lon)
+    if not (-90.0 <= lat_f <= 90.0 and -180.0 <= lon_f <= 180.0):
+        raise ValueError("Latitude must be within -90..90 and longitude within -180..180")
+    start = datetime.strptime(start_str, "%Y-%m-%d").date()
+    end = datetime.strptime(end_str, "%Y-%m-%d").date()
+    count = (end - start).days + 1
+    if count < 1:
+        raise ValueError("end must not be before start")
+    if count > max_days:
+        raise ValueError(f"At most {max_days} days per request")
+
+    if not timezone_str:
+        timezone_str = timezone_at(lat_f, lon_f)
+    try:
+        pytz.timezone(timezone_str)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone: {timezone_str}")
+
+    days = [start + timedelta(days=k) for k in range(count + 1)]
+    sun = dates_sun_times(lat_f, lon_f, days, timezone_str)
+    rises = np.array([rise for _, rise, _ in sun])
+    sets = np.array([set_ for _, _, set_ in sun[:-1]])
+    return days, rises, sets, timezone_str
+
+def get_panchang_range(start_str, end_str, lat, lon, timezone_str=None):
+    """
+    Panchang for every date from start_str to end_str ("YYYY-MM-DD",
+    inclusive) as columns: one list per field, a value per day. Times are
+    Unix seconds; limb values index the lists under "names".
+
+    The days share their work: each sunrise is also the previous day's next
+    sunrise, and every limb boundary in the range is solved once (see
+    limb_transitions), so a month costs about as much as a few get_panchang calls.
+    """
+    days, rises, sets, timezone_str = range_sun_times(start_str, end_str, lat, lon, timezone_str)
+    sunrise, next_sunrise = rises[:-1], rises[1:]
+
+    transitions = limb_transitions(rises[0], rises[-1], enclose=True)
+
+    weekday = np.array([d.weekday() for d in days[:-1]])
+    day_part = (sets - sunrise) / 8.0
+    rahu_start = sunrise + day_part * np.array([RAHU_KALAM_PART[w] for w in weekday])
+    abhijit_start = sunrise + (sets - sunrise) * 7.0 / 15.0
+
+    columns = {
+        "date": [d.isoformat() for d in days[:-1]],
+        "weekday": weekday.tolist(),
+        "sunrise": _unix(sunrise),
+        "sunset": _unix(sets),
+        "next_sunrise": _unix(next_sunrise),
+    }
+    for limb in ("tithi", "nakshatra", "yoga", "karana"):
+        times, indices = transitions[limb]
+        k = np.searchsorted(times, sunrise, side="right")
+        columns[limb] = indices[k - 1].tolist()
+        columns[f"{limb}_start"] = _unix(times[k - 1])
+        columns[f"{limb}_end"] = _unix(times[k])
+    columns["rahu_kalam_start"] = _unix(rahu_start)
+    columns["rahu_kalam_end"] = _unix(rahu_start + day_part)
+    columns["abhijit_start"] = _unix(abhijit_start)
+    columns["abhijit_end"] = _unix(abhijit_start + (sets - sunrise) / 15.0)
+
+    return {
+        "start": days[0].isoformat(),
+        "end": days[-2].isoformat(),
+        "timezone": timezone_str,
+        "names": {
+            "weekday": WEEKDAYS,
+            "tithi": TITHIS,
+            "nakshatra": NAKSHATRAS,
+            "yoga": YOGAS,
+            "karana": [get_karana_name(i) for i in range(60)],
+        },
+        "columns": columns,
+    }
@@ -0,0 +1,187 @@
+"""
+Response cache in front of get_panchang.
+
+A day's panchang only depends on the date, the timezone and the H3 cell of
+the location: sunrise/sunset are computed at the cell centre (see
+astrology/sun_times.py) and the limb times do not depend on the place. So
+responses are cached by (date, cell, timezone) in a bounded LRU and, when
+PANCHANG_CACHE_DB is set, in an SQLite file shared across restarts and
+worker processes. Each entry carries an ETag for HTTP caching.
+
+A background worker keeps today +-PANCHANG_PRECOMPUTE_DAYS warm for the
+cities in PANCHANG_TOP_CITIES (";"-separated gazetteer names), at startup
+and again just after each of their local midnights. It runs in one process
+per machine (the holder of PANCHANG_PRECOMPUTE_LOCK); set PANCHANG_CACHE_DB
+so the other workers see its results.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from astrology.panchang import get_panchang
+from astrology.sun_times import cell_for
+from geocoding.gazetteer import get_gazetteer
+from geocoding.timezones import timezone_at
+from utils.cache import LRUCache, SingleFlight, SQLiteCache
+from utils.file_lock import try_lock
+
+PANCHANG_CACHE_SIZE = int(os.getenv("PANCHANG_CACHE_SIZE", "20000"))
+# Optional on-disk tier, e.g. /var/cache/astropulse/panchang.sqlite
+PANCHANG_CACHE_DB = os.getenv("PANCHANG_CACHE_DB")
+# Seconds browsers and CDNs may reuse a response
+PANCHANG_CACHE_MAX_AGE = int(os.getenv("PANCHANG_CACHE_MAX_AGE", str(24 * 3600)))
+
+PANCHANG_TOP_CITIES = os.getenv(
+    "PANCHANG_TOP_CITIES",
+    "Delhi;Mumbai;Kolkata;Chennai;Bengaluru;Hyderabad;Ahmedabad;Pune;Surat;Jaipur;Varanasi;Ujjain",
+)
+PANCHANG_PRECOMPUTE_DAYS = int(os.getenv("PANCHANG_PRECOMPUTE_DAYS", "7"))
+# Held by the one process running the precompute
+PANCHANG_PRECOMPUTE_LOCK = os.getenv(
+    "PANCHANG_PRECOMPUTE_LOCK",
+    f"{PANCHANG_CACHE_DB}.lock" if PANCHANG_CACHE_DB else os.path.join(tempfile.gettempdir(), "panchang-precompute.lock"),
+)
+
+# Part of every key; bump when the get_panchang response changes shape
+PANCHANG_CACHE_VERSION = 2
+
+_memory = LRUCache(PANCHANG_CACHE_SIZE)
+_in_flight = SingleFlight()
+_disk = None
+_disk_checked = False
+
+
+def _disk_cache():
+    global _disk, _disk_checked
+    if not _disk_checked:
+        _disk_checked = True
+        if PANCHANG_CACHE_DB:
+            try:
+                _disk = SQLiteCache(PANCHANG_CACHE_DB, table="panchang")
+            except Exception as e:
+                print(f"Panchang disk cache disabled ({PANCHANG_CACHE_DB}): {e}")
+    return _disk
+
+
+def _etag(result):
+    return hashlib.sha1(json.dumps(result, sort_keys=True).encode()).hexdigest()[:20]
+
+
+def _compute(key, day, lat, lon, timezone_str):
+    disk = _disk_cache()
+    disk_key = "|".join(map(str, key))
+    entry = disk.get(disk_key) if disk is not None else None
+    if entry is None:
+        result = get_panchang(day, lat, lon, timezone_str)
+        entry = {"etag": _etag(result), "result": result}
+        if disk is not None:
+            disk.put(disk_key, entry)
+    _memory.put(key, entry)
+    return entry
+
+
+def get_panchang_cached(date_str, lat, lon, timezone_str=None):
+    """
+    get_panchang through the cache. Returns (result, etag); the result is
+    shared between callers and must not be modified.
+    """
+    lat_f = float(lat)
+    lon_f = float(lon)
+    day = datetime.strptime(date_str, "%Y-%m-%d").date().isoformat()
+    if not timezone_str:
+        timezone_str = timezone_at(lat_f, lon_f)
+
+    key = (PANCHANG_CACHE_VERSION, day, cell_for(lat_f, lon_f), timezone_str)
+    entry = _memory.get(key)
+    if entry is None:
+        entry = _in_flight.do(key, lambda: _compute(key, day, lat_f, lon_f, timezone_str))
+    return entry["result"], entry["etag"]
+
+
+def top_cities(names=PANCHANG_TOP_CITIES):
+    """Gazetteer places for a ";"-separated list of names; unknown names are skipped."""
+    places = []
+    for name in filter(None, (n.strip() for n in names.split(";"))):
+        place = get_gazetteer().geocode(name)
+        if place is None or not place.timezone:
+            print(f"Panchang precompute: no gazetteer entry with a timezone for '{name}'")
+            continue
+        places.append(place)
+    return places
+
+
+def precompute(places, days=PANCHANG_PRECOMPUTE_DAYS):
+    """Fills the cache for today +-days (local date) at each place; returns the number of entries."""
+    count = 0
+    for place in places:
+        today = datetime.now(pytz.timezone(place.timezone)).date()
+        for k in range(-days, days + 1):
+            day = (today + timedelta(days=k)).isoformat()
+            try:
+                get_panchang_cached(day, place.latitude, place.longitude, place.timezone)
+                count += 1
+            except Exception as e:
+                print(f"Panchang precompute failed for {place.name} {day}: {e}")
+    return count
+
+
+def _seconds_to_next_midnight(places):
+    """Seconds until the earliest upcoming local midnight among the places."""
+    now = datetime.now(pytz.utc)
+    waits = []
+    for place in places:
+        tz = pytz.timezone(place.timezone)
+        local = now.astimezone(tz)
+        midnight = tz.localize(datetime.combine(local.date() + timedelta(days=1), datetime.min.time()))
+        waits.append((midnight - now).total_seconds())
+    return min(waits, default=24 * 3600)
+
+
+def _precompute_loop(places):
+    while True:
+        start = time.monotonic()
+        count = precompute(places)
+        print(f"Panchang precompute: {count} days for {len(places)} cities in {time.monotonic() - start:.1f}s")
+        # Just after the next local midnight, when "today" moves on for one of the cities
+        time.sleep(_seconds_to_next_midnight(places) + 60)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+# Open for the life of the process that runs the worker
+_lock_file = None
+
+
+def start_precompute_worker(names=PANCHANG_TOP_CITIES, lock_path=PANCHANG_PRECOMPUTE_LOCK):
+    """
+    Starts the background precompute thread once per machine; returns it
+    (None without cities or when another process runs it).
+    """
+    global _worker, _lock_file
+    with _worker_lock:
+        if _worker is None:
+            try:
+                _lock_file = try_lock(lock_path)
+            except OSError as e:
+                print(f"Panchang precompute skipped: {e}")
+                return None
+            if _lock_file is None:
+                return None
+            places = top_cities(names)
+            if not places:
+                _lock_file.close()
+                _lock_file = None
+                return None
+            _worker = threading.Thread(target=_precompute_loop, args=(places,), name="panchang-precompute", daemon=True)
+            _worker.start()
+    return _worker
+
+
+def cache_stats():
+    return _memory.stats()
@@ -0,0 +1,157 @@
+"""
+Start/end times of the panchang limbs.
+
+Tithi, karana, nakshatra and yoga are fixed-width slices of an angle built
+from the sidereal Sun and Moon longitudes: the elongation, the Moon and
+their sum. limb_transitions() finds every boundary in a window at once.
+The Sun and Moon are sampled on a fixed grid (SAMPLE_STEP, aligned to
+absolute Julian days and cached in blocks, so consecutive days and range
+requests reuse the samples), each sample giving all three angles. The
+crossings it brackets are then refined together with one regula falsi
+(astrology.root_finding), where each Sun/Moon evaluation serves every limb
+still converging at that step. day_transitions() cuts the result into the
+segments of one sunrise-to-sunrise day. Vara (the fifth limb) runs from
+sunrise to sunrise and comes from the sunrise calculation.
+"""
+import os
+
+import numpy as np
+
+from astrology.ephemeris import sun_moon_sidereal
+from astrology.root_finding import crossings, refine
+from utils.cache import LRUCache
+
+NAKSHATRA_SPAN = 360.0 / 27.0
+
+LIMB_SPANS = {
+    "tithi": 12.0,
+    "karana": 6.0,
+    "nakshatra": NAKSHATRA_SPAN,
+    "yoga": NAKSHATRA_SPAN,
+}
+
+# Lower bound of each angle's speed (degrees/day)
+LIMB_MIN_SPEED = {
+    "tithi": 9.5,
+    "karana": 9.5,
+    "nakshatra": 11.5,
+    "yoga": 12.0,
+}
+
+# Longest a limb can last (days), from the minimum speeds above
+MAX_LIMB_DAYS = max(LIMB_SPANS[limb] / LIMB_MIN_SPEED[limb] for limb in LIMB_SPANS)
+
+# Grid step (days) for limb_transitions: no angle crosses two slices in one step
+SAMPLE_STEP = 0.25
+# Samples are cached in blocks of this many grid steps
+SAMPLE_BLOCK = 64
+PANCHANG_SAMPLE_CACHE_SIZE = int(os.getenv("PANCHANG_SAMPLE_CACHE_SIZE", "4096"))
+
+PANCHANG_LIMBS = ("tithi", "nakshatra", "yoga", "karana")
+# Rows of the sampled angles: elongation (tithi, karana), Moon (nakshatra), Sun + Moon (yoga)
+ANGLE_ROWS = {"tithi": 0, "karana": 0, "nakshatra": 1, "yoga": 2}
+
+_samples = LRUCache(PANCHANG_SAMPLE_CACHE_SIZE)
+
+
+def _limb_angles(sun, moon):
+    """(3, n) array of the angles in ANGLE_ROWS."""
+    return np.stack([(moon - sun) % 360.0, moon % 360.0, (sun + moon) % 360.0])
+
+
+def _sample_block(block):
+    angles = _samples.get(block)
+    if angles is None:
+        jds = (block * SAMPLE_BLOCK + np.arange(SAMPLE_BLOCK)) * SAMPLE_STEP
+        angles = _limb_angles(*sun_moon_sidereal(jds))
+        _samples.put(block, angles)
+    return angles
+
+
+def sample_angles(jd_start, jd_end):
+    """Grid times covering [jd_start, jd_end] and the (3, n) limb angles at them."""
+    first = int(np.floor(jd_start / SAMPLE_STEP))
+    last = int(np.ceil(jd_end / SAMPLE_STEP))
+    blocks = range(first // SAMPLE_BLOCK, last // SAMPLE_BLOCK + 1)
+    angles = np.concatenate([_sample_block(b) for b in blocks], axis=1)
+    offset = first - blocks[0] * SAMPLE_BLOCK
+    angles = angles[:, offset:offset + last - first + 1]
+    return np.arange(first, last + 1) * SAMPLE_STEP, angles
+
+
+def limb_transitions(jd_start, jd_end, enclose=False, limbs=PANCHANG_LIMBS):
+    """
+    Every tithi, karana, nakshatra and yoga boundary (or those of `limbs`)
+    in [jd_start, jd_end]; with enclose=True also the last one before
+    jd_start and the first one after jd_end, so each limb running in the
+    window has both ends.
+
+    Returns {limb: (times, indices)}: sorted boundary times (UT Julian days)
+    and the 0-based index of the limb starting at each.
+    """
+    margin = MAX_LIMB_DAYS if enclose else 0.0
+    jds, angles = sample_angles(jd_start - margin, jd_end + margin)
+
+    # Tithi boundaries are every other karana boundary, so with karana wanted only karanas are solved
+    solved_limbs = [limb for limb in PANCHANG_LIMBS if limb in limbs and not (limb == "tithi" and "karana" in limbs)]
+    rows = [ANGLE_ROWS[limb] for limb in solved_limbs]
+
+    kinds, targets, lo, hi = [], [], [], []
+    for kind, limb in enumerate(solved_limbs):
+        span = LIMB_SPANS[limb]
+        angle = angles[rows[kind]]
+        i = crossings(angle, span)
+        # Brackets that may hold a wanted boundary; tithi's enclosing ones may be two karanas out
+        extra = (2 if limb == "karana" else 1) if enclose else 0
+        first = max(np.searchsorted(jds[i + 1], jd_start) - extra, 0)
+        last = np.searchsorted(jds[i], jd_end, side="right") + extra
+        i = i[first:last]
+        kinds.append(np.full(len(i), kind))
+        targets.append((angle[i + 1] // span) * span)
+        lo.append(jds[i])
+        hi.append(jds[i + 1])
+    kinds, targets, lo, hi = (np.concatenate(a) for a in (kinds, targets, lo, hi))
+
+    rows = np.array(rows)
+
+    def angle_fn(t, idx):
+        return _limb_angles(*sun_moon_sidereal(t))[rows[kinds[idx]], np.arange(len(t))]
+
+    times = refine(angle_fn, targets, lo, hi) if len(targets) else lo
+
+    solved = {}
+    for kind, limb in enumerate(solved_limbs):
+        # Brackets come in time order for each limb, so its boundaries are already sorted
+        mine = kinds == kind
+        solved[limb] = (times[mine], np.rint(targets[mine] / LIMB_SPANS[limb]).astype(np.int64))
+    if "tithi" in limbs and "tithi" not in solved:
+        karana_times, karana_slots = solved["karana"]
+        tithi = karana_slots % 2 == 0
+        solved["tithi"] = (karana_times[tithi], karana_slots[tithi] // 2)
+
+    transitions = {}
+    for limb in limbs:
+        times, indices = solved[limb]
+        first = np.searchsorted(times, jd_start)
+        last = np.searchsorted(times, jd_end, side="right")
+        if enclose:
+            first, last = max(first - 1, 0), last + 1
+        transitions[limb] = (times[first:last], indices[first:last])
+    return transitions
+
+
+def day_transitions(rise_jd, next_rise_jd):
+    """
+    Every tithi, nakshatra, yoga and karana segment between a sunrise and
+    the next, as {limb: [(index, start_jd, end_jd), ...]} in order. The first
+    segment started before sunrise and the last ends after the next one.
+    """
+    transitions = limb_transitions(rise_jd, next_rise_jd, enclose=True)
+    segments = {}
+    for limb, (times, indices) in transitions.items():
+        # A boundary exactly at sunrise starts the day's first segment
+        first = np.searchsorted(times, rise_jd, side="right") - 1
+        segments[limb] = [
+            (int(indices[k]), float(times[k]), float(times[k + 1])) for k in range(first, len(times) - 1)
+        ]
+    return segments
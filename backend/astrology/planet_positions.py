@@ -1,9 +1,9 @@
 import swisseph as swe
-from geopy.geocoders import Nominatim ,Photon
-from timezonefinder import TimezoneFinder
 import pytz
 from datetime import datetime, timedelta
 import math
+from astrology.chart_snapshot import build_chart_snapshot
+from astrology.ephemeris import ephemeris_context
 
 
 # Sign and Nakshatra lists
@@ -115,16 +115,15 @@ def calculate_vedic_lagna(dob, tob, location, lat, lon):
     # Step 3: Julian Day for UTC
     jd_ut = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, utc_dt.hour + utc_dt.minute / 60)
     
-    # Step 4: Set Ayanamsa (Lahiri = traditional Indian)
-    swe.set_sid_mode(swe.SIDM_LAHIRI)
-    
-    # Step 5: Calculate Houses with sidereal mode
-    cusps, ascmc = swe.houses(jd_ut, lat, lon, b'W')  # You can also try 'E' or 'P'
+    # Step 4: Calculate Houses under the Lahiri (traditional Indian) ephemeris context
+    with ephemeris_context():
+        cusps, ascmc = swe.houses(jd_ut, lat, lon, b'W')  # You can also try 'E' or 'P'
+
+        # Step 5: Ascendant Degree (Sidereal)
+        asc_sidereal = (ascmc[0] - swe.get_ayanamsa(jd_ut)) % 360
     
-    # Step 6: Ascendant Degree (Sidereal)
-    asc_sidereal = (ascmc[0] - swe.get_ayanamsa(jd_ut)) % 360
     
-    # Step 7: Map to Rashi
+    # Step 6: Map to Rashi
     rashis = [
         "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
         "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
@@ -134,47 +133,20 @@ def calculate_vedic_lagna(dob, tob, location, lat, lon):
 
 
 
-def planet_position_details(DOB,TOB,LOCATION,TIMEZONE):
-    # Geolocation and Time
-    try:
-        geolocator = Nominatim(user_agent="vedic_astrology_app", timeout=10)
-        location = geolocator.geocode(LOCATION)
-        if not location:
-            raise Exception("Nominatim failed")
-    except Exception:
-        geolocator = Photon(user_agent="vedic_astrology_app", timeout=10)
-        location = geolocator.geocode(LOCATION)
-
-    if not location:
-        raise ValueError(f"Could not find location for '{LOCATION}'")
-
-    lat, lon = location.latitude, location.longitude
-
-    # Timezone and UTC conversion
-    tf = TimezoneFinder()
-    timezone_str = tf.timezone_at(lat=lat, lng=lon)
-    local_tz = pytz.timezone(timezone_str)
-    naive_dt = datetime.strptime(f"{DOB} {TOB}", "%Y-%m-%d %H:%M")
-    local_dt = local_tz.localize(naive_dt)
-    utc_dt = local_dt.astimezone(pytz.utc)
-    asc_aide , asc_rashi , asc_rashi_index_number  = calculate_vedic_lagna(DOB,TOB,TIMEZONE,lat,lon)
-    # print(asc_rashi)
-    # Swiss Ephemeris setup
-    swe.set_sid_mode(swe.SIDM_LAHIRI)
-    jd = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
-                    utc_dt.hour + utc_dt.minute / 60.0 + utc_dt.second / 3600.0)
-    # --- Calculation Flags ---
-    flags =swe.FLG_SWIEPH | swe.FLG_SIDEREAL| swe.FLG_NONUT    
-
-    # --- CALCULATE HOUSES (Ascendant is index 0) ---
-    cusps, ascmc = swe.houses(jd, lat, lon, b'P')
-    ascendant_deg = ascmc[0]
-    rashi_index = int(ascendant_deg / 30)
-    rashi_names = [
-        "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
-        "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
-    ]
-    rising_sign = rashi_names[rashi_index]
+def planet_position_details(DOB,TOB,LOCATION,TIMEZONE,snapshot=None,lat=None,lon=None):
+    # Geolocation, time and ephemeris come from the shared chart snapshot;
+    # lat/lon skip geocoding LOCATION
+    if snapshot is None:
+        snapshot = build_chart_snapshot(DOB, TOB, LOCATION, TIMEZONE, lat=lat, lon=lon)
+
+    # Sidereal ascendant (Lagna) and its rashi
+    asc_aide = snapshot.ascendant_sidereal
+    asc_rashi_index_number = int(asc_aide // 30)
+    asc_rashi = signs[asc_rashi_index_number]
+
+    # Tropical ascendant sign (used for the Ascendant status)
+    ascendant_deg = snapshot.ascendant_tropical
+    rising_sign = signs[int(ascendant_deg / 30)]
 
     # Planet definitions
     planets = {
@@ -183,9 +155,9 @@ def planet_position_details(DOB,TOB,LOCATION,TIMEZONE):
         "Rahu": swe.MEAN_NODE, "Ketu": swe.MEAN_NODE , "Uranus":swe.URANUS  ,"Neptune":swe.NEPTUNE , "Pluto" :swe.PLUTO
     }
 
-    # Get planet positions
     planet_positions = {}
-    sun_lon = swe.calc(jd, swe.SUN, flags)[0][0]
+    body_lons = {name: snapshot.longitude_of(name) for name in planets if name != "Ascendant"}
+    sun_lon = body_lons["Sun"]
 
     for planet, pid in planets.items():
         if planet=="Ascendant":
@@ -213,12 +185,7 @@ def planet_position_details(DOB,TOB,LOCATION,TIMEZONE):
                 "Status": status
             }
         else:            
-            if planet == "Ketu":
-                rahu_pos = swe.calc(jd, swe.MEAN_NODE, flags)[0][0]
-                ketu_pos = (rahu_pos + 180) % 360
-                lon = ketu_pos
-            else:
-                lon = swe.calc(jd, pid, flags)[0][0]
+            lon = body_lons[planet]
 
             sign_idx = int(lon // 30)
             sign = signs[sign_idx]
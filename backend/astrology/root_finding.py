@@ -0,0 +1,54 @@
+"""
+Vectorised root finding for angles passing fixed targets.
+
+crossings() brackets the samples between which a sampled angle passes a
+multiple of a step, and refine() solves every bracket at once with the
+Illinois variant of regula falsi. The event index and the panchang limb
+solver both find their times this way.
+"""
+import numpy as np
+
+# Refinement stops once every event is within this many degrees of its target
+TOLERANCE_DEG = 1e-7
+MAX_ITERATIONS = 20
+
+
+def crossings(angle, step):
+    """Indices i where angle // step changes between sample i and i + 1."""
+    slot = (angle // step).astype(np.int64)
+    return np.nonzero(slot[1:] != slot[:-1])[0]
+
+
+def refine(angle_fn, targets, lo, hi):
+    """
+    Times in [lo, hi] (arrays) at which angle_fn passes targets, solved for
+    all events at once with the Illinois variant of regula falsi.
+    angle_fn(t, idx) gets the times and the indices of their events.
+    """
+    def offset(t, idx):
+        return (angle_fn(t, idx) - targets[idx] + 180.0) % 360.0 - 180.0
+
+    everything = np.arange(len(targets))
+    f_lo, f_hi = offset(lo, everything), offset(hi, everything)
+    lo, hi = lo.copy(), hi.copy()
+    t = lo.copy()
+    # Which end each event replaced last: -1 lower, +1 upper, 0 none yet
+    last = np.zeros(len(targets), dtype=np.int8)
+    active = everything
+    for _ in range(MAX_ITERATIONS):
+        a_lo, a_hi, fa_lo, fa_hi = lo[active], hi[active], f_lo[active], f_hi[active]
+        t_new = a_lo - fa_lo * (a_hi - a_lo) / (fa_hi - fa_lo)
+        f = offset(t_new, active)
+        t[active] = t_new
+        left = f < 0
+        # Replacing the same end twice running halves the other end's value (Illinois)
+        f_hi[active] = np.where(left, np.where(last[active] == -1, fa_hi * 0.5, fa_hi), f)
+        f_lo[active] = np.where(left, f, np.where(last[active] == 1, fa_lo * 0.5, fa_lo))
+        hi[active] = np.where(left, a_hi, t_new)
+        lo[active] = np.where(left, t_new, a_lo)
+        last[active] = np.where(left, -1, 1)
+        # Only the events not yet converged are evaluated again
+        active = active[np.abs(f) >= TOLERANCE_DEG]
+        if not active.size:
+            break
+    return t
@@ -0,0 +1,168 @@
+"""
+Sunrise/sunset service.
+
+Coordinates are quantised to an H3 cell and the rise/set times are computed
+once per (cell, day) at the centre of the cell, then kept in a bounded LRU
+and, when SUN_TIMES_DB is set, in an SQLite file shared across restarts and
+worker processes. At the default resolution 7 (cells ~1.4 km across) moving
+to the cell centre shifts sunrise/sunset by a few seconds at most.
+
+A "day" is identified by the UT Julian day the search starts from, rounded
+to the minute: the times returned are the first sunrise and sunset after it
+(normally local midnight of the date).
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import h3
+import pytz
+import swisseph as swe
+
+from astrology.ephemeris import ephemeris_context
+from utils.cache import LRUCache, SQLiteCache
+
+SUN_TIMES_H3_RES = int(os.getenv("SUN_TIMES_H3_RES", "7"))
+SUN_TIMES_CACHE_SIZE = int(os.getenv("SUN_TIMES_CACHE_SIZE", "50000"))
+# Optional on-disk tier, e.g. /var/cache/astropulse/sun_times.sqlite
+SUN_TIMES_DB = os.getenv("SUN_TIMES_DB")
+
+# CALC_RISE / CALC_SET with BIT_DISC_CENTER: centre of the visible solar disc
+RSMI_RISE = swe.CALC_RISE | swe.BIT_DISC_CENTER
+RSMI_SET = swe.CALC_SET | swe.BIT_DISC_CENTER
+ATPRESS = 1013.25  # standard pressure (hPa)
+ATTEMP = 15.0      # standard temperature (°C)
+# rise_trans return flag when the Sun does not rise or set (polar day/night)
+CIRCUMPOLAR = -2
+
+_memory = LRUCache(SUN_TIMES_CACHE_SIZE)
+# (date, timezone) -> UT Julian day of local midnight, shared by every place in the zone
+_midnights = LRUCache(SUN_TIMES_CACHE_SIZE)
+_disk = None
+_disk_checked = False
+
+
+def _disk_cache():
+    global _disk, _disk_checked
+    if not _disk_checked:
+        _disk_checked = True
+        if SUN_TIMES_DB:
+            try:
+                _disk = SQLiteCache(SUN_TIMES_DB, table="sun_times")
+            except Exception as e:
+                print(f"Sunrise/sunset disk cache disabled ({SUN_TIMES_DB}): {e}")
+    return _disk
+
+
+def cell_for(lat, lon, resolution=SUN_TIMES_H3_RES):
+    """H3 cell index holding the coordinates."""
+    return h3.latlng_to_cell(float(lat), float(lon), resolution)
+
+
+def _minute(jd):
+    return int(round(jd * 1440.0))
+
+
+def _compute(jd_start, lat, lon):
+    """Runs the two rise_trans searches; None when Swiss Ephemeris fails."""
+    geopos = (lon, lat, 0.0)  # longitude, latitude, altitude (meters)
+    try:
+        with ephemeris_context():
+            rise = swe.rise_trans(jd_start, swe.SUN, RSMI_RISE, geopos, ATPRESS, ATTEMP, swe.FLG_SWIEPH)
+            set_ = swe.rise_trans(jd_start, swe.SUN, RSMI_SET, geopos, ATPRESS, ATTEMP, swe.FLG_SWIEPH)
+    except swe.Error as e:
+        print("Swiss Ephemeris sunrise/sunset error:", e)
+        return None
+    if rise[0] == CIRCUMPOLAR or set_[0] == CIRCUMPOLAR:
+        # No sunrise or sunset: 6:00 to 18:00 after the search start (local midnight)
+        return jd_start + 0.25, jd_start + 0.75
+    return rise[1][0], set_[1][0]
+
+
+def sun_times_range(lat, lon, jd_start, days):
+    """
+    Returns [(rise_jd, set_jd), ...] for `days` consecutive days, the k-th
+    searched from jd_start + k. Missing days are computed and stored in one
+    pass (a single SQLite round trip each way).
+    """
+    cell = cell_for(lat, lon)
+    minutes = [_minute(jd_start + k) for k in range(days)]
+    results = [_memory.get((cell, m)) for m in minutes]
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    disk = _disk_cache() if missing else None
+    if disk is not None:
+        stored = disk.get_many(f"{cell}:{minutes[i]}" for i in missing)
+        for i in missing:
+            hit = stored.get(f"{cell}:{minutes[i]}")
+            if hit is not None:
+                results[i] = tuple(hit)
+                _memory.put((cell, minutes[i]), results[i])
+        missing = [i for i in missing if results[i] is None]
+
+    if missing:
+        c_lat, c_lon = h3.cell_to_latlng(cell)
+        new = []
+        for i in missing:
+            times = _compute(minutes[i] / 1440.0, c_lat, c_lon)
+            if times is None:
+                # Legacy fallback, not cached so a later call can retry
+                results[i] = (jd_start + i, jd_start + i + 0.5)
+                continue
+            results[i] = times
+            _memory.put((cell, minutes[i]), times)
+            new.append((f"{cell}:{minutes[i]}", times))
+        if disk is not None and new:
+            disk.put_many(new)
+
+    return results
+
+
+def sun_times(lat, lon, jd_start):
+    """Returns (rise_jd, set_jd): the first sunrise and sunset after jd_start (UT)."""
+    return sun_times_range(lat, lon, jd_start, 1)[0]
+
+
+def local_midnight_jd(day, timezone_str):
+    """UT Julian day of local midnight at the start of `day` (a date) in the zone."""
+    jd = _midnights.get((day, timezone_str))
+    if jd is None:
+        local_tz = pytz.timezone(timezone_str)
+        utc_dt = local_tz.localize(datetime(day.year, day.month, day.day)).astimezone(pytz.utc)
+        jd = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
+                        utc_dt.hour + utc_dt.minute / 60.0 + utc_dt.second / 3600.0)
+        _midnights.put((day, timezone_str), jd)
+    return jd
+
+
+def dates_sun_times(lat, lon, days, timezone_str):
+    """
+    Sunrise/sunset for consecutive dates in one call.
+
+    Returns [(date, rise_jd, set_jd), ...], each day searched from its local
+    midnight.
+    """
+    starts = [local_midnight_jd(d, timezone_str) for d in days]
+
+    # DST changes move local midnight, so runs of days are split wherever the step is not one day
+    out = []
+    i = 0
+    while i < len(days):
+        j = i + 1
+        while j < len(days) and _minute(starts[j]) - _minute(starts[i]) == (j - i) * 1440:
+            j += 1
+        for k, (rise, set_) in enumerate(sun_times_range(lat, lon, starts[i], j - i)):
+            out.append((days[i + k], rise, set_))
+        i = j
+    return out
+
+
+def month_sun_times(lat, lon, year, month, timezone_str):
+    """Sunrise/sunset for every day of a month, see dates_sun_times."""
+    first = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    days = [first + timedelta(days=k) for k in range((next_month - first).days)]
+    return dates_sun_times(lat, lon, days, timezone_str)
+
+
+def cache_stats():
+    return _memory.stats()
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+# The Swiss Ephemeris .se1 files are not in the repository (download_ephemeris.py fetches them).
+# Without them the tests run on the built-in Moshier ephemeris instead of failing at the first call.
+os.environ.setdefault("SWE_ALLOW_MOSHIER", "1")
+
+# Timing comparisons are only meaningful on an idle machine, so they run on request
+RUN_BENCHMARKS = os.getenv("RUN_BENCHMARKS", "") not in ("", "0")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock comparison, run with RUN_BENCHMARKS=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    if RUN_BENCHMARKS:
+        return
+    skip = pytest.mark.skip(reason="benchmark, set RUN_BENCHMARKS=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
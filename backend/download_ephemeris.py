@@ -13,6 +13,12 @@ FILES_TO_DOWNLOAD = [
 
 DEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ephe")
 
+def is_ephemeris_file(path):
+    """False for an empty file or an HTML error page saved under the .se1 name."""
+    with open(path, "rb") as f:
+        head = f.read(64)
+    return bool(head) and not head.lstrip().lower().startswith((b"<!doctype", b"<html"))
+
 def download_file(filename):
     url = EPHE_URL + filename
     dest_path = os.path.join(DEST_DIR, filename)
@@ -20,11 +26,11 @@ def download_file(filename):
     print(f"Checking {dest_path}...")
     if os.path.exists(dest_path):
         size = os.path.getsize(dest_path)
-        if size > 0:
+        if is_ephemeris_file(dest_path):
             print(f"File {filename} already exists ({size} bytes). Skipping.")
             return
         else:
-            print(f"File {filename} exists but is empty. Re-downloading.")
+            print(f"File {filename} exists but is empty or an HTML page. Re-downloading.")
 
     print(f"Downloading {filename} from {url}...")
     try:
@@ -35,11 +41,15 @@ def download_file(filename):
         
         urllib.request.urlretrieve(url, dest_path)
         
-        if os.path.exists(dest_path):
+        if not os.path.exists(dest_path):
+            print(f"Failed to save {filename}")
+        elif not is_ephemeris_file(dest_path):
+            # The server answered with an error page; do not leave it where Swiss Ephemeris reads it
+            os.remove(dest_path)
+            print(f"Failed to download {filename}: the server returned an HTML page, not an ephemeris file")
+        else:
             size = os.path.getsize(dest_path)
             print(f"Successfully downloaded {filename} ({size} bytes)")
-        else:
-            print(f"Failed to save {filename}")
             
     except Exception as e:
         print(f"Failed to download {filename}: {e}")
@@ -0,0 +1,50 @@
+import os
+import urllib.request
+import zipfile
+
+# GeoNames dumps: cities with population > 15000, plus region and country names
+GEONAMES_URL = "https://download.geonames.org/export/dump/"
+FILES_TO_DOWNLOAD = [
+    "cities15000.zip",
+    "admin1CodesASCII.txt",
+    "countryInfo.txt",
+]
+
+DEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocoding", "data")
+
+def download_file(filename):
+    url = GEONAMES_URL + filename
+    dest_path = os.path.join(DEST_DIR, filename)
+
+    print(f"Checking {dest_path}...")
+    if os.path.exists(dest_path) and os.path.getsize(dest_path) > 0:
+        print(f"File {filename} already exists. Skipping.")
+        return dest_path
+
+    print(f"Downloading {filename} from {url}...")
+    try:
+        req = urllib.request.Request(url, headers={'User-Agent': 'TheAstroPulse/1.0'})
+        with urllib.request.urlopen(req) as response, open(dest_path, 'wb') as out:
+            out.write(response.read())
+        print(f"Successfully downloaded {filename} ({os.path.getsize(dest_path)} bytes)")
+        return dest_path
+    except Exception as e:
+        print(f"Failed to download {filename}: {e}")
+        return None
+
+def main():
+    if not os.path.exists(DEST_DIR):
+        print(f"Creating directory {DEST_DIR}")
+        os.makedirs(DEST_DIR)
+
+    print(f"Downloading GeoNames gazetteer to {DEST_DIR}")
+    for filename in FILES_TO_DOWNLOAD:
+        path = download_file(filename)
+        if path and filename.endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                archive.extractall(DEST_DIR)
+            print(f"Extracted {filename}")
+    print("Download script finished. The geocoder picks up cities15000.txt on the next start.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Pre-built festival calendar.
+
+Festival dates only depend on the rules and the reference location, so the
+festival engine is run once over a range of years and the results are
+written to a compact file that the API serves from without any ephemeris
+work:
+
+    header     magic, sha256 of the rule files and the engine version, first
+               day (ordinal), days, rules, entries, reference lat/lon
+    day index  int32[days + 1]: entries of day k are entries[idx[k]:idx[k + 1]]
+    entries    (rule, tithi 1-30, nakshatra, lunar month) per festival
+    rule index int32[rules + 1] into rule days: the reverse index
+    rule days  int32[entries]: day numbers of each rule's occurrences
+
+A day or a year is a slice of the day index, and the festival dicts are
+rebuilt from the codes with festival_entry (catalogue_entry for the
+observances of festival_religion/, which only need the date). The reader
+memory-maps the file so all worker processes share the pages. A store built
+from other rules, catalogues or engine version (different hash) or location
+is stale and is not served.
+
+Build (from the backend directory):
+    python -m festivals.calendar_store --start 1976 --end 2076
+"""
+import argparse
+import hashlib
+import os
+import struct
+import time
+from datetime import date
+
+import numpy as np
+
+from .panchang import MONTHS, NAKSHATRAS, tithi_name_paksha
+from .religions import catalogue_entry
+from .rule_index import festival_entry
+
+MAGIC = b"FESTCAL1"
+# magic, rules sha256, start ordinal, n_days, n_rules, n_entries, lat, lon
+HEADER = struct.Struct("<8s32sqqqqdd")
+HEADER_SIZE = 128
+
+ENTRY = np.dtype([("rule", "<u2"), ("tithi", "u1"), ("nakshatra", "u1"), ("month", "u1")])
+# Code of a missing tithi / nakshatra / lunar month (fixed and solar festivals)
+NONE_CODE = 255
+
+TITHI_CODES = {tithi_name_paksha(number): number for number in range(1, 31)}
+
+
+def rules_digest(paths, engine_version):
+    """sha256 of the rule files and the engine version, which keys the store."""
+    digest = hashlib.sha256(f"{engine_version}\n".encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.digest()
+
+
+class FestivalStore:
+    """Read-only, memory-mapped festival calendar for `rules` (the rules it was built from)."""
+
+    def __init__(self, path, rules):
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        (magic, self.rules_digest, start_ordinal, self.n_days, n_rules, n_entries,
+         self.lat, self.lon) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a festival calendar")
+        if n_rules != len(rules):
+            raise ValueError(f"{path} has {n_rules} rules, expected {len(rules)}")
+
+        self.path = path
+        self.start_ordinal = start_ordinal
+        self.first = date.fromordinal(start_ordinal)
+        self.last = date.fromordinal(start_ordinal + self.n_days - 1)
+        self.names = list(rules)
+        self.rules = rules
+        self._order = {name: order for order, name in enumerate(self.names)}
+
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        offset = HEADER_SIZE
+        self.day_index, offset = _section(raw, offset, "<i4", self.n_days + 1)
+        self.entries, offset = _section(raw, offset, ENTRY, n_entries)
+        self.rule_index, offset = _section(raw, offset, "<i4", n_rules + 1)
+        self.rule_days, offset = _section(raw, offset, "<i4", n_entries)
+
+    def covers(self, first, last):
+        return self.first <= first and last <= self.last
+
+    def between(self, first, last):
+        """detect_festivals results for every day first..last (inclusive), in order."""
+        if not self.covers(first, last):
+            raise ValueError(f"{first}..{last} outside the festival calendar {self.first}..{self.last}")
+        lo = first.toordinal() - self.start_ordinal
+        hi = last.toordinal() - self.start_ordinal + 1
+        bounds = self.day_index[lo:hi + 1].tolist()
+        entries = self.entries[bounds[0]:bounds[-1]].tolist()
+        out = []
+        for k in range(hi - lo):
+            day = date.fromordinal(self.start_ordinal + lo + k)
+            for rule, tithi, nakshatra, month in entries[bounds[k] - bounds[0]:bounds[k + 1] - bounds[0]]:
+                out.append(self._decode(day, rule, tithi, nakshatra, month))
+        return out
+
+    def day(self, date_obj):
+        return self.between(date_obj, date_obj)
+
+    def year(self, year):
+        return self.between(date(year, 1, 1), date(year, 12, 31))
+
+    def dates_of(self, name):
+        """Dates of every occurrence of a festival in the store (reverse index)."""
+        order = self._order[name]
+        lo, hi = self.rule_index[order:order + 2].tolist()
+        return [date.fromordinal(self.start_ordinal + k) for k in self.rule_days[lo:hi].tolist()]
+
+    def _decode(self, day, rule, tithi, nakshatra, month):
+        name = self.names[rule]
+        if "religion" in self.rules[name]:
+            return catalogue_entry(name, self.rules[name], day)
+        state = None
+        if tithi != NONE_CODE:
+            tithi_name, paksha = tithi_name_paksha(tithi)
+            state = {"tithi": tithi_name, "paksha": paksha, "nakshatra": NAKSHATRAS[nakshatra]}
+        lunar_month = MONTHS[month] if month != NONE_CODE else None
+        return festival_entry(name, self.rules[name], state, lunar_month, day)
+
+
+def _section(raw, offset, dtype, count):
+    dtype = np.dtype(dtype)
+    end = offset + dtype.itemsize * count
+    return raw[offset:end].view(dtype), end
+
+
+def _encode(festival, order):
+    if "tithi" not in festival:
+        return (order[festival["name"]], NONE_CODE, NONE_CODE, NONE_CODE)
+    return (
+        order[festival["name"]],
+        TITHI_CODES[(festival["tithi"], festival["paksha"])],
+        NAKSHATRAS.index(festival["nakshatra"]),
+        MONTHS.index(festival["lunar_month"]),
+    )
+
+
+def build_store(path, rules, digest, start_year, end_year, yearly_festivals, lat, lon):
+    """
+    Runs yearly_festivals(year) for start_year..end_year and writes the
+    store to `path` (atomically, so running workers never see a partial
+    file). Returns the number of festivals stored.
+    """
+    order = {name: k for k, name in enumerate(rules)}
+    start = date(start_year, 1, 1).toordinal()
+    n_days = date(end_year, 12, 31).toordinal() - start + 1
+
+    day_counts = np.zeros(n_days, dtype=np.int64)
+    rows, days = [], []
+    for year in range(start_year, end_year + 1):
+        for festival in yearly_festivals(year):
+            k = date.fromisoformat(festival["date"]).toordinal() - start
+            rows.append(_encode(festival, order))
+            days.append(k)
+            day_counts[k] += 1
+
+    entries = np.array(rows, dtype=ENTRY)
+    day_index = np.concatenate([[0], np.cumsum(day_counts)]).astype("<i4")
+
+    # Reverse index: each rule's day numbers, in date order
+    days = np.array(days, dtype="<i4")
+    by_rule = np.argsort(entries["rule"], kind="stable")
+    rule_index = np.searchsorted(entries["rule"][by_rule], np.arange(len(rules) + 1)).astype("<i4")
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, digest, start, n_days, len(rules), len(entries), lat, lon).ljust(HEADER_SIZE, b"\0"))
+        f.write(day_index.tobytes())
+        f.write(entries.tobytes())
+        f.write(rule_index.tobytes())
+        f.write(days[by_rule].tobytes())
+    os.replace(tmp, path)
+    return len(entries)
+
+
+def main():
+    from festivals.festivals import (
+        FESTIVAL_STORE_END_YEAR, FESTIVAL_STORE_PATH, FESTIVAL_STORE_START_YEAR, build_festival_store,
+    )
+
+    parser = argparse.ArgumentParser(description="Build the pre-computed festival calendar.")
+    parser.add_argument("--start", type=int, default=FESTIVAL_STORE_START_YEAR, help="First year covered")
+    parser.add_argument("--end", type=int, default=FESTIVAL_STORE_END_YEAR, help="Last year covered")
+    parser.add_argument("--output", default=FESTIVAL_STORE_PATH)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    count = build_festival_store(args.start, args.end, args.output)
+    print(f"Wrote {count} festivals for {args.start}-{args.end} to {args.output} "
+          f"({os.path.getsize(args.output)} bytes) in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
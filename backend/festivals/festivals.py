@@ -1,6 +1,24 @@
 import json
 import os
-from .panchang import get_panchang
+import threading
+from datetime import date, timedelta
+
+import pytz
+
+from astrology.panchang_solver import limb_transitions
+from astrology.sun_times import cell_for, dates_sun_times
+from geocoding.timezones import timezone_at
+from utils.cache import LRUCache, SingleFlight
+from utils.file_lock import try_lock
+from .calendar_store import FestivalStore, build_store, rules_digest
+from .panchang import (
+    DEFAULT_LAT, DEFAULT_LON, DEFAULT_TIMEZONE, calculate_nakshatra, calculate_tithi, get_panchang,
+    prefetch_sunrises, sankranti_on, skipped_tithi_on_later_day, timing_julian_day, timing_window,
+    tithi_name_paksha,
+)
+from .religions import CATALOGUE, CATALOGUE_PATHS, religion_festivals
+from .rule_index import RuleIndex, festival_entry
+from .scanner import scan_year
 
 # Load rules
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,223 +27,269 @@ rules_path = os.path.join(current_dir, "rules.json")
 with open(rules_path, "r", encoding="utf-8") as f:
     FESTIVAL_RULES = json.load(f)
 
-import json
-import os
-from datetime import date, timedelta
-from .panchang import get_panchang
+# Rules bucketed by (timing, lunar month, paksha, tithi), sun sign and date (see rule_index.py)
+RULE_INDEX = RuleIndex(FESTIVAL_RULES)
 
-# Load rules
-current_dir = os.path.dirname(os.path.abspath(__file__))
-rules_path = os.path.join(current_dir, "rules.json")
+# Hindu rules, then the Islamic/Christian/astronomical/national catalogue (see religions.py)
+ALL_RULES = {**FESTIVAL_RULES, **CATALOGUE}
 
-with open(rules_path, "r", encoding="utf-8") as f:
-    FESTIVAL_RULES = json.load(f)
+# Bump when the engine's results change, so pre-built calendars are rebuilt
+FESTIVAL_ENGINE_VERSION = 4
 
-import json
-import os
-from datetime import date, timedelta
-from .panchang import get_panchang
+# Pre-built calendar for the reference location (see calendar_store.py), this year +-50 by default
+FESTIVAL_STORE_PATH = os.getenv(
+    "FESTIVAL_STORE_PATH", os.path.join(os.path.dirname(current_dir), "ephe", "festival_calendar.bin")
+)
+FESTIVAL_STORE_START_YEAR = int(os.getenv("FESTIVAL_STORE_START_YEAR", str(date.today().year - 50)))
+FESTIVAL_STORE_END_YEAR = int(os.getenv("FESTIVAL_STORE_END_YEAR", str(date.today().year + 50)))
+RULES_DIGEST = rules_digest([rules_path] + CATALOGUE_PATHS, FESTIVAL_ENGINE_VERSION)
 
-# Load rules
-current_dir = os.path.dirname(os.path.abspath(__file__))
-rules_path = os.path.join(current_dir, "rules.json")
+# Years computed for other locations, by (H3 cell, timezone, year); least recently used go first
+FESTIVAL_LOCATION_CACHE_SIZE = int(os.getenv("FESTIVAL_LOCATION_CACHE_SIZE", "1024"))
 
-with open(rules_path, "r", encoding="utf-8") as f:
-    FESTIVAL_RULES = json.load(f)
+_by_location = LRUCache(FESTIVAL_LOCATION_CACHE_SIZE)
+_in_flight = SingleFlight()
 
-def detect_festivals(date_obj, override_lunar_month=None):
+def detect_festivals(date_obj, override_lunar_month=None, lat=DEFAULT_LAT, lon=DEFAULT_LON,
+                     timezone_str=DEFAULT_TIMEZONE):
     """
-    Detect festivals for a given date using Accurate Panchang Engine.
+    Detect festivals for a given (local) date using Accurate Panchang Engine.
     """
-    panchang = get_panchang(date_obj)
-    
-    matches = []
+    panchang = get_panchang(date_obj, lat, lon, timezone_str)
+    lunar_month = panchang["lunar_month"]
 
-    # Calculate JD for specific times if needed
-    # We'll calculate these on demand to save compute if not needed
-    
-    for name, rule in FESTIVAL_RULES.items():
-        is_match = True
-        
-        # Determine the moment to check Tithi/Nakshatra
-        # Default is Sunrise (which we already have in `panchang`)
-        check_panchang = panchang
-        
-        timing = rule.get("timing")
-        if timing:
-            # Calculate specific time JD
-            # Sunrise is roughly 6:00 Local Mean Time or similar. 
-            # We used `get_sunrise` in panchang.py.
-            # Here we need an approximation or exact calculation.
-            # Ideally `panchang.py` should expose a `get_panchang_at_time` or we use `get_julian_day`.
-            
-            # Let's map timings to approximate hours (IST is UTC+5.5)
-            # We need to pass the correct hour to get_julian_day.
-            # get_julian_day converts local date + hour to JD.
-            # Note: swe.julday expects UT if not otherwise specified? 
-            # Wait, `get_julian_day` in `panchang.py` takes (date, hour).
-            # SWISSEPH julday takes (year, month, day, hour). 
-            # If we pass local hour, does it return UT JD or ET JD? 
-            # Usually strict inputs.
-            # Let's assume input date is local date. 
-            # To get specific time, we add hour to JD start of day?
-            
-            # Let's simple use utils from panchang if available or recreate logic.
-            # In `panchang.py`: `swe.julday(..., time_hour)`
-            
-            # Approximate times in Local Time (IST):
-            if timing == "noon":
-                hour = 12.0
-            elif timing == "afternoon":
-                hour = 14.5 # ~2:30 PM (Aparahna)
-            elif timing == "evening":
-                hour = 18.5 # Pradosh / Sunset time
-            elif timing == "midnight":
-                hour = 24.0 # Midnight (technically next day 0.0 or 24.0 of current day)
-            else:
-                hour = 6.0 # Default/Sunrise
-                
-            # If timing is midnight, it might be 00:00 of NEXT day or 24:00 of CURRENT day.
-            # Effect is same.
-            
-            # Recalculate Panchang for this specific time
-            from .panchang import get_julian_day, calculate_tithi, calculate_nakshatra, get_amanta_lunar_month
-            
-            # Note: get_julian_day expects hour in UT if we want strictness, 
-            # but standard usage often implies local if consistent.
-            # However, swisseph defaults to UT. 
-            # IST is +5.30. So 12.00 Noon IST = 6.5 UT.
-            # We should probably subtract 5.5 from local hours to get UT.
-            
-            ut_hour = hour - 5.5
-            jd_timing = get_julian_day(date_obj, ut_hour)
-            
-            t_name, t_paksha, t_index = calculate_tithi(jd_timing)
-            n_name = calculate_nakshatra(jd_timing)
-            # Lunar month typically doesn't change fast, but let's use sunrise month to keep it stable
-            # or recalculate if boundary crossing. Usually determined by New Moon.
-            # Let's use sunrise lunar month for consistency unless it's a month-boundary sensitive festival?
-            # Safe to use sunrise month for now.
-            
-            check_panchang = {
-                "tithi": t_name,
-                "paksha": t_paksha,
-                "nakshatra": n_name,
-                "lunar_month": panchang["lunar_month"], # Keep sunrise month
-                "sun_sign": panchang["sun_sign"] # Keep sunrise sign
-            }
+    # Tithi/nakshatra at sunrise, and at the rule timings that have rules for this month.
+    # The lunar month stays the one at sunrise.
+    states = {None: panchang}
+    skipped = []
+    needed = [timing for timing in RULE_INDEX.timings if RULE_INDEX.needs_timing(timing, lunar_month)]
+    if needed:
+        # (sunrise, sunset, next sunrise) of the day before, this day and the day after
+        sun = dates_sun_times(lat, lon, [date_obj + timedelta(days=k) for k in range(-1, 3)], timezone_str)
+        days = [(rise, set_, next_rise) for (_, rise, set_), (_, next_rise, _) in zip(sun, sun[1:])]
+    for timing in needed:
+        jds = [timing_julian_day(timing, *day) for day in days]
+        tithis = [calculate_tithi(jd)[2] for jd in jds]
+        t_name, t_paksha = tithi_name_paksha(tithis[1])
+        state = states[timing] = {"tithi": t_name, "paksha": t_paksha, "nakshatra": calculate_nakshatra(jds[1])}
+        # A tithi that starts after one day's timing moment and ends before the next day's
+        # is kept on the one of the two whose window it overlaps longer
+        for k in (0, 1):
+            if (tithis[k + 1] - tithis[k]) % 30 != 2:
+                continue
+            start, end = limb_transitions(jds[k], jds[k + 1], limbs=("tithi",))["tithi"][0][:2]
+            later = skipped_tithi_on_later_day(
+                start, end, timing_window(timing, *days[k]), timing_window(timing, *days[k + 1]), days[k + 1][0]
+            )
+            if later == (k == 0):
+                name, paksha = tithi_name_paksha(tithis[k] % 30 + 1)
+                skipped.append((timing, dict(state, tithi=name, paksha=paksha)))
 
-        
-        # 0. Fixed Gregorian Date Logic
-        if rule.get("type") == "fixed":
-            if date_obj.month == rule.get("month") and date_obj.day == rule.get("day"):
-                matches.append({
-                    "name": name,
-                    "type": "National/Fixed Festival",
-                    "date": date_obj.isoformat()
-                })
-            continue
-
-        # 1. Solar Rule (Makar Sankranti etc.)
-        if rule.get("type") == "solar":
-            target_sign = rule.get("sun_sign")
-            
-            # Check Sun Sign at start of today vs start of tomorrow
-            # If it changes TO target_sign, today is the transition day.
-            
-            # Current day already calculated in `panchang` (Sunrise)
-            current_sign = panchang["sun_sign"]
-            
-            if current_sign != target_sign:
-                 # It's not in the sign at Sunrise. 
-                 # Did it enter later today?
-                 tomorrow = date_obj + timedelta(days=1)
-                 tomorrow_panchang = get_panchang(tomorrow)
-                 next_sign = tomorrow_panchang["sun_sign"]
-                 
-                 if next_sign == target_sign:
-                     # TRANSIT HAPPENS TODAY! (Between today sunrise and tomorrow sunrise)
-                     matches.append({
-                        "name": name,
-                        "type": "Solar Festival",
-                        "details": f"Sun enters {target_sign}",
-                        "date": date_obj.isoformat()
-                    })
-            
-            if current_sign == target_sign:
-                # Sun is ALREADY in sign at sunrise.
-                # Was it there yesterday?
-                yesterday = date_obj - timedelta(days=1)
-                yesterday_panchang = get_panchang(yesterday)
-                prev_sign = yesterday_panchang["sun_sign"]
-                
-                if prev_sign != target_sign:
-                     # It entered yesterday but maybe after sunrise? 
-                     # If we flagged it yesterday (via the block above), we shouldn't flag it today again?
-                     # Actually, the logic above (current != target, next == target) flags day PRECEDING the full presence.
-                     # This block (current == target, prev != target) flags the first FULL day.
-                     # Sankranti is the TRANSIT day.
-                     # If transit was at 2 PM Jan 14:
-                     # Jan 14 Sunrise: Sag. Jan 15 Sunrise: Cap.
-                     # On Jan 14: current(Sag) != target(Cap). next(Cap) == target(Cap). -> MATCH Jan 14.
-                     # On Jan 15: current(Cap) == target(Cap). prev(Sag) != target(Cap). -> MATCH Jan 15?
-                     # We need to avoid double detection.
-                     # If we matched on Jan 14, we shouldn't match Jan 15.
-                     # Usually Sankranti is strictly the transit event.
-                     # So the first block (Ingress) is the correct one.
-                     pass 
-            
-            continue 
-
-        # 2. Lunar Month Match
-        # Use calculated month unless override provided (override unused in yearly logic now)
-        current_month = check_panchang["lunar_month"]
-        if "lunar_month" in rule and rule["lunar_month"] != current_month:
-            is_match = False
-            
-        # 3. Paksha Match
-        if is_match and "paksha" in rule and rule["paksha"] != check_panchang["paksha"]:
-             is_match = False
-             
-        # 4. Tithi Match
-        if is_match and "tithi" in rule and rule["tithi"] != check_panchang["tithi"]:
-            is_match = False
-            
-        # 5. Nakshatra Match (optional)
-        if is_match and "nakshatra" in rule:
-            if rule["nakshatra"] != check_panchang["nakshatra"]:
-                is_match = False
-
-        if is_match:
-            matches.append({
-                "name": name,
-                "tithi": check_panchang["tithi"],
-                "paksha": check_panchang["paksha"],
-                "lunar_month": check_panchang["lunar_month"],
-                "nakshatra": check_panchang["nakshatra"],
-                "type": rule.get("type", "Hindu Festival").title(), # Capitalize type
-                "date": date_obj.isoformat()
-            })
-
-    return matches
-
-def get_yearly_festivals(year):
-    """
-    Scan the entire year (Jan 1 to Dec 31) for festivals.
+    # The transit day is the one whose sunrise-to-sunrise span holds the ingress
+    sankranti = sankranti_on(date_obj, lat, lon, timezone_str) if RULE_INDEX.has_solar else None
+
+    return [
+        festival_entry(name, rule, state, lunar_month, date_obj)
+        for name, rule, state in RULE_INDEX.match(date_obj, lunar_month, states, sankranti, skipped)
+    ]
+
+def resolve_location(lat=None, lon=None, timezone_str=None):
+    """
+    (lat, lon, timezone) for the festival engine: the reference location
+    when no coordinates are given, the coordinates' own timezone when none
+    is given. Raises ValueError on bad input.
+    """
+    if lat is None and lon is None:
+        lat, lon = DEFAULT_LAT, DEFAULT_LON
+        timezone_str = timezone_str or DEFAULT_TIMEZONE
+    elif lat is None or lon is None:
+        raise ValueError("latitude and longitude must be given together")
+    lat, lon = float(lat), float(lon)
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError("Latitude must be within -90..90 and longitude within -180..180")
+    if not timezone_str:
+        timezone_str = timezone_at(lat, lon)
+    try:
+        pytz.timezone(timezone_str)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone: {timezone_str}")
+    return lat, lon, timezone_str
+
+def get_festivals_on(date_obj, lat=None, lon=None, timezone_str=None):
+    """
+    detect_festivals for a local date at a location (see resolve_location),
+    from the pre-built calendar when it covers the date.
+    """
+    lat, lon, timezone_str = resolve_location(lat, lon, timezone_str)
+    store = _store_for(lat, lon, timezone_str)
+    if store is not None and store.covers(date_obj, date_obj):
+        return store.day(date_obj)
+    return _location_year(date_obj.year, lat, lon, timezone_str)["by_date"].get(date_obj.isoformat(), [])
+
+def get_yearly_festivals(year, lat=None, lon=None, timezone_str=None):
+    """
+    Festivals of the entire year (Jan 1 to Dec 31) at a location (see
+    resolve_location), from the pre-built calendar when it covers the year.
+    """
+    lat, lon, timezone_str = resolve_location(lat, lon, timezone_str)
+    store = _store_for(lat, lon, timezone_str)
+    if store is not None and store.covers(date(year, 1, 1), date(year, 12, 31)):
+        return store.year(year)
+    return _location_year(year, lat, lon, timezone_str)["festivals"]
+
+def _location_year(year, lat, lon, timezone_str):
     """
+    A year's festivals at a location, memoised per (H3 cell, timezone, year).
+    The sun times are computed at the cell centre (see astrology/sun_times.py),
+    so every point of a cell shares the result.
+    """
+    key = (cell_for(lat, lon), timezone_str, year)
+    entry = _by_location.get(key)
+    if entry is None:
+        entry = _in_flight.do(key, lambda: _compute_location_year(key, year, lat, lon, timezone_str))
+    return entry
+
+def _compute_location_year(key, year, lat, lon, timezone_str):
+    entry = _by_location.get(key)
+    if entry is not None:
+        return entry
+    festivals = compute_yearly_festivals(year, lat, lon, timezone_str)
+    by_date = {}
+    for festival in festivals:
+        by_date.setdefault(festival["date"], []).append(festival)
+    entry = {"festivals": festivals, "by_date": by_date}
+    _by_location.put(key, entry)
+    return entry
+
+def compute_yearly_festivals(year, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    """
+    Scan the entire year (Jan 1 to Dec 31) for festivals: the Hindu ones
+    from rules.json, then on each date the catalogue observances.
+    """
+    try:
+        # Event-driven scan of the whole year (see festivals/scanner.py)
+        hindu = scan_year(year, RULE_INDEX, lat, lon, timezone_str)
+    except ValueError:
+        # Outside the event index: fall back to the day-by-day scan
+        hindu = scan_year_daily(year, lat, lon, timezone_str)
+    # Stable sort, both lists are already in date order
+    return sorted(hindu + religion_festivals([year], timezone_str)[year], key=lambda f: f["date"])
+
+def scan_year_daily(year, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    """get_yearly_festivals by running detect_festivals for every day."""
     start_date = date(year, 1, 1)
     end_date = date(year, 12, 31)
     delta = timedelta(days=1)
     
     all_festivals = []
+
+    # Sunrises for the year (plus the days either side the rules look at) in one go
+    prefetch_sunrises(start_date - delta, (end_date - start_date).days + 4, lat, lon, timezone_str)
     
     current_date = start_date
     while current_date <= end_date:
         # Optimization: Only check if there are rules for the current Tithi? 
         # For now, running detection daily is fast enough (~0.001s per day -> ~0.4s for year)
-        daily_matches = detect_festivals(current_date)
+        daily_matches = detect_festivals(current_date, None, lat, lon, timezone_str)
         if daily_matches:
             all_festivals.extend(daily_matches)
         current_date += delta
         
     return all_festivals
+
+
+_store = None
+# (inode, mtime, size) of the file _store was opened from, None when missing
+_store_stamp = ()
+_store_lock = threading.Lock()
+_store_worker = None
+
+
+def _open_store(path):
+    """The store at path if it is current (same rules and location), else None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        store = FestivalStore(path, ALL_RULES)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring festival calendar {path}: {e}")
+        return None
+    if store.rules_digest != RULES_DIGEST or (store.lat, store.lon) != (DEFAULT_LAT, DEFAULT_LON):
+        print(f"Festival calendar {path} is stale (rules, catalogues or location changed)")
+        return None
+    return store
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def _store_for(lat, lon, timezone_str):
+    """The pre-built calendar when the location is the reference one."""
+    if timezone_str != DEFAULT_TIMEZONE or cell_for(lat, lon) != cell_for(DEFAULT_LAT, DEFAULT_LON):
+        return None
+    return get_store()
+
+def get_store():
+    """
+    Returns the shared festival calendar, or None when it is missing or
+    stale. The file is reopened whenever it changes, so a calendar written
+    by another process is picked up.
+    """
+    global _store, _store_stamp
+    stamp = _file_stamp(FESTIVAL_STORE_PATH)
+    if stamp != _store_stamp:
+        with _store_lock:
+            if stamp != _store_stamp:
+                _store = _open_store(FESTIVAL_STORE_PATH)
+                _store_stamp = stamp
+    return _store
+
+def build_festival_store(start_year=FESTIVAL_STORE_START_YEAR, end_year=FESTIVAL_STORE_END_YEAR,
+                         path=FESTIVAL_STORE_PATH):
+    """Computes start_year..end_year and writes the calendar; returns the number of festivals."""
+    return build_store(path, ALL_RULES, RULES_DIGEST, start_year, end_year,
+                       compute_yearly_festivals, DEFAULT_LAT, DEFAULT_LON)
+
+def _rebuild_store(lock):
+    try:
+        count = build_festival_store()
+        print(f"Rebuilt festival calendar {FESTIVAL_STORE_PATH} ({count} festivals)")
+    except Exception as e:
+        print(f"Festival calendar rebuild failed: {e}")
+    finally:
+        lock.close()
+
+def start_store_worker():
+    """
+    Rebuilds a missing or stale calendar in a background thread; returns it
+    (None when current). Only the process holding the lock file next to the
+    calendar builds it, the other workers serve it once it is written.
+    """
+    global _store_worker
+    with _store_lock:
+        if _store_worker is not None:
+            return _store_worker
+    if get_store() is not None:
+        return None
+    try:
+        lock = try_lock(f"{FESTIVAL_STORE_PATH}.lock")
+    except OSError as e:
+        print(f"Festival calendar rebuild skipped: {e}")
+        return None
+    if lock is None:
+        return None
+    # Another process may have finished it since the check above
+    if get_store() is not None:
+        lock.close()
+        return None
+    with _store_lock:
+        if _store_worker is None:
+            _store_worker = threading.Thread(target=_rebuild_store, args=(lock,), name="festival-calendar",
+                                             daemon=True)
+            _store_worker.start()
+        else:
+            lock.close()
+    return _store_worker
@@ -1,14 +1,12 @@
+import numpy as np
 import swisseph as swe
-from datetime import datetime
-import os
-
-# Set ephemeris path
-current_dir = os.path.dirname(os.path.abspath(__file__))
-swe.set_ephe_path(current_dir)
+from datetime import datetime, timedelta
+from astrology.ephemeris import sun_moon_sidereal
+from astrology.events import event_index_at
+from astrology.sun_times import dates_sun_times
 
 # Constants
 FLAG_SIDEREAL = swe.FLG_SWIEPH | swe.FLG_SIDEREAL
-swe.set_sid_mode(swe.SIDM_LAHIRI)
 
 TITHIS = [
     "Pratipada", "Dvitiya", "Tritiya", "Chaturthi", "Panchami",
@@ -34,51 +32,93 @@ ZODIAC = [
     "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
 ]
 
+# Reference location (Ujjain)
 DEFAULT_LAT = 23.1765
 DEFAULT_LON = 75.7885
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+
+# Hour of an idealised 6:00-18:00 day at which "timing" rules look at the
+# tithi; other timings use sunrise. The hours are mapped onto the real local
+# day and night (see timing_julian_day), so "midnight" is the middle of the night.
+TIMING_HOURS = {"noon": 12.0, "afternoon": 14.5, "evening": 18.5, "midnight": 24.0}
+DEFAULT_TIMING_HOUR = 6.0
 
 def get_julian_day(date_obj, time_hour=6.0):
     return swe.julday(date_obj.year, date_obj.month, date_obj.day, time_hour)
 
-def get_sunrise(date_obj, lat=DEFAULT_LAT, lon=DEFAULT_LON):
-    jd_start = swe.julday(date_obj.year, date_obj.month, date_obj.day, 0)
-    geopos = (lon, lat, 0.0)
-    rsmi = swe.CALC_RISE | swe.BIT_DISC_CENTER
-    try:
-        res = swe.rise_trans(jd_start, swe.SUN, rsmi, geopos, 1013.25, 15.0, swe.FLG_SWIEPH)
-        return res[1][0]
-    except swe.Error:
-        return jd_start + 0.25
+def timing_julian_day(timing, rise, set_, next_rise):
+    """
+    UT Julian day of a rule timing ("noon", "evening", ...) between a
+    sunrise, the sunset and the next sunrise. Works on arrays of days too.
+    """
+    hour = TIMING_HOURS.get(timing, DEFAULT_TIMING_HOUR)
+    if hour <= 18.0:
+        return rise + (hour - 6.0) / 12.0 * (set_ - rise)
+    return set_ + (hour - 18.0) / 12.0 * (next_rise - set_)
+
+def timing_window(timing, rise, set_, next_rise):
+    """The daylight (sunrise to sunset) or night (sunset to next sunrise) a rule timing falls in."""
+    if TIMING_HOURS.get(timing, DEFAULT_TIMING_HOUR) <= 18.0:
+        return rise, set_
+    return set_, next_rise
+
+def skipped_tithi_on_later_day(start, end, window_before, window_after, rise_after):
+    """
+    Day that keeps a tithi (start..end) which runs at neither of two
+    consecutive days' timing moments: True for the later day. That is the
+    day whose timing window (see timing_window) the tithi overlaps longer,
+    or on a tie the later day when the tithi runs at its sunrise.
+    Works on arrays of days too.
+    """
+    before = np.maximum(np.minimum(end, window_before[1]) - np.maximum(start, window_before[0]), 0.0)
+    after = np.maximum(np.minimum(end, window_after[1]) - np.maximum(start, window_after[0]), 0.0)
+    return (after > before) | ((after == before) & (start <= rise_after) & (rise_after < end))
+
+def local_sun_times(date_obj, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    """(sunrise, sunset, next sunrise) of a local date."""
+    (_, rise, set_), (_, next_rise, _) = dates_sun_times(lat, lon, [date_obj, date_obj + timedelta(days=1)], timezone_str)
+    return rise, set_, next_rise
+
+def get_sunrise(date_obj, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    return dates_sun_times(lat, lon, [date_obj], timezone_str)[0][1]
+
+def prefetch_sunrises(start_date, days, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    """Fills the sunrise cache for a run of days in one bulk query."""
+    dates_sun_times(lat, lon, [start_date + timedelta(days=k) for k in range(days)], timezone_str)
+
+def tithi_name_paksha(tithi_index):
+    """(name, paksha) of a tithi numbered 1-30 from the start of Shukla paksha."""
+    if 1 <= tithi_index <= 15:
+        return TITHIS[tithi_index - 1], "Shukla"
+    return ("Amavasya" if tithi_index == 30 else TITHIS[tithi_index - 16]), "Krishna"
 
 def calculate_tithi(jd):
-    sun = swe.calc_ut(jd, swe.SUN, FLAG_SIDEREAL)[0][0]
-    moon = swe.calc_ut(jd, swe.MOON, FLAG_SIDEREAL)[0][0]
+    sun, moon = (float(v[0]) for v in sun_moon_sidereal(jd, FLAG_SIDEREAL))
     diff = (moon - sun) % 360
     tithi_index = int(diff / 12) + 1
-    
-    if 1 <= tithi_index <= 15:
-        paksha = "Shukla"
-        tithi_name = TITHIS[tithi_index - 1]
-    else:
-        paksha = "Krishna"
-        idx = tithi_index - 16
-        tithi_name = "Amavasya" if tithi_index == 30 else TITHIS[idx]
+    tithi_name, paksha = tithi_name_paksha(tithi_index)
     return tithi_name, paksha, tithi_index
 
 def calculate_nakshatra(jd):
-    moon = swe.calc_ut(jd, swe.MOON, FLAG_SIDEREAL)[0][0]
+    moon = float(sun_moon_sidereal(jd, FLAG_SIDEREAL)[1][0])
     nak_index = int(moon / (360/27))
     return NAKSHATRAS[nak_index % 27]
 
 def calculate_solar_sign(jd):
-    sun = swe.calc_ut(jd, swe.SUN, FLAG_SIDEREAL)[0][0]
+    sun = float(sun_moon_sidereal(jd, FLAG_SIDEREAL)[0][0])
     return ZODIAC[int(sun / 30) % 12]
 
 def get_amanta_lunar_month(jd):
-    # Find exact moment of the preceding New Moon
+    # The month is named from the new moon nearest in elongation: the preceding one
+    # in Shukla paksha and the following one in Krishna paksha (purnimanta naming)
+    try:
+        return event_index_at(jd).lunar_month(jd, scheme="purnimanta")
+    except ValueError:
+        pass
+
+    # Outside the event index: refine the new moon directly
     def get_moon_sun_diff(t):
-        s = swe.calc_ut(t, swe.SUN, FLAG_SIDEREAL)[0][0]
-        m = swe.calc_ut(t, swe.MOON, FLAG_SIDEREAL)[0][0]
+        s, m = (float(v[0]) for v in sun_moon_sidereal(t, FLAG_SIDEREAL))
         return (m - s) % 360
 
     jd_nm = jd
@@ -87,12 +127,23 @@ def get_amanta_lunar_month(jd):
         if diff > 180: diff -= 360
         jd_nm -= diff / 12.19075
 
-    sun_at_nm = swe.calc_ut(jd_nm, swe.SUN, FLAG_SIDEREAL)[0][0]
+    sun_at_nm = float(sun_moon_sidereal(jd_nm, FLAG_SIDEREAL)[0][0])
     sun_sign_index = int(sun_at_nm / 30)
     return MONTHS[(sun_sign_index + 1) % 12]
 
-def get_panchang(date_obj):
-    jd_sunrise = get_sunrise(date_obj)
+def sankranti_on(date_obj, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    """Sign the Sun enters between this day's sunrise and the next, or None."""
+    rise, _, next_rise = local_sun_times(date_obj, lat, lon, timezone_str)
+    try:
+        ingresses = event_index_at(rise, next_rise).sankrantis_between(rise, next_rise)
+    except ValueError:
+        # Outside the event index: compare the signs at the two sunrises
+        sign = calculate_solar_sign(next_rise)
+        return sign if sign != calculate_solar_sign(rise) else None
+    return ZODIAC[ingresses[-1][1]] if ingresses else None
+
+def get_panchang(date_obj, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    jd_sunrise = get_sunrise(date_obj, lat, lon, timezone_str)
     tithi_name, paksha, tithi_index = calculate_tithi(jd_sunrise)
     nakshatra = calculate_nakshatra(jd_sunrise)
     lunar_month = get_amanta_lunar_month(jd_sunrise)
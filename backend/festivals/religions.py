@@ -0,0 +1,204 @@
+"""
+Islamic, Christian, astronomical and national observances.
+
+The catalogues in festival_religion/ describe each observance (religion,
+category, priority, ...) and, for those with a date, how it is reckoned:
+
+    {"kind": "hijri", "month": 10, "day": 1}          Hijri date
+    {"kind": "easter", "offset": -2}                   days from Easter Sunday
+    {"kind": "fixed", "month": 12, "day": 25}          Gregorian date
+    {"kind": "nth_weekday", "month": 11, "weekday": 3, "n": 4}
+                                                       n-th weekday (0 = Monday) of the month
+    {"kind": "season", "longitude": 0}                 equinox / solstice (tropical Sun at 0/90/180/270),
+                                                       "weekday_before": 4 for the Friday before it
+    {"kind": "moon_phase", "phase": "new"}             every new (or full) moon
+
+Gregorian and Easter dates are computed for all the years at once with
+numpy; the Hijri months, seasons and moon phases come from the event index
+(astrology/events.py), so those are only given for years inside it. A Hijri
+month starts the day after the conjunction when it falls before sunset at
+Mecca, otherwise a day later (a calculated criterion, not a sighting).
+Observances without a rule (Jummah, eclipses, meteor showers) are not dated.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from astrology.events import get_event_index
+from astrology.panchang import WEEKDAYS
+from astrology.sun_times import dates_sun_times, local_midnight_jd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+CATALOGUE_DIR = os.path.join(current_dir, "festival_religion")
+CATALOGUE_FILES = ("IslamicFestivals.json", "ChristianFestivals.json", "AstronomicalEvents.json", "National.json")
+CATALOGUE_PATHS = [os.path.join(CATALOGUE_DIR, name) for name in CATALOGUE_FILES]
+
+HIJRI_MONTHS = [
+    "Muharram", "Safar", "Rabi al-Awwal", "Rabi al-Thani", "Jumada al-Awwal", "Jumada al-Thani",
+    "Rajab", "Shaban", "Ramadan", "Shawwal", "Dhu al-Qadah", "Dhu al-Hijjah",
+]
+# Conjunction before 1 Muharram 1446 (2024-07-07), 2024-07-05 22:57 UT
+HIJRI_EPOCH_JD = 2460497.456
+HIJRI_EPOCH_MONTH = 1446 * 12
+SYNODIC_MONTH = 29.530588
+MECCA = (21.4225, 39.8262, "Asia/Riyadh")
+
+SEASON_NAMES = {0: "March equinox", 90: "June solstice", 180: "September equinox", 270: "December solstice"}
+
+
+def _load_catalogue():
+    """name -> catalogue item, for the observances that have a rule (first entry of a name wins)."""
+    catalogue = {}
+    for path in CATALOGUE_PATHS:
+        with open(path, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                if "rule" in item and item["name"] not in catalogue:
+                    catalogue[item["name"]] = item
+    return catalogue
+
+
+CATALOGUE = _load_catalogue()
+_ORDER = {name: order for order, name in enumerate(CATALOGUE)}
+
+
+def catalogue_entry(name, item, date_obj):
+    """The festival dict reported for a catalogue observance."""
+    entry = {"name": name}
+    entry.update((key, value) for key, value in item.items() if key not in ("name", "rule"))
+    rule = item["rule"]
+    if rule["kind"] == "hijri":
+        entry["details"] = f"{rule['day']} {HIJRI_MONTHS[rule['month'] - 1]}"
+    elif rule["kind"] == "season":
+        entry["details"] = SEASON_NAMES[rule["longitude"]]
+        if "weekday_before" in rule:
+            entry["details"] = f"{WEEKDAYS[rule['weekday_before']]} before the {entry['details']}"
+    entry["date"] = date_obj.isoformat()
+    return entry
+
+
+def _to_dates(days):
+    """datetime64[D] array -> list of dates."""
+    return days.astype(object).tolist()
+
+
+def _month_starts(years, month):
+    return (years - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (month - 1)
+
+
+def _fixed(years, month, day):
+    return _month_starts(years, month).astype("datetime64[D]") + (day - 1)
+
+
+def _nth_weekday(years, month, weekday, n):
+    first = _fixed(years, month, 1)
+    # 1970-01-01 was a Thursday (3)
+    first_weekday = (first.astype(np.int64) + 3) % 7
+    return first + ((weekday - first_weekday) % 7 + (n - 1) * 7)
+
+
+def _easter(years):
+    """Easter Sunday of each Gregorian year (anonymous Gregorian computus)."""
+    a = years % 19
+    b, c = years // 100, years % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    n = h + l - 7 * m + 114
+    return _fixed(years, n // 31, n % 31 + 1)
+
+
+class _LocalDays:
+    """Local dates of UT Julian days in a timezone, over first..last."""
+
+    def __init__(self, first, last, timezone_str):
+        self.days = [first + timedelta(days=k) for k in range((last - first).days + 1)]
+        self.midnights = np.array([local_midnight_jd(d, timezone_str) for d in self.days])
+
+    def dates(self, jds):
+        return [self.days[i] for i in (np.searchsorted(self.midnights, jds, side="right") - 1).tolist()]
+
+
+def _hijri_starts(events, first, last):
+    """[(date of the 1st, hijri month 1-12)] for the months starting first..last."""
+    lat, lon, timezone_str = MECCA
+    lo = local_midnight_jd(first - timedelta(days=2), timezone_str)
+    hi = local_midnight_jd(last, timezone_str)
+    conjunctions = [jd for jd in events.new_moons if lo <= jd < hi]
+    if not conjunctions:
+        return []
+    local = _LocalDays(first - timedelta(days=2), last, timezone_str)
+    conj_days = local.dates(np.array(conjunctions))
+    sunsets = [set_ for _, _, set_ in dates_sun_times(lat, lon, conj_days, timezone_str)]
+    lunations = np.rint((np.array(conjunctions) - HIJRI_EPOCH_JD) / SYNODIC_MONTH).astype(np.int64)
+    months = ((HIJRI_EPOCH_MONTH + lunations) % 12 + 1).tolist()
+    return [
+        (day + timedelta(days=1 if jd < sunset else 2), month)
+        for day, jd, sunset, month in zip(conj_days, conjunctions, sunsets, months)
+    ]
+
+
+def religion_festivals(years, timezone_str):
+    """
+    {year: [festival, ...]} of the catalogue observances in each of `years`,
+    sorted by date then catalogue order. Equinoxes, solstices and moon
+    phases are dated in timezone_str.
+    """
+    years = sorted(set(years))
+    out = {year: [] for year in years}
+    arr = np.array(years, dtype=np.int64)
+
+    found = []  # (date, name)
+    easter = _easter(arr)
+    for name, item in CATALOGUE.items():
+        rule = item["rule"]
+        if rule["kind"] == "fixed":
+            found += [(d, name) for d in _to_dates(_fixed(arr, rule["month"], rule["day"]))]
+        elif rule["kind"] == "nth_weekday":
+            found += [(d, name) for d in _to_dates(_nth_weekday(arr, rule["month"], rule["weekday"], rule["n"]))]
+        elif rule["kind"] == "easter":
+            found += [(d, name) for d in _to_dates(easter + rule["offset"])]
+
+    events = get_event_index(years[0] - 1, years[-1] + 1)
+    in_index = [year for year in years if events.start_year <= year <= events.end_year]
+    if in_index:
+        first, last = date(in_index[0], 1, 1), date(in_index[-1] + 1, 1, 1)
+        local = _LocalDays(first, last, timezone_str)
+        lo, hi = local.midnights[0], local.midnights[-1]
+        # Local midnight of the first day can be before the index starts (east of Greenwich)
+        seasons = events.seasons_between(max(lo, events.start_jd), hi)
+        season_days = {}
+        for (jd, quarter), day in zip(seasons, local.dates(np.array([jd for jd, _ in seasons]))):
+            season_days.setdefault(quarter * 90, []).append(day)
+        phases = {
+            "new": local.dates(np.array([jd for jd in events.new_moons if lo <= jd < hi])),
+            "full": local.dates(np.array([jd for jd in events.full_moons if lo <= jd < hi])),
+        }
+        # Months starting in the previous November/December run into January, so the
+        # first indexed year has no complete Hijri dates
+        hijri_years = {year for year in in_index if year > events.start_year}
+        hijri = _hijri_starts(events, date(min(hijri_years) - 1, 11, 1), last) if hijri_years else []
+
+        for name, item in CATALOGUE.items():
+            rule = item["rule"]
+            if rule["kind"] == "season":
+                days = season_days.get(rule["longitude"], [])
+                if "weekday_before" in rule:
+                    days = [d - timedelta(days=(d.weekday() - rule["weekday_before"]) % 7 or 7) for d in days]
+                found += [(d, name) for d in days]
+            elif rule["kind"] == "moon_phase":
+                found += [(d, name) for d in phases[rule["phase"]]]
+            elif rule["kind"] == "hijri":
+                days = [start + timedelta(days=rule["day"] - 1) for start, month in hijri if month == rule["month"]]
+                found += [(d, name) for d in days if d.year in hijri_years]
+
+    found.sort(key=lambda f: (f[0], _ORDER[f[1]]))
+    for d, name in found:
+        if d.year in out:
+            out[d.year].append(catalogue_entry(name, CATALOGUE[name], d))
+    return out
@@ -0,0 +1,130 @@
+"""
+Festival rules compiled into hashed indices.
+
+At load time the rules (rules.json format) are bucketed so a day is matched
+with a few dict lookups instead of a scan over every rule:
+
+    lunar:  (timing, pattern, lunar_month, paksha, tithi) -> rules
+    solar:  sun_sign -> rules
+    fixed:  (month, day) -> rules
+
+A lunar rule that leaves out lunar_month, paksha or tithi is stored with
+None in that place; the pattern records which of the three the rule gives,
+and a day is looked up once per pattern in use. The timing is None for rules checked at sunrise. Nakshatra
+conditions, which few rules have, are checked on the matched rules.
+
+For whole-year scans the lunar buckets are also flattened into one boolean
+table per timing over (lunar month, tithi number), so the days worth a
+lookup are picked out with a single numpy indexing.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from .panchang import MONTHS, tithi_name_paksha
+
+LUNAR_FIELDS = ("lunar_month", "paksha", "tithi")
+
+
+class RuleIndex:
+    def __init__(self, rules):
+        self.rules = rules
+        self.lunar = defaultdict(list)
+        self.solar = defaultdict(list)
+        self.fixed = defaultdict(list)
+        # Which of LUNAR_FIELDS the lunar rules specify, e.g. (True, True, True)
+        self.patterns = set()
+        # (timing, lunar_month) pairs with rules, lunar_month None for any month
+        self._timing_months = set()
+
+        for order, (name, rule) in enumerate(rules.items()):
+            entry = (order, name, rule)
+            kind = rule.get("type")
+            if kind == "fixed":
+                self.fixed[(rule.get("month"), rule.get("day"))].append(entry)
+            elif kind == "solar":
+                self.solar[rule.get("sun_sign")].append(entry)
+            else:
+                timing = rule.get("timing") or None
+                pattern = tuple(field in rule for field in LUNAR_FIELDS)
+                self.patterns.add(pattern)
+                self.lunar[(timing, pattern) + tuple(rule.get(field) for field in LUNAR_FIELDS)].append(entry)
+                self._timing_months.add((timing, rule.get("lunar_month")))
+
+        self.timings = sorted({timing for timing, _ in self._timing_months if timing})
+        self.has_solar = bool(self.solar)
+        self.tables = {timing: self._lunar_table(timing) for timing in [None] + self.timings}
+        self.fixed_codes = np.array([month * 32 + day for month, day in self.fixed
+                                     if isinstance(month, int) and isinstance(day, int)], dtype=int)
+
+    def _lunar_table(self, timing):
+        """table[month_index * 30 + tithi - 1]: some lunar rule at `timing` may match (nakshatra aside)."""
+        table = np.zeros(len(MONTHS) * 30, dtype=bool)
+        for m, month in enumerate(MONTHS):
+            for number in range(1, 31):
+                values = (month,) + tithi_name_paksha(number)[::-1]
+                table[m * 30 + number - 1] = any(
+                    (timing, pattern) + tuple(v if used else None for v, used in zip(values, pattern)) in self.lunar
+                    for pattern in self.patterns
+                )
+        return table
+
+    def __len__(self):
+        return len(self.rules)
+
+    def needs_timing(self, timing, lunar_month):
+        """True when some rule at this timing can match a day in lunar_month."""
+        return (timing, lunar_month) in self._timing_months or (timing, None) in self._timing_months
+
+    def lunar_matches(self, timing, lunar_month, state):
+        """(order, name, rule) of the lunar rules at `timing` matching the month and a tithi state."""
+        values = (lunar_month, state["paksha"], state["tithi"])
+        found = []
+        for pattern in self.patterns:
+            key = (timing, pattern) + tuple(v if used else None for v, used in zip(values, pattern))
+            for entry in self.lunar.get(key, ()):
+                rule = entry[2]
+                if "nakshatra" not in rule or rule["nakshatra"] == state["nakshatra"]:
+                    found.append(entry)
+        return found
+
+    def match(self, date_obj, lunar_month, states, sankranti=None, skipped=()):
+        """
+        Rules matching one day, in rule order, as (name, rule, state).
+
+        states: {timing: {"tithi", "paksha", "nakshatra"}} with None for
+        sunrise and each of self.timings needed for the day (see needs_timing);
+        sankranti: sign the Sun enters during the day, if any;
+        skipped: (timing, state) of the tithis kept on this day that run at
+        no day's timing moment (see skipped_tithi_on_later_day).
+        """
+        found = [(order, name, rule, None) for order, name, rule in self.fixed.get((date_obj.month, date_obj.day), ())]
+        if sankranti is not None:
+            found += [(order, name, rule, None) for order, name, rule in self.solar.get(sankranti, ())]
+        for timing, state in list(states.items()) + list(skipped):
+            found += [(order, name, rule, state) for order, name, rule in self.lunar_matches(timing, lunar_month, state)]
+        found.sort(key=lambda f: f[0])
+        return [(name, rule, state) for _, name, rule, state in found]
+
+
+def festival_entry(name, rule, state, lunar_month, date_obj):
+    """The festival dict reported for a matched rule."""
+    kind = rule.get("type")
+    if kind == "fixed":
+        return {"name": name, "type": "National/Fixed Festival", "date": date_obj.isoformat()}
+    if kind == "solar":
+        return {
+            "name": name,
+            "type": "Solar Festival",
+            "details": f"Sun enters {rule.get('sun_sign')}",
+            "date": date_obj.isoformat(),
+        }
+    return {
+        "name": name,
+        "tithi": state["tithi"],
+        "paksha": state["paksha"],
+        "lunar_month": lunar_month,
+        "nakshatra": state["nakshatra"],
+        "type": rule.get("type", "Hindu Festival").title(),
+        "date": date_obj.isoformat(),
+    }
@@ -0,0 +1,152 @@
+"""
+Event-driven festival scan for a whole year.
+
+Instead of a panchang per day (and more per rule), the year's tithi and
+nakshatra boundaries come from one limb_transitions solve and the new
+moons / sankrantis from the event index. Each day's state at sunrise and at
+the rule timings (noon, afternoon, evening, midnight) is then a
+searchsorted into those sorted lists. The RuleIndex lunar tables (see
+rule_index.py) pick out the days on which some rule can match, and only
+those are looked up rule by rule.
+
+A tithi that runs at no day's timing moment (it starts after one day's and
+ends before the next) is kept on the neighbouring day whose window it
+overlaps longer, so a timing rule is never dropped for the month.
+
+The results are the same as running detect_festivals for every day, in the
+same order (by date, then by rule).
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from astrology.events import get_event_index
+from astrology.panchang_solver import limb_transitions
+from astrology.sun_times import dates_sun_times
+from festivals.panchang import (
+    DEFAULT_LAT, DEFAULT_LON, DEFAULT_TIMEZONE, MONTHS, NAKSHATRAS, ZODIAC, skipped_tithi_on_later_day,
+    timing_julian_day, timing_window, tithi_name_paksha,
+)
+from festivals.rule_index import festival_entry
+
+# (name, paksha) of tithi numbers 1-30
+TITHI_NAMES = [tithi_name_paksha(i) for i in range(1, 31)]
+
+
+class _State:
+    """Tithi numbers (1-30) and nakshatra indices at one moment of every day."""
+
+    def __init__(self, jds, transitions):
+        self.tithi = _running(transitions["tithi"], jds) + 1
+        self.nakshatra = _running(transitions["nakshatra"], jds)
+
+    def on(self, i):
+        """The day's state as RuleIndex.match expects it."""
+        tithi, paksha = TITHI_NAMES[self.tithi[i] - 1]
+        return {"tithi": tithi, "paksha": paksha, "nakshatra": NAKSHATRAS[self.nakshatra[i]]}
+
+
+def _running(transition, jds):
+    times, indices = transition
+    return indices[np.searchsorted(times, jds, side="right") - 1]
+
+
+def _skipped_tithis(timing, moments, tithi_transitions, rises, sets):
+    """
+    {day: tithi number} of the tithis running at no day's timing moment,
+    on the day that keeps them (see skipped_tithi_on_later_day). moments,
+    rises and sets run from the day before the first day to the day after
+    the last (rises one longer), the days counted from the first.
+    """
+    times, indices = tithi_transitions
+    running = np.searchsorted(times, moments, side="right") - 1
+    k = np.nonzero(running[1:] - running[:-1] == 2)[0]
+    if not k.size:
+        return {}
+    first = running[k] + 1
+    windows = timing_window(timing, rises[:-1], sets, rises[1:])
+    before, after = (windows[0][k], windows[1][k]), (windows[0][k + 1], windows[1][k + 1])
+    later = skipped_tithi_on_later_day(times[first], times[first + 1], before, after, rises[k + 1])
+    # Day k of the extended list is day k - 1 of the year
+    days = k + later.astype(np.int64) - 1
+    return {
+        day: number for day, number in zip(days.tolist(), (indices[first] + 1).tolist())
+        if 0 <= day < len(moments) - 2
+    }
+
+
+def scan_year(year, index, lat=DEFAULT_LAT, lon=DEFAULT_LON, timezone_str=DEFAULT_TIMEZONE):
+    """
+    Festivals of `year` (local dates) for the rules compiled in `index` (a
+    RuleIndex), as the list of detect_festivals results for every day.
+    Raises ValueError when the year is outside the event index.
+    """
+    # The lunar months at either end of the year reach into its neighbours
+    events = get_event_index(year - 1, year + 1)
+    start = date(year, 1, 1)
+    days = [start + timedelta(days=k) for k in range(-1, (date(year + 1, 1, 1) - start).days + 2)]
+
+    # Sunrise and sunset of every day and the days either side of the year, and the sunrise after
+    sun = dates_sun_times(lat, lon, days, timezone_str)
+    days = days[1:-2]
+    all_rises = np.array([rise for _, rise, _ in sun])
+    all_sets = np.array([set_ for _, _, set_ in sun[:-1]])
+    rises = all_rises[1:-1]
+    sunrise = rises[:-1]
+
+    # Every timing falls between a sunrise and the next
+    all_moments = {
+        timing: timing_julian_day(timing, all_rises[:-1], all_sets, all_rises[1:]) for timing in index.timings
+    }
+    transitions = limb_transitions(all_rises[0], all_rises[-1], enclose=True, limbs=("tithi", "nakshatra"))
+
+    at_sunrise = _State(sunrise, transitions)
+    at_timing = {timing: _State(jds[1:-1], transitions) for timing, jds in all_moments.items()}
+    skipped = {
+        timing: _skipped_tithis(timing, jds, transitions["tithi"], all_rises, all_sets)
+        for timing, jds in all_moments.items()
+    }
+
+    # The (purnimanta) lunar month only changes at new and full moons
+    lunar_month = np.empty(len(days), dtype=np.int64)
+    until = -np.inf
+    for i, jd in enumerate(sunrise.tolist()):
+        if jd >= until:
+            month = events.lunar_month_index(jd, scheme="purnimanta")
+            until = min(events.next_new_moon(jd), events.next_full_moon(jd))
+        lunar_month[i] = month
+
+    # Sign entered between each sunrise and the next (last ingress in (rise, next rise])
+    sankrantis = np.array(events.sankrantis)
+    after = np.searchsorted(sankrantis, rises, side="right")
+    has_sankranti = after[1:] > after[:-1]
+    sankranti_sign = np.where(has_sankranti, np.array(events.sankranti_signs)[after[1:] - 1], -1)
+
+    # Days on which some rule can match
+    candidate = has_sankranti & index.has_solar
+    candidate |= np.isin(np.array([d.month * 32 + d.day for d in days]), index.fixed_codes)
+    for timing, table in index.tables.items():
+        state = at_timing[timing] if timing else at_sunrise
+        candidate |= table[lunar_month * 30 + state.tithi - 1]
+    for timing, kept in skipped.items():
+        for i, number in kept.items():
+            candidate[i] |= index.tables[timing][lunar_month[i] * 30 + number - 1]
+
+    festivals = []
+    for i in np.nonzero(candidate)[0].tolist():
+        day = days[i]
+        month = MONTHS[lunar_month[i]]
+        states = {None: at_sunrise.on(i)}
+        for timing, state in at_timing.items():
+            if index.needs_timing(timing, month):
+                states[timing] = state.on(i)
+        kept = [
+            (timing, dict(states[timing], tithi=TITHI_NAMES[numbers[i] - 1][0], paksha=TITHI_NAMES[numbers[i] - 1][1]))
+            for timing, numbers in skipped.items() if i in numbers and timing in states
+        ]
+        sankranti = ZODIAC[sankranti_sign[i]] if sankranti_sign[i] >= 0 else None
+        festivals.extend(
+            festival_entry(name, rule, state, month, day)
+            for name, rule, state in index.match(day, month, states, sankranti, kept)
+        )
+    return festivals
@@ -0,0 +1,237 @@
+"""
+Offline city gazetteer.
+
+Loads either a GeoNames cities dump (cities15000.txt and friends, fetched by
+download_gazetteer.py) or the small bundled data/cities.tsv, and indexes it
+two ways:
+
+- a hash of normalised names (and alternate names) for exact lookups;
+  state/country parts after a comma narrow the match (a part that is no
+  known region makes the lookup fail, so the online geocoder gets it), and
+- a sorted array of the same names searched with bisect, which serves as
+  a compact prefix index for autocomplete.
+
+    gazetteer = get_gazetteer()
+    gazetteer.geocode("surat ,gujarat")    # -> Place(name='Surat', ...)
+    gazetteer.autocomplete("sur", limit=5)
+"""
+import csv
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(current_dir, "data")
+BUNDLED_PATH = os.path.join(DATA_DIR, "cities.tsv")
+GEONAMES_PATH = os.path.join(DATA_DIR, "cities15000.txt")
+# Explicit gazetteer file; otherwise the GeoNames dump when downloaded, else the bundled list
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH")
+
+# Alternate names per GeoNames city are capped; most are other scripts and spellings nobody types
+MAX_ALTERNATE_NAMES = 12
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    admin1: str             # state / province
+    country: str
+    country_code: str
+    latitude: float
+    longitude: float
+    timezone: str = None    # IANA zone, None when unknown (online results)
+    population: int = 0
+
+    @property
+    def display_name(self):
+        parts = [self.name]
+        for part in (self.admin1, self.country):
+            if part and part != parts[-1]:
+                parts.append(part)
+        return ", ".join(parts)
+
+
+def normalize(text):
+    """Lowercase ASCII form used for matching: accents, punctuation and extra spaces removed."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[^a-z0-9, ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _split_query(query):
+    """'Surat ,Gujarat, India' -> ('surat', ['gujarat', 'india'])."""
+    parts = [p.strip() for p in normalize(query).split(",")]
+    parts = [p for p in parts if p]
+    if not parts:
+        return "", []
+    return parts[0], parts[1:]
+
+
+def _is_postcode(part):
+    """PIN codes and postcodes ("395003", "sw1a 1aa") carry digits, region names do not."""
+    return any(c.isdigit() for c in part)
+
+
+class Gazetteer:
+    """Indexes (Place, alternate names) entries for exact and prefix lookups."""
+
+    def __init__(self, entries):
+        # Most populous first, so every index lists its best match first
+        entries = sorted(entries, key=lambda e: -e[0].population)
+        self.places = [place for place, _ in entries]
+        self._region_fields = [
+            tuple(normalize(v) for v in (p.admin1, p.country, p.country_code) if v) for p in self.places
+        ]
+        self._exact = {}
+
+        for idx, (place, alternates) in enumerate(entries):
+            names = {normalize(n) for n in (place.name, *alternates)}
+            for name in names - {""}:
+                self._exact.setdefault(name, []).append(idx)
+
+        # Prefix index: sorted keys with the places they name (population order)
+        self._prefix_keys = sorted(self._exact)
+        self._prefix_ids = [self._exact[k] for k in self._prefix_keys]
+
+    def _matches_region(self, idx, qualifiers):
+        """Every qualifier but PIN/postcodes must name the place's state or country."""
+        fields = self._region_fields[idx]
+        return all(q in fields for q in qualifiers if not _is_postcode(q))
+
+    def geocode(self, query):
+        """Best Place for a free-text query, or None."""
+        name, qualifiers = _split_query(query)
+        if not name:
+            return None
+
+        candidates = self._exact.get(name)
+        if candidates is None and not qualifiers:
+            # "surat gujarat": the longest leading run of words that is a place name
+            words = name.split()
+            for k in range(len(words) - 1, 0, -1):
+                candidates = self._exact.get(" ".join(words[:k]))
+                if candidates is not None:
+                    qualifiers = [" ".join(words[k:])]
+                    break
+        if not candidates:
+            return None
+
+        for idx in candidates:
+            if self._matches_region(idx, qualifiers):
+                return self.places[idx]
+        return None
+
+    def autocomplete(self, query, limit=5):
+        """Places whose name starts with the query, most populous first."""
+        prefix, qualifiers = _split_query(query)
+        if not prefix:
+            return []
+
+        found = set()
+        i = bisect_left(self._prefix_keys, prefix)
+        while i < len(self._prefix_keys) and self._prefix_keys[i].startswith(prefix):
+            found.update(self._prefix_ids[i])
+            i += 1
+
+        results = []
+        for idx in sorted(found):
+            # While typing, a qualifier only has to be the start of the region name
+            fields = self._region_fields[idx]
+            if all(any(f.startswith(q) for f in fields) for q in qualifiers):
+                results.append(self.places[idx])
+                if len(results) >= limit:
+                    break
+        return results
+
+    def __len__(self):
+        return len(self.places)
+
+
+def load_bundled(path=BUNDLED_PATH):
+    """Reads the bundled tab-separated list (header row, '#' comments) into (Place, alternates)."""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        rows = csv.DictReader((line for line in f if not line.startswith("#")), delimiter="\t")
+        for row in rows:
+            place = Place(
+                name=row["name"],
+                admin1=row["admin1"],
+                country=row["country"],
+                country_code=row["country_code"],
+                latitude=float(row["latitude"]),
+                longitude=float(row["longitude"]),
+                timezone=row["timezone"] or None,
+                population=int(row["population"] or 0),
+            )
+            entries.append((place, [a for a in row["alternatenames"].split(",") if a]))
+    return entries
+
+
+def _read_lookup(path, key_col, value_col, sep="\t"):
+    table = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                cols = line.rstrip("\n").split(sep)
+                if len(cols) > max(key_col, value_col):
+                    table[cols[key_col]] = cols[value_col]
+    return table
+
+
+def load_geonames(path):
+    """
+    Reads a GeoNames cities dump (19 tab-separated columns). Region and
+    country names come from admin1CodesASCII.txt and countryInfo.txt next to
+    it when present; otherwise the codes are used.
+    """
+    folder = os.path.dirname(path)
+    admin1_names = _read_lookup(os.path.join(folder, "admin1CodesASCII.txt"), 0, 1)
+    country_names = _read_lookup(os.path.join(folder, "countryInfo.txt"), 0, 4)
+
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 19:
+                continue
+            cc = cols[8]
+            # Alternate names in Latin script only; the rest cannot be typed into the search box
+            alternates = [a for a in cols[3].split(",") if a and normalize(a) and a.isascii()]
+            place = Place(
+                name=cols[1],
+                admin1=admin1_names.get(f"{cc}.{cols[10]}", cols[10]),
+                country=country_names.get(cc, cc),
+                country_code=cc,
+                latitude=float(cols[4]),
+                longitude=float(cols[5]),
+                timezone=cols[17] or None,
+                population=int(cols[14] or 0),
+            )
+            entries.append((place, [cols[2]] + alternates[:MAX_ALTERNATE_NAMES]))
+    return entries
+
+
+def load_gazetteer(path=None):
+    path = path or GAZETTEER_PATH or (GEONAMES_PATH if os.path.exists(GEONAMES_PATH) else BUNDLED_PATH)
+    loader = load_bundled if path.endswith(".tsv") else load_geonames
+    return Gazetteer(loader(path))
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Returns the shared gazetteer, loading it on first use."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer()
+    return _gazetteer
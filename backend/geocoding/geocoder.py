@@ -0,0 +1,186 @@
+"""
+Place-name geocoding: the offline gazetteer first, Nominatim/Photon only as
+an optional fallback for places it does not know. Autocomplete suggestions
+(suggest) put the Nominatim matches first and fill up from the gazetteer.
+
+Set GEOCODER_ONLINE_FALLBACK=0 to never leave the process (unknown places
+then raise ValueError).
+
+Online results are cached by normalised query as (lat, lon, tz): an
+in-process LRU in front of a SQLite file (GEOCODE_CACHE_DB, entries expire
+after GEOCODE_CACHE_TTL seconds). Concurrent lookups of the same query share
+one request. Failed lookups are not cached.
+"""
+import os
+
+import requests
+from geopy.geocoders import Nominatim, Photon
+
+from geocoding.gazetteer import DATA_DIR, Place, get_gazetteer, normalize
+from geocoding.nominatim_proxy import RateLimited, get_nominatim_proxy
+from geocoding.timezones import timezone_at
+from utils.cache import LRUCache, SingleFlight, SQLiteCache
+
+GEOCODER_ONLINE_FALLBACK = os.getenv("GEOCODER_ONLINE_FALLBACK", "1").lower() not in ("0", "false", "no")
+GEOCODER_USER_AGENT = "vedic_astrology_app"
+GEOCODER_TIMEOUT = 10
+# Suggestions this close (degrees) with the same name are one place
+SAME_PLACE_DEGREES = 0.1
+
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+# Empty string keeps the cache in memory only
+GEOCODE_CACHE_DB = os.getenv("GEOCODE_CACHE_DB", os.path.join(DATA_DIR, "geocode_cache.sqlite"))
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+
+_memory = LRUCache(GEOCODE_CACHE_SIZE)
+_in_flight = SingleFlight()
+_disk = None
+_disk_ready = False
+
+
+def _disk_cache():
+    global _disk, _disk_ready
+    if not _disk_ready:
+        _disk_ready = True
+        if GEOCODE_CACHE_DB:
+            try:
+                _disk = SQLiteCache(GEOCODE_CACHE_DB, table="geocode", ttl=GEOCODE_CACHE_TTL)
+            except Exception as e:
+                print(f"Warning: geocode cache {GEOCODE_CACHE_DB} unavailable, using memory only: {e}")
+    return _disk
+
+
+def geocode_online(location):
+    """Resolves a place name via Nominatim, falling back to Photon. Returns a Place or None."""
+    try:
+        geolocator = Nominatim(user_agent=GEOCODER_USER_AGENT, timeout=GEOCODER_TIMEOUT)
+        found = geolocator.geocode(location)
+        if not found:
+            raise Exception("Nominatim failed")
+    except Exception:
+        geolocator = Photon(user_agent=GEOCODER_USER_AGENT, timeout=GEOCODER_TIMEOUT)
+        found = geolocator.geocode(location)
+
+    if not found:
+        return None
+    return Place(
+        name=location,
+        admin1="",
+        country="",
+        country_code="",
+        latitude=found.latitude,
+        longitude=found.longitude,
+    )
+
+
+def _place_from_cached(location, value):
+    return Place(
+        name=location,
+        admin1="",
+        country="",
+        country_code="",
+        latitude=value["lat"],
+        longitude=value["lon"],
+        timezone=value["tz"],
+    )
+
+
+def _resolve_online(key, location):
+    disk = _disk_cache()
+    value = disk.get(key) if disk else None
+    if value is None:
+        place = geocode_online(location)
+        if place is None:
+            return None
+        value = {
+            "lat": place.latitude,
+            "lon": place.longitude,
+            "tz": timezone_at(place.latitude, place.longitude),
+        }
+        if disk:
+            disk.put(key, value)
+    _memory.put(key, value)
+    return value
+
+
+def geocode_online_cached(location):
+    """geocode_online behind the LRU/SQLite cache; the returned Place carries its timezone."""
+    key = normalize(location)
+    if not key:
+        return None
+    value = _memory.get(key)
+    if value is None:
+        value = _in_flight.do(key, lambda: _resolve_online(key, location))
+    return _place_from_cached(location, value) if value else None
+
+
+def cache_stats():
+    return _memory.stats()
+
+
+def geocode(location):
+    """Resolves a place name to a Place; raises ValueError when it cannot be found."""
+    place = get_gazetteer().geocode(location)
+    if place is None and GEOCODER_ONLINE_FALLBACK:
+        place = geocode_online_cached(location)
+    if place is None:
+        raise ValueError(f"Could not find location for '{location}'")
+    return place
+
+
+def autocomplete(query, limit=5):
+    """Gazetteer suggestions for a partly typed place name."""
+    return get_gazetteer().autocomplete(query, limit)
+
+
+def _same_place(a, b):
+    """Two Nominatim-shaped results naming the same place (same name, nearby coordinates)."""
+    def name(result):
+        return normalize(result.get("display_name", "").split(",")[0])
+    try:
+        close = (abs(float(a["lat"]) - float(b["lat"])) < SAME_PLACE_DEGREES
+                 and abs(float(a["lon"]) - float(b["lon"])) < SAME_PLACE_DEGREES)
+    except (KeyError, TypeError, ValueError):
+        return False
+    return close and name(a) == name(b)
+
+
+def suggest(query, limit=5):
+    """
+    Nominatim-shaped suggestions for a partly typed place name: the upstream
+    search (cached and rate limited, see nominatim_proxy.py) first, then the
+    gazetteer places it did not return, up to `limit`. Only the gazetteer's
+    without the online fallback, or when the upstream search fails and the
+    gazetteer has some.
+    """
+    offline = [nominatim_result(p) for p in autocomplete(query, limit)]
+    if not GEOCODER_ONLINE_FALLBACK:
+        return offline
+    try:
+        online = get_nominatim_proxy().search(query, limit)
+    except (RateLimited, requests.RequestException) as e:
+        if not offline:
+            raise
+        print(f"Nominatim search failed, gazetteer suggestions only: {e}")
+        return offline
+    merged = online + [r for r in offline if not any(_same_place(r, o) for o in online)]
+    return merged[:limit]
+
+
+def nominatim_result(place):
+    """A Place shaped like a Nominatim search result, for the /proxy/nominatim clients."""
+    return {
+        "display_name": place.display_name,
+        "name": place.name,
+        "lat": f"{place.latitude:.7f}",
+        "lon": f"{place.longitude:.7f}",
+        "class": "place",
+        "type": "city",
+        "address": {
+            "city": place.name,
+            "state": place.admin1,
+            "country": place.country,
+            "country_code": place.country_code.lower(),
+        },
+        "timezone": place.timezone,
+    }
@@ -0,0 +1,203 @@
+"""
+Upstream client behind /proxy/nominatim.
+
+- One keep-alive requests.Session (connection pool) for all upstream calls.
+- Responses are cached by normalised (q, limit) for NOMINATIM_CACHE_TTL
+  seconds. A query can also be answered from a cached shorter prefix of it
+  ("sura" -> "surat") when enough of those results still match.
+- Concurrent identical queries share one upstream call.
+- A token bucket spaces upstream calls to NOMINATIM_RATE per second (the
+  public server allows 1/s); callers wait for a token instead of failing,
+  and give up only after NOMINATIM_MAX_WAIT seconds. The bucket is kept in
+  NOMINATIM_RATE_FILE, so all web workers on a machine share the one rate;
+  with NOMINATIM_RATE_FILE empty each process has its own (N workers then
+  make up to N calls per second).
+
+NOMINATIM_URL points the proxy at another instance (or a local stub in tests).
+"""
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.cache import LRUCache, SingleFlight
+from utils.file_lock import hold_lock
+
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+NOMINATIM_USER_AGENT = "TheAstroPulse/1.0"   # Nominatim requires a User-Agent
+NOMINATIM_RATE = float(os.getenv("NOMINATIM_RATE", "1"))
+NOMINATIM_MAX_WAIT = float(os.getenv("NOMINATIM_MAX_WAIT", "10"))
+# Token bucket file shared by every process on the machine; empty for one bucket per process
+NOMINATIM_RATE_FILE = os.getenv(
+    "NOMINATIM_RATE_FILE", os.path.join(tempfile.gettempdir(), "nominatim-rate.bucket")
+)
+NOMINATIM_TIMEOUT = 10
+NOMINATIM_CACHE_SIZE = int(os.getenv("NOMINATIM_CACHE_SIZE", "5000"))
+NOMINATIM_CACHE_TTL = int(os.getenv("NOMINATIM_CACHE_TTL", str(24 * 3600)))
+
+# Shortest cached prefix that may answer a longer query
+MIN_PREFIX_LENGTH = 3
+
+
+class RateLimited(Exception):
+    """Raised when no upstream slot frees up within the allowed waiting time."""
+
+
+class TokenBucket:
+    """
+    Blocking token bucket. acquire() sleeps until a token is free and gives
+    up (RateLimited) only once it has waited max_wait seconds.
+
+    With a path, the bucket lives in that file (under a file lock), so every
+    process using the same path shares one rate; without one it is per process.
+    """
+
+    def __init__(self, rate, capacity=1, path=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.path = path
+        self._tokens = capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, updated, now):
+        """(wait, tokens left) at `now`: wait is 0 when a token was taken, else the seconds to the next."""
+        tokens = min(self.capacity, tokens + max(now - updated, 0.0) * self.rate)
+        if tokens >= 1:
+            return 0.0, tokens - 1
+        return (1 - tokens) / self.rate, tokens
+
+    def _try_acquire(self):
+        with self._lock:
+            if self.path is None:
+                now = time.time()
+                wait, self._tokens = self._take(self._tokens, self._updated, now)
+                self._updated = now
+                return wait
+            with hold_lock(self.path) as f:
+                now = time.time()
+                f.seek(0)
+                state = f.read().split()
+                tokens, updated = (float(v) for v in state) if len(state) == 2 else (self.capacity, now)
+                wait, tokens = self._take(tokens, updated, now)
+                f.seek(0)
+                f.truncate()
+                f.write(f"{tokens!r} {now!r}")
+            return wait
+
+    def acquire(self, max_wait=None):
+        """Waits for a token; returns the seconds waited. Raises RateLimited after max_wait seconds."""
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            waited = time.monotonic() - start
+            if not wait:
+                return waited
+            if max_wait is not None:
+                if waited >= max_wait:
+                    raise RateLimited(f"No upstream slot within {max_wait:.1f}s")
+                wait = min(wait, max_wait - waited)
+            time.sleep(wait)
+
+
+def _normalize_query(q):
+    """Case and spacing folded, scripts kept (Nominatim is searched in any language)."""
+    return " ".join(q.casefold().split())
+
+
+def _words(text):
+    return _normalize_query(text).replace(",", " ").split()
+
+
+def _matches(result, words):
+    """Every query word is the start of a word in the result's name."""
+    name_words = _words(result.get("display_name", ""))
+    return all(any(w.startswith(q) for w in name_words) for q in words)
+
+
+class NominatimProxy:
+    def __init__(self, url=NOMINATIM_URL, rate=NOMINATIM_RATE, max_wait=NOMINATIM_MAX_WAIT,
+                 cache_size=NOMINATIM_CACHE_SIZE, ttl=NOMINATIM_CACHE_TTL, timeout=NOMINATIM_TIMEOUT,
+                 rate_file=NOMINATIM_RATE_FILE):
+        self.url = url
+        self.max_wait = max_wait
+        self.ttl = ttl
+        self.timeout = timeout
+        self.upstream_calls = 0
+        self._calls_lock = threading.Lock()
+        self.bucket = TokenBucket(rate, path=rate_file or None)
+        self.cache = LRUCache(cache_size)
+        self._in_flight = SingleFlight()
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = NOMINATIM_USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _cached(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        expires, results = entry
+        if expires < time.time():
+            self.cache.pop(key)
+            return None
+        return results
+
+    def _from_prefix(self, query, limit):
+        """Results of a cached shorter query that still match `query`, if they fill the limit."""
+        words = _words(query)
+        for end in range(len(query) - 1, MIN_PREFIX_LENGTH - 1, -1):
+            results = self._cached((query[:end], limit))
+            if results is None:
+                continue
+            matching = [r for r in results if _matches(r, words)]
+            if len(matching) >= limit:
+                return matching[:limit]
+        return None
+
+    def _fetch(self, query, limit):
+        self.bucket.acquire(self.max_wait)
+        with self._calls_lock:
+            self.upstream_calls += 1
+        response = self.session.get(
+            self.url,
+            params={"format": "json", "q": query, "limit": limit},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        results = response.json()
+        self.cache.put((query, limit), (time.time() + self.ttl, results))
+        return results
+
+    def search(self, q, limit=5):
+        """Nominatim search results (a list of dicts) for a free-text query."""
+        query = _normalize_query(q or "")
+        if not query:
+            return []
+        key = (query, limit)
+
+        results = self._cached(key)
+        if results is None:
+            results = self._from_prefix(query, limit)
+        if results is None:
+            results = self._in_flight.do(key, lambda: self._fetch(query, limit))
+        return results
+
+
+_proxy = None
+_proxy_lock = threading.Lock()
+
+
+def get_nominatim_proxy():
+    """Returns the shared proxy client, creating it on first use."""
+    global _proxy
+    if _proxy is None:
+        with _proxy_lock:
+            if _proxy is None:
+                _proxy = NominatimProxy()
+    return _proxy
@@ -0,0 +1,53 @@
+"""
+Timezone lookup by coordinates.
+
+One TimezoneFinder per process (building it loads its polygon index), used
+under a lock. Results are memoised on coordinates rounded to
+TIMEZONE_MEMO_DECIMALS places (default 3, about 100 m); the rounded point is
+what gets looked up, so the answer does not depend on which caller came
+first. Set TIMEZONE_MEMO_DECIMALS=-1 to look up exact coordinates uncached.
+"""
+import os
+import threading
+
+from timezonefinder import TimezoneFinder
+
+from utils.cache import LRUCache
+
+TIMEZONE_MEMO_DECIMALS = int(os.getenv("TIMEZONE_MEMO_DECIMALS", "3"))
+TIMEZONE_MEMO_SIZE = int(os.getenv("TIMEZONE_MEMO_SIZE", "100000"))
+
+_finder = None
+_finder_lock = threading.Lock()
+_memo = LRUCache(TIMEZONE_MEMO_SIZE)
+
+
+def get_timezone_finder():
+    """Returns the process-wide TimezoneFinder, building it on first use."""
+    global _finder
+    if _finder is None:
+        with _finder_lock:
+            if _finder is None:
+                _finder = TimezoneFinder()
+    return _finder
+
+
+def _lookup(lat, lon):
+    finder = get_timezone_finder()
+    with _finder_lock:
+        return finder.timezone_at(lat=lat, lng=lon)
+
+
+def timezone_at(lat, lon):
+    """IANA timezone name at the coordinates, or None (e.g. open sea without a zone)."""
+    lat, lon = float(lat), float(lon)
+    if TIMEZONE_MEMO_DECIMALS < 0:
+        return _lookup(lat, lon)
+
+    key = (round(lat, TIMEZONE_MEMO_DECIMALS), round(lon, TIMEZONE_MEMO_DECIMALS))
+    tz = _memo.get(key)
+    if tz is None:
+        tz = _lookup(*key)
+        if tz is not None:
+            _memo.put(key, tz)
+    return tz
@@ -1,26 +1,29 @@
 import io
 import os
+import csv
 import cv2
 import json
 import numpy as np
 from datetime import datetime, date
 from numerology.numlogycalcu import name_numlogy_basic_sums , business_numerology_basic_sums
 from astrology.horoscope import fetch_horoscope , get_zodiac_sign
-from astrology.nakshtra_details import final_astro_report
-from astrology.planet_positions import planet_position_details
-from astrology.Dasha.vimashotryDasha import find_vimashotry_dasha
-from astrology.panchang import get_panchang
+from astrology.chart_snapshot import build_chart_snapshot
+from astrology.batch_report import astro_report_sections, iter_batch_reports
+from astrology.Dasha.vimashotryDasha import LEVEL_NAMES, iter_dasha_periods, ordinal_to_datetime, to_ordinal
+from geocoding.geocoder import suggest
+from geocoding.nominatim_proxy import RateLimited
+from astrology.panchang import get_panchang_range
+from astrology.muhurat import find_muhurat
+from astrology.panchang_cache import PANCHANG_CACHE_MAX_AGE, get_panchang_cached, start_precompute_worker
 from vastu.vastuProcess import allowed_file, process_blueprint, image_to_pdf_in_memory, OVERLAY_IMAGE_PATH 
 from vastu.compass import process_compass_image
 import fitz
 import fitz
-import urllib.parse
-import urllib.request
-from festivals.festivals import detect_festivals, get_yearly_festivals  
+from festivals.festivals import get_festivals_on, get_yearly_festivals, start_store_worker
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask import Flask, request, jsonify ,send_file
+from flask import Flask, request, jsonify ,send_file, stream_with_context
 from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from .env file
 from PIL import Image
@@ -34,6 +37,8 @@ from skimage.morphology import skeletonize, remove_small_objects
 
 # toekn for api verification
 API_KEY_TOKEN = os.getenv("API_KEY_TOKEN")
+# Largest number of places one /nominatim search returns
+NOMINATIM_MAX_LIMIT = 20
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -41,6 +46,16 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 
 limiter = Limiter(get_remote_address, app=app, default_limits=["10 per minute"])
 
+# Both run in one worker process per machine (a lock file decides which), not in every worker.
+# Batch worker processes import this file as __mp_main__ when it is run directly; they skip them.
+if __name__ != "__mp_main__":
+    if os.getenv("PANCHANG_PRECOMPUTE", "1").lower() not in ("0", "false", "no"):
+        start_precompute_worker()
+
+    # Festival calendar served from disk; rebuilt in the background when missing or stale
+    if os.getenv("FESTIVAL_STORE_AUTOBUILD", "1").lower() not in ("0", "false", "no"):
+        start_store_worker()
+
 
 # Convert OpenCV image to PNG bytes
 def cv2_to_bytes(image):
@@ -252,6 +267,7 @@ def business_numerology():
 
 
 # API : /astro-report?dob=14-07-2004&tob=07:15&lob=surat,gujarat
+#       or /astro-report?dob=14-07-2004&tob=07:15&lat=21.17&lon=72.83&timezone=Asia/Kolkata (no geocoding)
 @app.route("/astro-report",methods=['GET'])
 def final_astro_report_generator():
     
@@ -264,23 +280,20 @@ def final_astro_report_generator():
     req_tob = request.args.get('tob') #time of birth
     req_lob = request.args.get('lob')#location of birth
     req_timezone = request.args.get('timezone')
+    # Coordinates of the place (e.g. from /proxy/nominatim); when given, lob is not geocoded
+    req_lat = request.args.get('lat')
+    req_lon = request.args.get('lon')
     
     if not req_dob:
         return jsonify({"error": "Empty Date of birth"}),400
     if not req_tob:
         return jsonify({"error": "Empty time of birth"}),400
-    if not req_lob:
+    if not req_lob and not (req_lat and req_lon):
         return jsonify({"error": "Empty Location of birth"}),400
     try:
-        report =[]
-        report.append(final_astro_report(req_dob,req_tob,req_lob))
-        report.append(planet_position_details(req_dob,req_tob,req_lob,req_timezone))
-        moon_info = report[1]["Moon"]
-        moon_nak_deg = moon_info["Degree in sign"]
-        moon_nak_lord = moon_info["NakLord"]
-        rashi_sign = next(iter(report[0]["rashi_all_details"]))
-        dasha_data = find_vimashotry_dasha(req_dob, req_tob, moon_nak_deg, rashi_sign, moon_nak_lord)
-        report.append(dasha_data)
+        # Place resolved and chart computed once; every section reads from it
+        snapshot = build_chart_snapshot(req_dob, req_tob, req_lob, req_timezone, lat=req_lat, lon=req_lon)
+        report = astro_report_sections(snapshot)
         
         return app.response_class(
             response=json.dumps(report, indent=2, sort_keys=False),
@@ -289,6 +302,86 @@ def final_astro_report_generator():
         )
     except Exception as e :
         return jsonify({"error":str(e)}),500
+
+# API : POST /astro-report/batch
+# Body: JSON list of {"dob": "2004-07-14", "tob": "07:15", "lat": 21.17, "lon": 72.83, "tz": "Asia/Kolkata", "id": ...}
+#       (or {"records": [...]}), or a CSV export with a dob,tob,lat,lon,tz header.
+# Response: NDJSON, one {"index", "id", "report" | "error"} line per record as it completes
+@app.route("/astro-report/batch", methods=['POST'])
+def batch_astro_report_generator():
+    client_api = request.headers.get('Astro-API-KEY') or request.args.get('Astro-API-KEY')
+    if client_api != API_KEY_TOKEN:
+        return jsonify({"error":"Unauthorised request"}) , 401
+
+    if request.mimetype == 'text/csv':
+        records = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    else:
+        payload = request.get_json(silent=True)
+        records = payload.get('records') if isinstance(payload, dict) else payload
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "Expected a non-empty list of records"}), 400
+
+    lines = iter_batch_reports(records)
+    try:
+        # Validates the batch size before the stream starts
+        first = next(lines, None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        if first is not None:
+            yield json.dumps(first) + "\n"
+        try:
+            for line in lines:
+                yield json.dumps(line) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Batch aborted: {e}"}) + "\n"
+
+    return app.response_class(stream_with_context(generate()), status=200, mimetype='application/x-ndjson')
+
+# API : /dasha/periods?dob=2004-07-14&tob=07:15&lob=surat,gujarat&depth=5&from=2026-01-01&to=2026-02-01
+#       (lat/lon/timezone instead of lob as for /astro-report; depth 1 = mahadasha ... 6 = deha,
+#        from/to optional, YYYY-MM-DD or YYYY-MM-DDTHH:MM local time)
+# Response: NDJSON, one {"path", "level", "start", "end"} line per period, in order
+@app.route('/dasha/periods', methods=['GET'])
+def dasha_periods_generator():
+    client_api = request.headers.get('Astro-API-KEY') or request.args.get('Astro-API-KEY')
+    if client_api != API_KEY_TOKEN:
+        return jsonify({"error":"Unauthorised request"}) , 401
+
+    req_dob = request.args.get('dob')
+    req_tob = request.args.get('tob')
+    req_lob = request.args.get('lob')
+    req_lat = request.args.get('lat')
+    req_lon = request.args.get('lon')
+    if not req_dob or not req_tob:
+        return jsonify({"error": "Empty date or time of birth"}),400
+    if not req_lob and not (req_lat and req_lon):
+        return jsonify({"error": "Empty Location of birth"}),400
+    try:
+        depth = int(request.args.get('depth', 5))
+        if not 1 <= depth <= len(LEVEL_NAMES):
+            raise ValueError(f"depth must be between 1 and {len(LEVEL_NAMES)}")
+        window = [to_ordinal(v) if v else None for v in (request.args.get('from'), request.args.get('to'))]
+    except ValueError as e:
+        return jsonify({"error": str(e)}),400
+
+    try:
+        snapshot = build_chart_snapshot(req_dob, req_tob, req_lob, request.args.get('timezone'),
+                                        lat=req_lat, lon=req_lon)
+    except Exception as e:
+        return jsonify({"error":str(e)}),500
+
+    def generate():
+        for path, start, end in iter_dasha_periods(req_dob, req_tob, snapshot.longitude_of("Moon"), depth, *window):
+            yield json.dumps({
+                "path": "/".join(path),
+                "level": LEVEL_NAMES[depth - 1],
+                "start": ordinal_to_datetime(start).isoformat(),
+                "end": ordinal_to_datetime(end).isoformat(),
+            }) + "\n"
+
+    return app.response_class(stream_with_context(generate()), status=200, mimetype='application/x-ndjson')
     
 @app.route('/vastu', methods=['POST'])
 def process_image_endpoint():
@@ -416,20 +509,18 @@ def get_festivals_route():
         month = int(request.args.get('month'))
         day = int(request.args.get('day'))
         
-        # Determine lunar month (MVP: Hardcoded or passed via query param if needed)
-        # For now, defaulting to Kartika as per prompt example if not calculated.
-        # Ideally, we should receive it or calculate it.
-        lunar_month = request.args.get('lunar_month', "Kartika")
-        
         date_obj = date(year, month, day)
-        festivals = detect_festivals(date_obj, lunar_month)
+        # Reference location (Ujjain) unless latitude/longitude[/timezone] are given
+        festivals = get_festivals_on(
+            date_obj, request.args.get('latitude'), request.args.get('longitude'), request.args.get('timezone')
+        )
         
         return jsonify({
             "date": date_obj.isoformat(),
             "festivals": festivals
         })
-    except ValueError:
-        return jsonify({"error": "Invalid date parameters"}), 400
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date or location parameters: {e}"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -442,34 +533,21 @@ def get_festivals_route():
 def proxy_nominatim():
     try:
         q = request.args.get('q')
-        limit = request.args.get('limit', 5)
-        
-        if not q:
-            return jsonify([]), 200
+        try:
+            limit = int(request.args.get('limit', 5))
+        except ValueError:
+            return jsonify({"error": "limit must be a whole number"}), 400
+        limit = min(max(limit, 1), NOMINATIM_MAX_LIMIT)
 
         if not q:
             return jsonify([]), 200
 
-        # Nominatim requires a User-Agent
-        headers = {
-            'User-Agent': 'TheAstroPulse/1.0' 
-        }
-        
-        base_url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'format': 'json',
-            'q': q,
-            'limit': limit
-        }
-        
-        query_string = urllib.parse.urlencode(params)
-        full_url = f"{base_url}?{query_string}"
-        
-        req = urllib.request.Request(full_url, headers=headers)
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            return jsonify(data)
-        
+        # Cached, coalesced and rate limited (1 req/s) upstream search, topped up from the gazetteer
+        return jsonify(suggest(q, limit))
+
+    except RateLimited as e:
+        print(f"Proxy busy: {e}")
+        return jsonify([]), 503
     except Exception as e:
         print(f"Proxy error: {e}")
         return jsonify([]), 500
@@ -479,14 +557,16 @@ def proxy_nominatim():
 def get_yearly_festivals_route():
     try:
         year = int(request.args.get('year'))
-        festivals = get_yearly_festivals(year)
+        festivals = get_yearly_festivals(
+            year, request.args.get('latitude'), request.args.get('longitude'), request.args.get('timezone')
+        )
         return jsonify({
             "year": year,
             "count": len(festivals),
             "festivals": festivals
         })
-    except ValueError:
-        return jsonify({"error": "Invalid year parameter"}), 400
+    except ValueError as e:
+        return jsonify({"error": f"Invalid year or location parameters: {e}"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -515,16 +595,76 @@ def get_panchang_route():
         lat = request.args.get('latitude')
         lon = request.args.get('longitude')
         timezone = request.args.get('timezone')
-        time = request.args.get('time', "12:00")
 
         if not all([date, lat, lon]):
             return jsonify({"error": "Missing required parameters: date, latitude, longitude"}), 400
 
-        result = get_panchang(date, float(lat), float(lon), timezone, time)
-        return jsonify(result), 200
+        # The response does not depend on `time`; it is accepted for old clients
+        result, etag = get_panchang_cached(date, float(lat), float(lon), timezone)
+        response = jsonify(result)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={PANCHANG_CACHE_MAX_AGE}"
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/panchang/range', methods=['GET'])
+def get_panchang_range_route():
+    start = request.args.get('start')
+    end = request.args.get('end')
+    lat = request.args.get('lat', request.args.get('latitude'))
+    lon = request.args.get('lon', request.args.get('longitude'))
+    timezone = request.args.get('timezone')
+
+    if not all([start, end, lat, lon]):
+        return jsonify({"error": "Missing required parameters: start, end, lat, lon"}), 400
+
+    try:
+        result = get_panchang_range(start, end, lat, lon, timezone)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result), 200
+
+@app.route('/api/muhurat/search', methods=['GET'])
+def muhurat_search_route():
+    """
+    Qualifying muhurat windows in a date range. List parameters are
+    comma-separated names, e.g. tithis=Dwitiya,Shukla Panchami&weekdays=Monday,Thursday
+    &exclude=rahu_kalam,yamaganda,gulika&choghadiyas=Amrita,Shubha&abhijit=1
+    """
+    def names(param):
+        value = request.args.get(param)
+        return [n for n in value.split(",") if n.strip()] if value else None
+
+    start = request.args.get('start')
+    end = request.args.get('end')
+    lat = request.args.get('lat', request.args.get('latitude'))
+    lon = request.args.get('lon', request.args.get('longitude'))
+
+    if not all([start, end, lat, lon]):
+        return jsonify({"error": "Missing required parameters: start, end, lat, lon"}), 400
+
+    try:
+        result = find_muhurat(
+            start, end, lat, lon, request.args.get('timezone'),
+            tithis=names('tithis'),
+            nakshatras=names('nakshatras'),
+            yogas=names('yogas'),
+            karanas=names('karanas'),
+            weekdays=names('weekdays'),
+            exclude=[n.strip() for n in names('exclude') or ()],
+            require_abhijit=request.args.get('abhijit', '').lower() in ("1", "true", "yes"),
+            choghadiyas=names('choghadiyas'),
+            min_minutes=float(request.args.get('min_minutes', 0)),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result), 200
+
 if __name__ == '__main__':
     port = int(5000)
     app.run(debug=True,host="0.0.0.0",port=port) # debug=True allows for automatic reloading on code changes
\ No newline at end of file
@@ -0,0 +1,53 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import astrology.batch_report as batch_report
+from astrology.batch_report import astro_report_sections, iter_batch_reports, normalize_record
+from astrology.chart_snapshot import chart_snapshot_from_coordinates
+
+RECORDS = [
+    {"id": "a", "dob": "2004-07-14", "tob": "07:15", "lat": 21.17, "lon": 72.83, "tz": "Asia/Kolkata"},
+    {"id": "b", "dob": "1990-01-01", "tob": "23:59", "latitude": "40.71", "lng": "-74.01", "timezone": "America/New_York"},
+    {"id": "c", "dob": "2004-07-14", "tob": "07:15", "lat": 95, "lon": 72.83, "tz": "Asia/Kolkata"},
+    {"id": "d", "dob": "1985-03-31", "tob": "02:30", "lat": "51.5", "lon": "-0.12", "tz": "Europe/London"},
+    ["not", "a", "record"],
+]
+
+
+def test_normalize_record():
+    record = normalize_record(RECORDS[1])
+    assert (record["lat"], record["lon"], record["tz"], record["id"]) == (40.71, -74.01, "America/New_York", "b")
+    assert normalize_record({"dob": " 2004-07-14 ", "tob": "07:15", "lat": 1, "lon": 2})["dob"] == "2004-07-14"
+    with pytest.raises(ValueError, match="Missing 'tob'"):
+        normalize_record({"dob": "2004-07-14", "lat": 1, "lon": 2})
+    with pytest.raises(ValueError, match="must be numbers"):
+        normalize_record({"dob": "2004-07-14", "tob": "07:15", "lat": "north", "lon": 2})
+    with pytest.raises(ValueError, match="out of range"):
+        normalize_record(RECORDS[2])
+
+
+def test_batch_matches_single_reports():
+    executor = ProcessPoolExecutor(2, mp_context=batch_report._mp_context(), initializer=batch_report._init_worker)
+    try:
+        results = sorted(iter_batch_reports(RECORDS, executor=executor, chunk_size=1), key=lambda r: r["index"])
+    finally:
+        executor.shutdown()
+
+    assert [r["index"] for r in results] == list(range(len(RECORDS)))
+    assert [r["id"] for r in results] == ["a", "b", "c", "d", None]
+    assert "out of range" in results[2]["error"] and "must be an object" in results[4]["error"]
+    for result in (results[0], results[1], results[3]):
+        record = normalize_record(RECORDS[result["index"]])
+        snapshot = chart_snapshot_from_coordinates(
+            record["dob"], record["tob"], record["lat"], record["lon"], record["tz"], record["location"]
+        )
+        # The same three sections as /astro-report, and each streams as one NDJSON line
+        assert json.dumps(result["report"]) == json.dumps(astro_report_sections(snapshot))
+
+
+def test_batch_size_limit(monkeypatch):
+    monkeypatch.setattr(batch_report, "BATCH_MAX_RECORDS", 2)
+    with pytest.raises(ValueError, match="Too many records"):
+        next(iter_batch_reports(RECORDS))
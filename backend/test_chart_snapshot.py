@@ -0,0 +1,60 @@
+import socket
+
+import pytest
+
+import astrology.chart_snapshot as chart_snapshot
+import geocoding.geocoder as geocoder
+from astrology.chart_snapshot import (
+    ResolvedLocation, build_chart_snapshot, chart_snapshot_from_coordinates, resolve_location
+)
+from geocoding.gazetteer import Place
+
+
+@pytest.mark.parametrize("dob, tob, jd", [
+    ("2024-03-10", "02:30", 2460379.8125),      # skipped by the spring-forward change: 07:30 UT
+    ("2024-11-03", "01:30", 2460617.7708333),   # repeated in the autumn: the standard-time 06:30 UT
+])
+def test_birth_time_inside_dst_change(dob, tob, jd):
+    snapshot = chart_snapshot_from_coordinates(dob, tob, 40.71, -74.0, "America/New_York")
+    assert snapshot.jd == pytest.approx(jd, abs=1e-6)
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Fails the test on any geocoding or outgoing connection; returns the names geocoded."""
+    geocoded = []
+
+    def no_network(*args, **kwargs):
+        raise AssertionError(f"network access: {args}")
+
+    def geocode(location):
+        geocoded.append(location)
+        return Place(name="Surat", admin1="Gujarat", country="India", country_code="IN",
+                     latitude=21.1702, longitude=72.8311, timezone="Asia/Kolkata")
+
+    monkeypatch.setattr(socket.socket, "connect", no_network)
+    monkeypatch.setattr(geocoder, "geocode_online", no_network)
+    monkeypatch.setattr(chart_snapshot, "geocode", geocode)
+    return geocoded
+
+
+def test_coordinates_skip_geocoding(offline):
+    expected = chart_snapshot_from_coordinates("2004-07-14", "07:15", 21.17, 72.83, "Asia/Kolkata", "Surat ,Gujarat")
+    # As the report page sends them: strings, with the place label kept for display
+    snapshot = build_chart_snapshot("2004-07-14", "07:15", "Surat ,Gujarat", "Asia/Kolkata", lat="21.17", lon="72.83")
+    assert snapshot == expected
+    # Without a timezone it is looked up locally
+    assert build_chart_snapshot("2004-07-14", "07:15", "Surat ,Gujarat", lat=21.17, lon=72.83) == expected
+    assert resolve_location(lat=21.17, lon=72.83) == ResolvedLocation("21.1700,72.8300", 21.17, 72.83, "Asia/Kolkata")
+    assert offline == []
+
+    # Only a bare place name is geocoded
+    assert resolve_location("Surat ,Gujarat").latitude == 21.1702
+    assert offline == ["Surat ,Gujarat"]
+
+
+@pytest.mark.parametrize("lat, lon", [("north", "72.83"), (91, 72.83), (21.17, 181)])
+def test_bad_coordinates_raise(offline, lat, lon):
+    with pytest.raises(ValueError):
+        resolve_location("Surat", lat=lat, lon=lon)
+    assert offline == []
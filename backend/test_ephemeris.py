@@ -0,0 +1,104 @@
+import threading
+
+import numpy as np
+import pytest
+import swisseph as swe
+
+import astrology.ephemeris as ephemeris
+from astrology.ephemeris import (
+    EPHE_PATH, LAT, LON, SIDEREAL_FLAGS, SPEED, EphemerisContext, EphemerisError, calc_bodies, ephemeris_context
+)
+
+BODIES = ("Sun", "Moon", "Mars", "Rahu", "Ketu", swe.SATURN, "Pluto")
+BODY_IDS = (swe.SUN, swe.MOON, swe.MARS, swe.MEAN_NODE, swe.MEAN_NODE, swe.SATURN, swe.PLUTO)
+JDS = np.array([2415020.5, 2451545.0, 2460379.8125, 2469807.25])
+
+
+def _one_by_one(calc, flags):
+    """Each (epoch, body) from its own Swiss Ephemeris call, as the call sites used to do."""
+    out = np.empty((len(JDS), len(BODIES), 3))
+    with ephemeris_context():
+        for i, jd in enumerate(JDS.tolist()):
+            for j, (body, body_id) in enumerate(zip(BODIES, BODY_IDS)):
+                pos = calc(jd, body_id, flags | swe.FLG_SPEED)[0]
+                lon = (pos[0] + 180.0) % 360.0 if body == "Ketu" else pos[0]
+                out[i, j] = (lon, pos[1], pos[3])
+    return out
+
+
+@pytest.mark.parametrize("ut, calc", [(True, swe.calc_ut), (False, swe.calc)])
+@pytest.mark.parametrize("flags", [SIDEREAL_FLAGS, swe.FLG_SWIEPH])
+def test_calc_bodies_matches_single_calls(ut, calc, flags):
+    positions = calc_bodies(JDS, BODIES, flags, ut=ut)
+    assert positions.shape == (len(JDS), len(BODIES), 3)
+    assert np.array_equal(positions, _one_by_one(calc, flags))
+
+
+def test_calc_bodies_layout():
+    # A scalar epoch is one row; Ketu opposes Rahu with the node's latitude and speed
+    pos = calc_bodies(2451545.0, ("Rahu", "Ketu", "Moon"))
+    assert pos.shape == (1, 3, 3)
+    assert pos[0, 1, LON] == pytest.approx((pos[0, 0, LON] + 180.0) % 360.0, abs=1e-12)
+    assert (pos[0, 1, LAT], pos[0, 1, SPEED]) == (pos[0, 0, LAT], pos[0, 0, SPEED])
+    assert 11.0 < pos[0, 2, SPEED] < 16.0  # degrees a day
+    assert calc_bodies([], ("Sun",)).shape == (0, 1, 3)
+
+
+@pytest.fixture
+def ephe_paths(monkeypatch):
+    """The ephemeris paths Swiss Ephemeris is switched to."""
+    paths = []
+    set_ephe_path = swe.set_ephe_path
+
+    def recording(path):
+        paths.append(path)
+        set_ephe_path(path)
+
+    monkeypatch.setattr(swe, "set_ephe_path", recording)
+    return paths
+
+
+def test_context_restores_settings_on_exit(tmp_path, monkeypatch, ephe_paths):
+    monkeypatch.setattr(ephemeris, "ALLOW_MOSHIER", True)
+    jd = 2451545.0
+    with ephemeris_context():
+        ephe_paths.clear()
+        lahiri = swe.get_ayanamsa_ut(jd)
+        sun = calc_bodies(jd, ("Sun",))[0, 0, LON]
+        with EphemerisContext(sid_mode=swe.SIDM_RAMAN, ephe_path=str(tmp_path)) as raman:
+            assert raman.ayanamsa_name == "Raman"
+            assert abs(swe.get_ayanamsa_ut(jd) - lahiri) > 1.0
+            assert ephe_paths == [str(tmp_path)]
+        # The outer context carries on with its own settings
+        assert swe.get_ayanamsa_ut(jd) == lahiri
+        assert calc_bodies(jd, ("Sun",))[0, 0, LON] == sun
+        assert ephe_paths == [str(tmp_path), EPHE_PATH]
+
+    # and so do plain swe calls after the blocks
+    assert swe.get_ayanamsa_ut(jd) == lahiri
+    # The default context is already in force: no path switch, files kept open
+    with ephemeris_context():
+        pass
+    assert len(ephe_paths) == 2
+
+
+def test_missing_files_raise(tmp_path, monkeypatch):
+    with ephemeris_context():
+        # The default files are checked (and allowed to be Moshier) before the test
+        pass
+    monkeypatch.setattr(ephemeris, "ALLOW_MOSHIER", False)
+    empty = EphemerisContext(ephe_path=str(tmp_path))
+    # Every time, not only on the first entry
+    for _ in range(2):
+        with pytest.raises(EphemerisError, match="No Swiss Ephemeris .se1 files"):
+            with empty:
+                pass
+    with pytest.raises(EphemerisError):
+        calc_bodies(2451545.0, ("Moon",), context=empty)
+
+    # The lock was released and the default settings are back
+    other_thread = []
+    worker = threading.Thread(target=lambda: other_thread.append(calc_bodies(2451545.0, ("Moon",))))
+    worker.start()
+    worker.join(timeout=10)
+    assert other_thread and other_thread[0].shape == (1, 1, 3)
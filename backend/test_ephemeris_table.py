@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import swisseph as swe
+
+import astrology.ephemeris_table as ephemeris_table
+from astrology.ephemeris import LON, EphemerisContext, calc_bodies, sun_moon_sidereal
+
+# The Moon's error is around 4e-5" with the default 4-day, degree 10 segments
+MAX_ERROR_ARCSEC = 1e-4
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("ephe") / "sun_moon.bin")
+    ephemeris_table.build_table(path, 2024, 2025)
+    table = ephemeris_table.SunMoonTable(path)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(ephemeris_table, "_table", table)
+        mp.setattr(ephemeris_table, "_table_checked", True)
+        yield table
+
+
+def _arcsec(a, b):
+    return np.abs((a - b + 180.0) % 360.0 - 180.0) * 3600.0
+
+
+def test_table_matches_swiss_ephemeris(table):
+    # Random epochs, so most fall between the fitting nodes
+    jds = np.random.default_rng(7).uniform(table.start_jd, table.end_jd, 2000)
+    truth = calc_bodies(jds, (swe.SUN, swe.MOON))[:, :, LON]
+    sun, moon = table.longitudes(jds)
+    assert _arcsec(sun, truth[:, 0]).max() < MAX_ERROR_ARCSEC
+    assert _arcsec(moon, truth[:, 1]).max() < MAX_ERROR_ARCSEC
+    assert max(table.max_error_arcsec.values()) < MAX_ERROR_ARCSEC
+
+    # Scalar lookups and the public entry point serve the same values
+    for jd, s, m in zip(jds[:20].tolist(), sun[:20], moon[:20]):
+        assert max(_arcsec(np.array(table.longitudes_at(jd)), np.array([s, m]))) < 1e-6
+    served = sun_moon_sidereal(jds)
+    assert np.array_equal(served[0], sun) and np.array_equal(served[1], moon)
+
+
+def test_other_ayanamsa_bypasses_table(table):
+    assert table.sid_mode == swe.SIDM_LAHIRI
+    raman = EphemerisContext(sid_mode=swe.SIDM_RAMAN)
+    # One epoch inside the table, one after it
+    jds = np.array([table.start_jd + 100.25, table.end_jd + 10.0])
+    sun, moon = sun_moon_sidereal(jds, context=raman)
+    truth = calc_bodies(jds, (swe.SUN, swe.MOON), context=raman)[:, :, LON]
+    assert np.array_equal(sun, truth[:, 0]) and np.array_equal(moon, truth[:, 1])
+    # Raman and Lahiri differ by over a degree
+    assert _arcsec(sun_moon_sidereal(jds[:1])[0], sun[:1])[0] > 3600.0
@@ -0,0 +1,26 @@
+import pytest
+
+from geocoding.gazetteer import Gazetteer, load_bundled
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer(load_bundled())
+
+
+@pytest.mark.parametrize("query", [
+    "Birmingham, Alabama",
+    "Salem, Oregon",
+    "Perth, Scotland",
+    "San Jose, Costa Rica",
+])
+def test_unknown_region_is_not_matched_elsewhere(gazetteer, query):
+    # Left to the online geocoder instead of answering with a namesake
+    assert gazetteer.geocode(query) is None
+
+
+def test_known_regions_and_postcodes(gazetteer):
+    assert gazetteer.geocode("Salem, Tamil Nadu").admin1 == "Tamil Nadu"
+    assert gazetteer.geocode("surat ,gujarat").name == "Surat"
+    assert gazetteer.geocode("Surat, 395003, India").name == "Surat"
+    assert gazetteer.geocode("Perth").country_code == "AU"
@@ -0,0 +1,68 @@
+import pytest
+
+import geocoding.geocoder as geocoder
+import geocoding.timezones as timezones
+from geocoding.gazetteer import Place
+from utils.cache import LRUCache, SQLiteCache
+
+# Somewhere the gazetteer does not have: a farm outside Ujjain
+FARM = (23.2211, 75.8123)
+
+
+@pytest.fixture
+def lookups(monkeypatch, tmp_path):
+    """Empty geocode caches over a fake online geocoder; the queries it was sent."""
+    monkeypatch.setattr(geocoder, "_memory", LRUCache(100))
+    monkeypatch.setattr(geocoder, "_disk", SQLiteCache(str(tmp_path / "geocode.sqlite"), table="geocode", ttl=60))
+    monkeypatch.setattr(geocoder, "_disk_ready", True)
+    sent = []
+
+    def fake_online(location):
+        sent.append(location)
+        if "nowhere" in location.lower():
+            return None
+        return Place(name=location, admin1="", country="", country_code="", latitude=FARM[0], longitude=FARM[1])
+
+    monkeypatch.setattr(geocoder, "geocode_online", fake_online)
+    return sent
+
+
+def test_same_query_reuses_cached_place(lookups):
+    first = geocoder.geocode_online_cached("Patel Farm, Ujjain")
+    assert (first.latitude, first.longitude, first.timezone) == (*FARM, "Asia/Kolkata")
+    # Spelled differently but the same normalised query
+    again = geocoder.geocode_online_cached("  patel farm,   UJJAIN ")
+    assert (again.latitude, again.longitude, again.timezone) == (*FARM, "Asia/Kolkata")
+    assert again.name == "  patel farm,   UJJAIN "
+    assert lookups == ["Patel Farm, Ujjain"] and len(geocoder._memory) == 1
+
+    # Another process (empty memory) reads it back from the SQLite file
+    geocoder._memory.clear()
+    assert geocoder.geocode_online_cached("Patel Farm, Ujjain").latitude == FARM[0]
+    assert len(lookups) == 1
+
+
+def test_failed_lookup_is_not_cached(lookups):
+    assert geocoder.geocode_online_cached("Nowhere Farm") is None
+    assert geocoder.geocode_online_cached("Nowhere Farm") is None
+    assert lookups == ["Nowhere Farm", "Nowhere Farm"] and len(geocoder._memory) == 0
+
+
+def test_nearby_point_reuses_timezone(monkeypatch):
+    monkeypatch.setattr(timezones, "_memo", LRUCache(100))
+    asked = []
+    lookup = timezones._lookup
+
+    def counting(lat, lon):
+        asked.append((lat, lon))
+        return lookup(lat, lon)
+
+    monkeypatch.setattr(timezones, "_lookup", counting)
+    assert timezones.timezone_at(*FARM) == "Asia/Kolkata"
+    # Within the memo's rounding (3 decimals) of the first point
+    assert timezones.timezone_at(FARM[0] + 0.0003, FARM[1] - 0.0004) == "Asia/Kolkata"
+    # The rounded point is what gets looked up, whichever caller came first
+    assert asked == [(23.221, 75.812)] and len(timezones._memo) == 1
+
+    assert timezones.timezone_at(51.5074, -0.1278) == "Europe/London"
+    assert len(asked) == 2
@@ -0,0 +1,128 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from astrology.ephemeris import sun_moon_sidereal
+from astrology.muhurat import find_muhurat
+from astrology.panchang import get_panchang
+
+LAT, LON, TZ = 23.1765, 75.7885, "Asia/Kolkata"
+DAY = "2025-03-14"
+
+
+def _clock(iso):
+    """An ISO time as get_panchang prints it (hh:mm AM)."""
+    return datetime.fromisoformat(iso).strftime("%I:%M %p")
+
+
+def _spans(windows):
+    return [(w["start"], w["end"]) for w in windows]
+
+
+def _jd_spans(windows):
+    """The windows as (start, end) UT Julian days."""
+    epoch = datetime.fromisoformat("2000-01-01T12:00:00+00:00")
+    return [
+        tuple(2451545.0 + (datetime.fromisoformat(t) - epoch).total_seconds() / 86400.0 for t in _spans([w])[0])
+        for w in windows
+    ]
+
+
+def _tithi_numbers(jds):
+    sun, moon = sun_moon_sidereal(jds)
+    return ((moon - sun) % 360.0 // 12.0).astype(int) + 1
+
+
+@pytest.fixture(scope="module")
+def panchang():
+    return get_panchang(DAY, LAT, LON, TZ)
+
+
+def test_limb_windows_match_panchang(panchang):
+    next_sunrise = panchang["limbs"]["vara"]["end"]
+    for limb, name in (("tithi", "Pratipada"), ("yoga", "Ganda"), ("karana", "Balava")):
+        segment = next(s for s in panchang["transitions"][limb] if s["name"] == name)
+        found = find_muhurat(DAY, DAY, LAT, LON, TZ, **{limb + "s": [name]})["windows"]
+        assert _spans(found) == [(segment["start"], min(segment["end"], next_sunrise))], limb
+        assert found[0][limb].endswith(name)
+
+    # The nakshatra runs all day: the whole sunrise-to-sunrise range qualifies
+    found = find_muhurat(DAY, DAY, LAT, LON, TZ, nakshatras=["Uttara Phalguni"])["windows"]
+    assert _spans(found) == [(panchang["limbs"]["vara"]["start"], next_sunrise)]
+
+
+def test_period_windows_match_panchang(panchang):
+    found = find_muhurat(DAY, DAY, LAT, LON, TZ, require_abhijit=True)["windows"]
+    assert " - ".join(_clock(t) for t in _spans(found)[0]) == panchang["abhijit_muhurat"]
+
+    found = find_muhurat(DAY, DAY, LAT, LON, TZ, exclude=["rahu_kalam"])["windows"]
+    assert len(found) == 2
+    assert f"{_clock(found[0]['end'])} - {_clock(found[1]['start'])}" == panchang["rahu_kalam"]
+
+    found = find_muhurat(DAY, DAY, LAT, LON, TZ, choghadiyas=["Amrita", "Labha"])["windows"]
+    expected = []
+    for c in panchang["day_choghadiya"] + panchang["night_choghadiya"]:
+        if c["name"] not in ("Amrita", "Labha"):
+            continue
+        # Adjacent choghadiyas make one window
+        if expected and expected[-1][1] == c["start"]:
+            expected[-1] = (expected[-1][0], c["end"])
+        else:
+            expected.append((c["start"], c["end"]))
+    assert [(_clock(s), _clock(e)) for s, e in _spans(found)] == expected
+
+
+def test_weekday_window_is_sunrise_to_sunrise():
+    found = find_muhurat("2025-03-12", "2025-03-16", LAT, LON, TZ, weekdays=["friday"])["windows"]
+    vara = get_panchang(DAY, LAT, LON, TZ)["limbs"]["vara"]
+    assert _spans(found) == [(vara["start"], vara["end"])]
+    assert found[0]["weekday"] == "Friday" and found[0]["date"] == DAY
+
+
+def test_windows_agree_with_minute_scan():
+    found = find_muhurat("2025-03-01", "2025-03-10", LAT, LON, TZ, tithis=["Shukla Panchami", "Dashami"])["windows"]
+    assert [w["tithi"] for w in found] == ["Shukla Panchami", "Shukla Dashami"]
+
+    # Sampled every minute, a minute is inside a window exactly when its tithi is allowed
+    spans = _jd_spans(found)
+    first = _jd_spans(find_muhurat("2025-03-01", "2025-03-01", LAT, LON, TZ)["windows"])[0][0]
+    last = _jd_spans(find_muhurat("2025-03-10", "2025-03-10", LAT, LON, TZ)["windows"])[0][1]
+    minutes = np.arange(first + 0.5 / 1440, last, 1 / 1440)
+    inside = np.zeros(len(minutes), dtype=bool)
+    for start, end in spans:
+        inside |= (minutes >= start) & (minutes < end)
+    allowed = np.isin(_tithi_numbers(minutes), (5, 10, 25))
+    # Times are printed to the second, so minutes within a second of a boundary are left out
+    near = np.zeros(len(minutes), dtype=bool)
+    for start, end in spans:
+        near |= (np.abs(minutes - start) < 1 / 86400) | (np.abs(minutes - end) < 1 / 86400)
+    assert np.array_equal(inside[~near], allowed[~near])
+
+
+def test_unknown_names_raise():
+    for kwargs in (
+        {"tithis": ["Dasami"]}, {"nakshatras": ["Abhijeet"]}, {"yogas": ["Lucky"]}, {"karanas": ["Kimstughna x"]},
+        {"weekdays": ["Funday"]}, {"choghadiyas": ["Nectar"]}, {"exclude": ["durmuhurta"]},
+    ):
+        with pytest.raises(ValueError):
+            find_muhurat(DAY, DAY, LAT, LON, TZ, **kwargs)
+    with pytest.raises(ValueError):
+        find_muhurat(DAY, "2025-03-13", LAT, LON, TZ)
+
+
+@pytest.mark.benchmark
+def test_intervals_beat_minute_scan():
+    start, end = "2025-03-01", "2025-03-30"
+    first = _jd_spans(find_muhurat(start, start, LAT, LON, TZ)["windows"])[0][0]
+
+    began = time.perf_counter()
+    find_muhurat(start, end, LAT, LON, TZ, tithis=["Panchami", "Dashami"])
+    intervals = time.perf_counter() - began
+
+    # The per-minute way: every minute's tithi from its own ephemeris call
+    began = time.perf_counter()
+    [jd for jd in np.arange(first, first + 30, 1 / 1440).tolist() if _tithi_numbers(np.array([jd]))[0] % 5 == 0]
+    scan = time.perf_counter() - began
+    assert intervals * 10 < scan, (intervals, scan)
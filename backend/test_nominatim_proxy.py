@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import geocoding.geocoder as geocoder
+from geocoding.nominatim_proxy import NominatimProxy, RateLimited, TokenBucket
+
+PLACES = [
+    "Surat, Surat District, Gujarat, India",
+    "Surajpur, Chhattisgarh, India",
+    "Surabaya, East Java, Indonesia",
+    "Surat Thani, Thailand",
+    "Surat, Queensland, Australia",
+    "Sura, Penza Oblast, Russia",
+    "Suratgarh, Rajasthan, India",
+]
+
+
+class StubNominatim(BaseHTTPRequestHandler):
+    """Answers /search like Nominatim from PLACES; counts requests and client connections."""
+    protocol_version = "HTTP/1.1"   # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        params = parse_qs(urlparse(self.path).query)
+        q = params["q"][0].lower()
+        limit = int(params["limit"][0])
+        with server.lock:
+            server.queries.append(q)
+            server.ports.add(self.client_address[1])
+        time.sleep(server.delay)
+        results = [{"display_name": p, "lat": "0", "lon": "0"} for p in PLACES if q in p.lower()]
+        body = json.dumps(results[:limit]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubNominatim)
+    server.lock = threading.Lock()
+    server.queries = []
+    server.ports = set()
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_proxy(server, rate=1000, rate_file=None, **kwargs):
+    return NominatimProxy(url=f"http://127.0.0.1:{server.server_port}/search", rate=rate, rate_file=rate_file, **kwargs)
+
+
+def test_cache_keyed_by_normalised_query(stub):
+    proxy = make_proxy(stub)
+    first = proxy.search("Surat", 5)
+    assert first[0]["display_name"].startswith("Surat")
+    assert proxy.search("  surat ", 5) == first
+    assert stub.queries == ["surat"]
+    # A different limit is a different query
+    proxy.search("surat", 2)
+    assert len(stub.queries) == 2
+
+
+def test_connection_is_reused(stub):
+    proxy = make_proxy(stub)
+    for q in ("sura", "surab", "surat thani", "surajpur"):
+        proxy.search(q, 1)
+    assert len(stub.queries) == 4
+    assert len(stub.ports) == 1
+
+
+def test_prefix_results_answer_longer_query(stub):
+    proxy = make_proxy(stub)
+    assert [r["display_name"] for r in proxy.search("sur", 2)] == PLACES[:2]
+    # Both cached "sur" results also match "sura": no upstream call
+    assert proxy.search("sura", 2) == proxy.search("sur", 2)
+    assert stub.queries == ["sur"]
+    # Only one of them matches "surat", which cannot fill the limit
+    proxy.search("surat", 2)
+    assert stub.queries == ["sur", "surat"]
+
+
+def test_concurrent_duplicates_share_one_call(stub):
+    stub.delay = 0.2
+    proxy = make_proxy(stub)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(proxy.search("Surat", 5))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert stub.queries == ["surat"]
+    assert len(results) == 8 and all(r == results[0] for r in results)
+
+
+def test_rate_limit_queues_calls(stub):
+    proxy = make_proxy(stub, rate=10)
+    start = time.monotonic()
+    for q in ("surat", "surabaya", "surajpur", "suratgarh"):
+        proxy.search(q, 1)
+    # First call is free, the next three wait 0.1 s each
+    assert time.monotonic() - start >= 0.28
+    assert len(stub.queries) == 4
+
+
+def test_concurrent_calls_are_counted(stub):
+    proxy = make_proxy(stub)
+    threads = [threading.Thread(target=proxy.search, args=(q, 1)) for q in ("sur", "sura", "surat", "surab", "suraj")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert proxy.upstream_calls == len(stub.queries)
+
+
+def test_token_bucket_waits_then_gives_up():
+    bucket = TokenBucket(rate=4)
+    assert bucket.acquire(max_wait=0) < 0.05
+    # The next token is 0.25 s away: within the deadline the caller waits for it
+    assert bucket.acquire(max_wait=1) >= 0.2
+    start = time.monotonic()
+    with pytest.raises(RateLimited):
+        bucket.acquire(max_wait=0.1)
+    assert time.monotonic() - start >= 0.1
+
+
+def test_token_bucket_file_is_shared(tmp_path):
+    # Two workers' buckets on one file make one rate between them
+    path = str(tmp_path / "rate.bucket")
+    first, second = TokenBucket(rate=4, path=path), TokenBucket(rate=4, path=path)
+    assert first.acquire() < 0.05
+    assert second.acquire() >= 0.2
+    with pytest.raises(RateLimited):
+        first.acquire(max_wait=0.05)
+
+
+class _Upstream:
+    def __init__(self, results=None, error=None):
+        self.results, self.error = results, error
+
+    def search(self, q, limit):
+        if self.error:
+            raise self.error
+        return self.results[:limit]
+
+
+def test_suggestions_put_upstream_first(monkeypatch):
+    osm = [
+        {"display_name": "Surat, Surat District, Gujarat, India", "lat": "21.2", "lon": "72.8"},
+        {"display_name": "Surat Thani, Thailand", "lat": "9.1", "lon": "99.3"},
+    ]
+    monkeypatch.setattr(geocoder, "get_nominatim_proxy", lambda: _Upstream(osm))
+    # The gazetteer's Surat is the same place as the first upstream result
+    assert geocoder.suggest("surat", 5) == osm
+    assert geocoder.suggest("surat", 1) == osm[:1]
+
+    monkeypatch.setattr(geocoder, "get_nominatim_proxy", lambda: _Upstream(osm[1:]))
+    names = [r["display_name"] for r in geocoder.suggest("surat", 5)]
+    assert names == ["Surat Thani, Thailand", "Surat, Gujarat, India"]
+
+
+def test_suggestions_fall_back_to_gazetteer(monkeypatch):
+    monkeypatch.setattr(geocoder, "get_nominatim_proxy", lambda: _Upstream(error=RateLimited("busy")))
+    assert [r["display_name"] for r in geocoder.suggest("surat", 5)] == ["Surat, Gujarat, India"]
+    with pytest.raises(RateLimited):
+        geocoder.suggest("zzzqx", 5)
+
+    monkeypatch.setattr(geocoder, "GEOCODER_ONLINE_FALLBACK", False)
+    monkeypatch.setattr(geocoder, "get_nominatim_proxy", lambda: _Upstream(error=AssertionError("no network")))
+    assert [r["display_name"] for r in geocoder.suggest("surat", 5)] == ["Surat, Gujarat, India"]
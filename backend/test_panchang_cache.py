@@ -0,0 +1,86 @@
+import pytest
+from flask import Flask, jsonify, request
+
+import astrology.panchang_cache as panchang_cache
+from astrology.panchang import get_panchang
+from astrology.panchang_cache import PANCHANG_CACHE_MAX_AGE, get_panchang_cached
+from astrology.sun_times import cell_for
+from utils.cache import SQLiteCache
+
+LAT, LON, TZ = 23.1765, 75.7885, "Asia/Kolkata"
+DAY = "2025-03-14"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(panchang_cache, "_memory", panchang_cache.LRUCache(100))
+    monkeypatch.setattr(panchang_cache, "_disk", None)
+    monkeypatch.setattr(panchang_cache, "_disk_checked", True)
+
+
+@pytest.fixture
+def client():
+    # The conditional response of the /api/panchang route in main.py
+    app = Flask(__name__)
+
+    @app.route("/api/panchang")
+    def panchang_route():
+        args = request.args
+        result, etag = get_panchang_cached(args["date"], args["latitude"], args["longitude"], args.get("timezone"))
+        response = jsonify(result)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={PANCHANG_CACHE_MAX_AGE}"
+        return response.make_conditional(request)
+
+    return app.test_client()
+
+
+def test_etag_round_trip(client):
+    query = {"date": DAY, "latitude": LAT, "longitude": LON, "timezone": TZ}
+    first = client.get("/api/panchang", query_string=query)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.get_json() == get_panchang(DAY, LAT, LON, TZ)
+
+    second = client.get("/api/panchang", query_string=query, headers={"If-None-Match": etag})
+    assert second.status_code == 304 and second.data == b""
+    assert second.headers["ETag"] == etag
+
+    # A stale tag gets the full response again
+    stale = client.get("/api/panchang", query_string=query, headers={"If-None-Match": '"0123456789abcdef0123"'})
+    assert stale.status_code == 200 and stale.headers["ETag"] == etag
+
+
+def test_etag_is_stable_across_workers(tmp_path, monkeypatch):
+    result, etag = get_panchang_cached(DAY, LAT, LON, TZ)
+    # Another worker computing the same day on its own arrives at the same tag
+    panchang_cache._memory.clear()
+    assert get_panchang_cached(DAY, LAT, LON, TZ) == (result, etag)
+
+    # and so does one reading the entry back from the shared disk tier
+    monkeypatch.setattr(panchang_cache, "_disk", SQLiteCache(str(tmp_path / "panchang.sqlite"), table="panchang"))
+    panchang_cache._memory.clear()
+    get_panchang_cached(DAY, LAT, LON, TZ)
+    panchang_cache._memory.clear()
+    assert get_panchang_cached(DAY, LAT, LON, TZ)[1] == etag
+    assert panchang_cache._memory.stats()["misses"] == 1
+
+
+def test_key_changes_with_date_and_place():
+    _, etag = get_panchang_cached(DAY, LAT, LON, TZ)
+    assert len(panchang_cache._memory) == 1
+
+    # A point in the same H3 cell shares the entry
+    assert cell_for(LAT + 0.002, LON + 0.001) == cell_for(LAT, LON)
+    assert get_panchang_cached(DAY, LAT + 0.002, LON + 0.001, TZ)[1] == etag
+    assert len(panchang_cache._memory) == 1
+
+    # Another day, another cell or another timezone is a new entry with its own tag
+    other_cell = (LAT + 0.1, LON)
+    assert cell_for(*other_cell) != cell_for(LAT, LON)
+    tags = {
+        get_panchang_cached("2025-03-15", LAT, LON, TZ)[1],
+        get_panchang_cached(DAY, *other_cell, TZ)[1],
+        get_panchang_cached(DAY, LAT, LON, "Asia/Kathmandu")[1],
+    }
+    assert len(panchang_cache._memory) == 4
+    assert len(tags) == 3 and etag not in tags
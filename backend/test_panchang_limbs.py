@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from astrology.ephemeris import sun_moon_sidereal
+from astrology.panchang import LIMB_NAMES, get_panchang
+
+LAT, LON, TZ = 23.1765, 75.7885, "Asia/Kolkata"
+# A boundary is checked this far (days) either side of it
+SIDE = 30.0 / 86400.0
+
+
+def _jd(iso):
+    epoch = datetime.fromisoformat("2000-01-01T12:00:00+00:00")
+    return 2451545.0 + (datetime.fromisoformat(iso) - epoch).total_seconds() / 86400.0
+
+
+def _limb_index(limb, jd):
+    """The limb running at jd, straight from the Sun and Moon longitudes."""
+    sun, moon = (float(v[0]) for v in sun_moon_sidereal(np.array([jd])))
+    elongation = (moon - sun) % 360.0
+    if limb == "tithi":
+        return int(elongation // 12.0)
+    if limb == "karana":
+        return int(elongation // 6.0)
+    if limb == "nakshatra":
+        return int(moon // (360.0 / 27.0))
+    return int(((sun + moon) % 360.0) // (360.0 / 27.0))
+
+
+@pytest.mark.parametrize("day", ["2025-03-14", "2025-06-21", "2025-10-21"])
+def test_transitions_are_limb_changes(day):
+    panchang = get_panchang(day, LAT, LON, TZ)
+    sunrise, next_sunrise = (_jd(panchang["limbs"]["vara"][end]) for end in ("start", "end"))
+    for limb, segments in panchang["transitions"].items():
+        # Sunrise to the next sunrise, without gaps
+        assert _jd(segments[0]["start"]) <= sunrise < _jd(segments[0]["end"])
+        assert _jd(segments[-1]["start"]) < next_sunrise <= _jd(segments[-1]["end"]) + SIDE
+        for before, after in zip(segments, segments[1:]):
+            assert before["end"] == after["start"]
+        for segment in segments:
+            start, end = _jd(segment["start"]), _jd(segment["end"])
+            name = LIMB_NAMES[limb]
+            assert name(_limb_index(limb, start + SIDE)) == segment["name"], (limb, segment)
+            assert name(_limb_index(limb, end - SIDE)) == segment["name"], (limb, segment)
+            assert name(_limb_index(limb, start - SIDE)) != segment["name"], (limb, segment)
+            assert name(_limb_index(limb, end + SIDE)) != segment["name"], (limb, segment)
+
+
+def test_summary_fields():
+    panchang = get_panchang("2025-03-14", LAT, LON, TZ)
+    transitions = panchang["transitions"]
+    # Yoga and karana stay bare names; tithi and nakshatra give the end time as before
+    assert panchang["yoga"] == transitions["yoga"][0]["name"] == panchang["limbs"]["yoga"]["name"] == "Shula"
+    assert panchang["karana"] == transitions["karana"][0]["name"] == "Bava"
+    assert panchang["tithi"] == "Purnima upto 12:24 PM"
+    assert panchang["nakshatra"] == "Uttara Phalguni upto 08:54 AM"
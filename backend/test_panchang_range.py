@@ -0,0 +1,68 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytz
+
+from astrology.panchang import PANCHANG_RANGE_MAX_DAYS, get_panchang, get_panchang_range
+
+# Five days across the start of British Summer Time (2025-03-30)
+LAT, LON, TZ = 51.5074, -0.1278, "Europe/London"
+START, END = "2025-03-28", "2025-04-01"
+
+
+def _unix(iso):
+    return int(datetime.fromisoformat(iso).timestamp())
+
+
+def _near_clock(unix, clock):
+    """unix seconds within a minute of a "hh:mm AM" time as get_panchang prints it (to the minute)."""
+    local = datetime.fromtimestamp(unix, pytz.timezone(TZ))
+    printed = datetime.strptime(clock, "%I:%M %p")
+    minutes = local.hour * 60 + local.minute + local.second / 60 - (printed.hour * 60 + printed.minute)
+    return -1 <= (minutes + 720) % 1440 - 720 <= 1
+
+
+def test_columns_match_daily_panchang():
+    result = get_panchang_range(START, END, LAT, LON, TZ)
+    columns, names = result["columns"], result["names"]
+    assert (result["start"], result["end"], result["timezone"]) == (START, END, TZ)
+    assert len(columns["date"]) == 5 and all(len(values) == 5 for values in columns.values())
+
+    for i, day in enumerate(columns["date"]):
+        panchang = get_panchang(day, LAT, LON, TZ)
+        limbs = panchang["limbs"]
+        assert names["weekday"][columns["weekday"][i]] == panchang["weekday"]
+        # Unix seconds are truncated, the ISO times rounded down to the second
+        assert abs(columns["sunrise"][i] - _unix(limbs["vara"]["start"])) <= 1, day
+        assert abs(columns["next_sunrise"][i] - _unix(limbs["vara"]["end"])) <= 1, day
+        assert _near_clock(columns["sunset"][i], panchang["sunset"]), day
+        for limb in ("tithi", "nakshatra", "yoga", "karana"):
+            assert names[limb][columns[limb][i]] == limbs[limb]["name"], (day, limb)
+            assert abs(columns[f"{limb}_start"][i] - _unix(limbs[limb]["start"])) <= 1, (day, limb)
+            assert abs(columns[f"{limb}_end"][i] - _unix(limbs[limb]["end"])) <= 1, (day, limb)
+        for period, field in (("rahu_kalam", "rahu_kalam"), ("abhijit", "abhijit_muhurat")):
+            start, end = panchang[field].split(" - ")
+            assert _near_clock(columns[f"{period}_start"][i], start), (day, period)
+            assert _near_clock(columns[f"{period}_end"][i], end), (day, period)
+
+
+def test_day_limit():
+    start = date(2025, 1, 1)
+    last = (start + timedelta(days=PANCHANG_RANGE_MAX_DAYS - 1)).isoformat()
+    with pytest.raises(ValueError, match="At most"):
+        get_panchang_range(start.isoformat(), (start + timedelta(days=PANCHANG_RANGE_MAX_DAYS)).isoformat(), LAT, LON, TZ)
+    # A single day is the smallest range
+    assert get_panchang_range(last, last, LAT, LON, TZ)["columns"]["date"] == [last]
+
+
+@pytest.mark.parametrize("start, end, lat, lon, tz", [
+    ("2025-02-30", "2025-03-02", LAT, LON, TZ),
+    ("28-03-2025", END, LAT, LON, TZ),
+    (END, START, LAT, LON, TZ),
+    (START, END, 91, LON, TZ),
+    (START, END, "north", LON, TZ),
+    (START, END, LAT, LON, "Europe/Atlantis"),
+])
+def test_bad_input_raises_value_error(start, end, lat, lon, tz):
+    with pytest.raises(ValueError):
+        get_panchang_range(start, end, lat, lon, tz)
@@ -0,0 +1,49 @@
+from datetime import date
+
+from festivals.panchang import MONTHS
+from festivals.rule_index import RuleIndex, festival_entry
+
+RULES = {
+    "Fixed": {"type": "fixed", "month": 1, "day": 26},
+    "Solar": {"type": "solar", "sun_sign": "Capricorn"},
+    "Full": {"lunar_month": "Magha", "paksha": "Shukla", "tithi": "Panchami"},
+    "Any Month": {"paksha": "Shukla", "tithi": "Panchami"},
+    "Any Paksha": {"tithi": "Panchami"},
+    "Null Month": {"lunar_month": None, "tithi": "Panchami"},
+    "Star": {"tithi": "Panchami", "nakshatra": "Rohini"},
+    "Null Star": {"tithi": "Panchami", "nakshatra": None},
+    "Evening": {"lunar_month": "Magha", "tithi": "Shashthi", "timing": "evening"},
+}
+
+PANCHAMI = {"tithi": "Panchami", "paksha": "Shukla", "nakshatra": "Revati"}
+SHASHTHI = {"tithi": "Shashthi", "paksha": "Shukla", "nakshatra": "Ashwini"}
+
+
+def _names(matches):
+    return [name for name, _, _ in matches]
+
+
+def test_lookup_follows_legacy_rule_semantics():
+    index = RuleIndex(RULES)
+    day = date(2026, 1, 23)
+    assert _names(index.match(day, "Magha", {None: PANCHAMI})) == ["Full", "Any Month", "Any Paksha"]
+    assert _names(index.match(day, "Pausha", {None: dict(PANCHAMI, paksha="Krishna")})) == ["Any Paksha"]
+    assert _names(index.match(day, "Magha", {None: dict(PANCHAMI, nakshatra="Rohini")}))[-1] == "Star"
+
+
+def test_timings_fixed_and_solar_rules():
+    index = RuleIndex(RULES)
+    assert index.timings == ["evening"]
+    assert index.needs_timing("evening", "Magha") and not index.needs_timing("evening", "Pausha")
+    matches = index.match(date(2026, 1, 26), "Magha", {None: PANCHAMI, "evening": SHASHTHI}, "Capricorn")
+    assert _names(matches) == ["Fixed", "Solar", "Full", "Any Month", "Any Paksha", "Evening"]
+    name, rule, state = matches[-1]
+    assert festival_entry(name, rule, state, "Magha", date(2026, 1, 26))["tithi"] == "Shashthi"
+
+
+def test_lunar_tables_flag_matchable_days():
+    table = RuleIndex(RULES).tables
+    magha = MONTHS.index("Magha")
+    assert table[None][magha * 30 + 4] and table[None][3 * 30 + 19]
+    assert not table[None][magha * 30 + 5]
+    assert table["evening"][magha * 30 + 5] and not table["evening"][3 * 30 + 5]
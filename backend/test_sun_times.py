@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+
+import astrology.sun_times as sun_times
+from astrology.sun_times import cell_for, local_midnight_jd
+from utils.cache import LRUCache, SQLiteCache
+
+LAT, LON, TZ = 23.1765, 75.7885, "Asia/Kolkata"
+# About 200 m away, in the same resolution-7 cell
+NEARBY = (LAT + 0.002, LON + 0.001)
+
+
+@pytest.fixture(autouse=True)
+def counted(monkeypatch):
+    """Empty caches, and the number of rise/set computations made."""
+    monkeypatch.setattr(sun_times, "_memory", LRUCache(100))
+    monkeypatch.setattr(sun_times, "_disk", None)
+    monkeypatch.setattr(sun_times, "_disk_checked", True)
+    calls = []
+    compute = sun_times._compute
+
+    def counting(jd_start, lat, lon):
+        calls.append((jd_start, lat, lon))
+        return compute(jd_start, lat, lon)
+
+    monkeypatch.setattr(sun_times, "_compute", counting)
+    return calls
+
+
+def test_nearby_point_reuses_cell(counted):
+    midnight = local_midnight_jd(date(2025, 3, 14), TZ)
+    assert cell_for(*NEARBY) == cell_for(LAT, LON)
+    first = sun_times.sun_times(LAT, LON, midnight)
+    assert sun_times.sun_times(*NEARBY, midnight) is first
+    assert len(counted) == 1 and len(sun_times._memory) == 1
+
+    # Computed at the cell centre, a few seconds from the exact point
+    exact = sun_times._compute(midnight, LAT, LON)
+    assert all(abs(a - b) * 86400.0 < 10.0 for a, b in zip(first, exact))
+
+    # Another cell is computed on its own
+    assert cell_for(LAT + 0.1, LON) != cell_for(LAT, LON)
+    assert sun_times.sun_times(LAT + 0.1, LON, midnight) != first
+    assert len(sun_times._memory) == 2 and len(counted) == 3
+
+
+def test_range_fills_only_missing_days(counted):
+    midnight = local_midnight_jd(date(2025, 3, 1), TZ)
+    week = sun_times.sun_times_range(LAT, LON, midnight + 3, 7)
+    assert len(counted) == 7
+    # The month reuses the seven days already cached
+    month = sun_times.month_sun_times(*NEARBY, 2025, 3, TZ)
+    assert len(counted) == 31
+    assert [(rise, set_) for _, rise, set_ in month[3:10]] == week
+    assert [d for d, _, _ in month] == [date(2025, 3, k) for k in range(1, 32)]
+
+
+def test_disk_tier_is_shared(counted, tmp_path, monkeypatch):
+    monkeypatch.setattr(sun_times, "_disk", SQLiteCache(str(tmp_path / "sun_times.sqlite"), table="sun_times"))
+    midnight = local_midnight_jd(date(2025, 3, 14), TZ)
+    first = sun_times.sun_times_range(LAT, LON, midnight, 3)
+    # A fresh process (empty memory) reads the cell's days back from the file
+    monkeypatch.setattr(sun_times, "_memory", LRUCache(100))
+    assert sun_times.sun_times_range(*NEARBY, midnight, 3) == first
+    assert len(counted) == 3
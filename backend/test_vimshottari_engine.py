@@ -0,0 +1,163 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from astrology.Dasha import vimshottari_engine as engine
+from astrology.Dasha.vimashotryDasha import find_vimashotry_dasha_for_chart, format_ordinal, running_dasha
+
+BIRTH = engine.to_ordinal(datetime(2004, 7, 14, 7, 15))
+MOON_LON = 45.3
+DAYS = engine.YEAR_DAYS["julian"]
+
+
+def _legacy_full_dasha(dob, moon_lon):
+    """The eager 9 x 9 x 9 build the engine replaced: every date through strftime/strptime."""
+    order = list(engine.LORDS)
+    years = dict(zip(engine.LORDS, engine.YEARS))
+    span = 13.3333
+    lord = order[int(moon_lon // (360 / 27)) % 9]
+    within = moon_lon - int(moon_lon // span) * span
+    remaining = years[lord] - years[lord] * within / span
+
+    mahas = []
+    start = dob
+    end = start + relativedelta(days=int(remaining * 365))
+    mahas.append((lord, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+    idx = order.index(lord)
+    for planet in (order[idx:] + order[:idx])[1:]:
+        start, end = end, end + relativedelta(years=years[planet])
+        mahas.append((planet, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+
+    def split(lord, start, end):
+        total = (end - start).days
+        idx = order.index(lord)
+        current = start
+        for sub in order[idx:] + order[:idx]:
+            sub_end = current + timedelta(days=round(years[sub] / 120 * total))
+            yield sub, current, sub_end
+            current = sub_end
+
+    full = {}
+    for maha, start, end in mahas:
+        start, end = datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d")
+        antars = {}
+        for antar, a_start, a_end in split(maha, start, end):
+            a_start = datetime.strptime(a_start.strftime("%d-%m-%Y"), "%d-%m-%Y")
+            a_end = datetime.strptime(a_end.strftime("%d-%m-%Y"), "%d-%m-%Y")
+            antars[antar] = {
+                "start_date": a_start.strftime("%d-%m-%Y"),
+                "end_date": a_end.strftime("%d-%m-%Y"),
+                "pratyantarDasha": {
+                    p: {"start_date": p_start.strftime("%d-%m-%Y"), "end_date": p_end.strftime("%d-%m-%Y")}
+                    for p, p_start, p_end in split(antar, a_start, a_end)
+                },
+            }
+        full[maha] = {"start_date": start.strftime("%d-%m-%Y"), "end_date": end.strftime("%d-%m-%Y"),
+                      "antarDasha": antars}
+    return full
+
+
+def _best_of(fn, repeat=5, number=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def test_birth_balance():
+    # Start of Ashwini: the whole Ketu dasha is ahead
+    assert engine.birth_balance(0.0) == (0, 0.0)
+    # Middle of Bharani: half the Venus dasha is gone
+    lord, elapsed = engine.birth_balance(360 / 27 * 1.5)
+    assert engine.LORDS[lord] == "Venus" and abs(elapsed - 0.5) < 1e-12
+
+
+def test_periods_cover_the_cycle():
+    mahas = engine.mahadashas(BIRTH, MOON_LON)
+    assert mahas[0][1] <= BIRTH < mahas[0][2]
+    assert abs((mahas[-1][2] - mahas[0][1]) - 120 * DAYS) < 1e-6
+    for (_, _, end), (_, start, _) in zip(mahas, mahas[1:]):
+        assert end == start
+
+    for lords, starts, ends in engine.table([BIRTH], [MOON_LON], 4):
+        assert starts[0, 0] == mahas[0][1]
+        assert abs(ends[0, -1] - mahas[-1][2]) < 1e-6
+        assert (starts[0, 1:] == ends[0, :-1]).all()
+
+
+def test_year_definition():
+    julian = engine.mahadashas(BIRTH, MOON_LON, "julian")
+    savana = engine.mahadashas(BIRTH, MOON_LON, "savana")
+    assert abs((julian[-1][2] - julian[0][1]) / (savana[-1][2] - savana[0][1]) - 365.25 / 360) < 1e-12
+
+
+def test_running_agrees_with_table_and_walk():
+    at = engine.to_ordinal("2026-10-18T12:00")
+    path = engine.running(BIRTH, MOON_LON, at, 4)
+    lords, starts, ends = engine.table([BIRTH], [MOON_LON], 4)[3]
+    k = int(((ends[0] <= at)).sum())
+    assert path[-1] == (int(lords[0, k]), float(starts[0, k]), float(ends[0, k]))
+
+    walked = list(engine.walk(BIRTH, MOON_LON, 4, at, at + 1e-6))
+    assert walked == [(tuple(p[0] for p in path), path[-1][1], path[-1][2])]
+
+    many = engine.running_many([BIRTH, BIRTH], [MOON_LON, MOON_LON], [at, BIRTH - 1e5], 4)
+    assert [tuple(int(x) for x in row) for row in many[0]] == [tuple(p[0] for p in path), (-1,) * 4]
+
+    nodes = running_dasha("2004-07-14", "07:15", MOON_LON, "2026-10-18T12:00", 4)
+    assert [n.lord for n in nodes] == [engine.LORDS[p[0]] for p in path]
+
+
+class _Snapshot:
+    dob, tob = "2004-07-14", "07:15"
+
+    def longitude_of(self, body):
+        return MOON_LON
+
+
+@pytest.mark.benchmark
+def test_engine_beats_eager_tree_by_an_order_of_magnitude():
+    dob = datetime(2004, 7, 14, 7, 15)
+    legacy = _best_of(lambda: _legacy_full_dasha(dob, MOON_LON))
+    engine_table = _best_of(lambda: engine.table([BIRTH], [MOON_LON], 3))
+    assert engine_table * 10 < legacy, (engine_table, legacy)
+
+    # The running period at each level needs no tree at all
+    engine_running = _best_of(lambda: engine.running(BIRTH, MOON_LON, BIRTH + 5000, 3), number=200)
+    assert engine_running * 10 < legacy, (engine_running, legacy)
+
+    # The report as the endpoints serve it, dates formatted and nested into dicts
+    report = _best_of(lambda: find_vimashotry_dasha_for_chart(_Snapshot()))
+    assert report * 5 < legacy, (report, legacy)
+
+
+def test_report_shape_is_unchanged():
+    report = find_vimashotry_dasha_for_chart(_Snapshot())["vimshottariDasha"]
+    legacy = _legacy_full_dasha(datetime(2004, 7, 14, 7, 15), MOON_LON)
+    assert list(report) == list(legacy)
+    for maha in report:
+        assert list(report[maha]["antarDasha"]) == list(legacy[maha]["antarDasha"])
+        for antar, period in report[maha]["antarDasha"].items():
+            assert list(period) == ["start_date", "end_date", "pratyantarDasha"]
+            assert list(period["pratyantarDasha"]) == list(legacy[maha]["antarDasha"][antar]["pratyantarDasha"])
+
+
+def test_report_dates_match_periods():
+    report = find_vimashotry_dasha_for_chart(_Snapshot())["vimshottariDasha"]
+    levels = engine.table([BIRTH], [MOON_LON], 3)
+    periods = [
+        [(engine.LORDS[lord], format_ordinal(start), format_ordinal(end))
+         for lord, start, end in zip(lords[0].tolist(), starts[0].tolist(), ends[0].tolist())]
+        for lords, starts, ends in levels
+    ]
+    assert [(m, p["start_date"], p["end_date"]) for m, p in report.items()] == periods[0]
+    antars = [(a, p) for m in report.values() for a, p in m["antarDasha"].items()]
+    # Antardasha days are printed without a leading zero
+    assert [(a, p["start_date"], p["end_date"]) for a, p in antars] == \
+        [(lord, start.lstrip("0"), end.lstrip("0")) for lord, start, end in periods[1]]
+    assert [(p, d["start_date"], d["end_date"]) for _, a in antars for p, d in a["pratyantarDasha"].items()] == periods[2]
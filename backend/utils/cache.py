@@ -0,0 +1,175 @@
+"""
+Small caches shared by the backend services.
+
+LRUCache is a bounded in-process memo. SQLiteCache is an optional on-disk
+tier (one table of JSON values keyed by string, with optional expiry) that
+survives restarts and is shared by the worker processes on one machine.
+SingleFlight lets concurrent callers asking for the same key share one
+computation.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used entry when full."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent string -> JSON value store.
+
+    `ttl` (seconds) makes entries expire; None keeps them forever. Several
+    processes may share one file (WAL journal).
+    """
+
+    def __init__(self, path, table="cache", ttl=None):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+            )
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """Returns {key: value} for the keys found and not expired."""
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} "
+                    f"WHERE key IN ({','.join('?' * len(part))}) AND (expires IS NULL OR expires > ?)",
+                    (*part, now),
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        expires = time.time() + self.ttl if self.ttl else None
+        rows = [(k, json.dumps(v), expires) for k, v in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)", rows
+            )
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE expires IS NOT NULL AND expires <= ?",
+                               (time.time(),))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent work: while fn is running for a key, other
+    callers with the same key wait for it and get the same result (or
+    exception) instead of running it again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
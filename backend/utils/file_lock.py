@@ -0,0 +1,48 @@
+"""
+Cross-process "only one of us" lock.
+
+Every web worker imports the app, so work that should run once per machine
+(building the festival calendar, warming the shared panchang cache) takes a
+lock file first and the processes that do not get it leave the work alone.
+The lock is released when the file is closed or the process exits.
+hold_lock waits for the lock instead, for state shared between processes.
+
+    lock = try_lock("/var/cache/astropulse/festival_calendar.lock")
+    if lock is not None:
+        try:
+            build()
+        finally:
+            lock.close()
+"""
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process gets the lock
+    fcntl = None
+
+
+def try_lock(path):
+    """
+    Takes an exclusive lock on path without waiting. Returns the open lock
+    file (close it to release the lock), or None when another process holds
+    it. Raises OSError when the file cannot be created.
+    """
+    f = open(path, "a+")
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+@contextmanager
+def hold_lock(path):
+    """Holds an exclusive lock on path for the with block, waiting for it; yields the open file."""
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield f
@@ -0,0 +1,64 @@
+"""
+Sets of time intervals as sorted lists of disjoint half-open (start, end)
+pairs, combined with linear merges instead of sampling the time line.
+"""
+
+
+def normalize(intervals):
+    """Sorted, disjoint form of any (start, end) pairs: overlapping and touching ones are merged."""
+    out = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if out and start <= out[-1][1]:
+            if end > out[-1][1]:
+                out[-1] = (out[-1][0], end)
+        else:
+            out.append((start, end))
+    return out
+
+
+def intersect(a, b):
+    """Intervals covered by both a and b (both normalized)."""
+    out = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            out.append((start, end))
+        # Drop whichever interval finishes first
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+def subtract(a, b):
+    """Parts of a not covered by b (both normalized)."""
+    out = []
+    j = 0
+    for start, end in a:
+        while j < len(b) and b[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(b) and b[k][0] < end:
+            if b[k][0] > start:
+                out.append((start, b[k][0]))
+            start = max(start, b[k][1])
+            k += 1
+        if start < end:
+            out.append((start, end))
+    return out
+
+
+def intersect_all(sets):
+    """Intersection of several normalized sets; the smallest ones go first."""
+    sets = sorted(sets, key=len)
+    result = sets[0]
+    for other in sets[1:]:
+        if not result:
+            break
+        result = intersect(result, other)
+    return result
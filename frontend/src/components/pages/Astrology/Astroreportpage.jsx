@@ -19,6 +19,8 @@ const Astroreportpage = () => {
   const [lob, setLob] = useState("")
   const [timezone, setTimezone] = useState("Asia/Kolkata")
   const [suggestions, setSuggestions] = useState([])
+  // Coordinates of the picked suggestion; lets the server skip geocoding
+  const [place, setPlace] = useState(null)
   const [fullName, setFullName] = useState("")
 
   const [result, setResult] = useState(null)
@@ -32,6 +34,7 @@ const Astroreportpage = () => {
 
   const handleLobInput = async (value) => {
     setLob(value)
+    setPlace(null)
     if (value.length > 2) {
       try {
         const res = await fetch(
@@ -40,7 +43,7 @@ const Astroreportpage = () => {
           )}&limit=5`,
         )
         const data = await res.json()
-        setSuggestions(data.map((place) => place.display_name))
+        setSuggestions(data)
       } catch {
         setSuggestions([])
       }
@@ -57,8 +60,17 @@ const Astroreportpage = () => {
     setResult(null)
 
     try {
+      const params = new URLSearchParams({ dob, tob, lob })
+      if (place) {
+        params.set("lat", place.lat)
+        params.set("lon", place.lon)
+        // Without the place's own zone the server looks it up from the coordinates
+        if (place.timezone) params.set("timezone", place.timezone)
+      } else {
+        params.set("timezone", timezone)
+      }
       const response = await fetch(
-        `${import.meta.env.VITE_ASTRO_API_URL}/astro-report?dob=${dob}&tob=${tob}&lob=${encodeURIComponent(lob)}&timezone=${timezone}`,
+        `${import.meta.env.VITE_ASTRO_API_URL}/astro-report?${params}`,
         {
           headers: {
             "Astro-API-KEY": import.meta.env.VITE_API_KEY_TOKEN,
@@ -172,12 +184,13 @@ const Astroreportpage = () => {
                       <div
                         key={index}
                         onClick={() => {
-                          setLob(item)
+                          setLob(item.display_name)
+                          setPlace(item)
                           setSuggestions([])
                         }}
                         className="p-3 hover:bg-gold/20 cursor-pointer text-sm border-b border-white/5 last:border-0"
                       >
-                        {item}
+                        {item.display_name}
                       </div>
                     ))}
                   </div>